@@ -9,6 +9,7 @@
 #include <UniversalTelegramBot.h>
 #include <WiFiClientSecure.h>
 #include <ESP8266mDNS.h>
+#include <WiFiUdp.h>
 
 // WiFi credentials
 const char* ssid = "PEACE 2GHz";
@@ -24,6 +25,19 @@ const char* deviceName = "itinfrastructuremonitor";
 // Web server to receive metrics and host web interface
 ESP8266WebServer server(80);
 
+// UDP listener for fire-and-forget metric frames (see ssm3.py --udp)
+#define UDP_PORT 4210
+WiFiUDP udp;
+uint32_t udpSessionId = 0;
+uint32_t lastUdpSeq = 0;
+bool udpSeqValid = false;
+
+// Batched updates (see ssm3.py --batch-size): largest body and sample count one
+// request may carry; the host splits larger batches (ssm.batch FIRMWARE_BATCH_*)
+#define BATCH_MAX_BYTES 8192
+#define BATCH_MAX_SAMPLES 48
+#define BATCH_SAMPLE_FIELDS 8  // members per sample object: five metrics, ts, host, spare
+
 // Secure client for Telegram Bot
 WiFiClientSecure secured_client;
 UniversalTelegramBot bot(BOT_TOKEN, secured_client);
@@ -86,6 +100,9 @@ void handleGetThresholds();
 void handleMetrics();
 void setupWebServer();
 void handleResetThresholds();
+void applyMetrics(JsonObject doc);
+void handleUpdateBatch();
+void handleUdpPacket();
 
 void setup() {
   Serial.begin(115200);
@@ -119,6 +136,10 @@ void setup() {
   server.begin();
   Serial.println("HTTP server started");
   
+  // Start UDP listener
+  udp.begin(UDP_PORT);
+  Serial.println("UDP listener started");
+  
   // Send startup notification
   if (settings.notifications_enabled) {
     sendTelegramNotification("IT Infrastructure Monitoring System started. Ready to monitor your system!");
@@ -136,6 +157,7 @@ void setupWebServer() {
   // Set up server endpoints
   server.on("/", HTTP_GET, handleRoot);
   server.on("/update", HTTP_POST, handleUpdate);
+  server.on("/update/batch", HTTP_POST, handleUpdateBatch);
   server.on("/thresholds", HTTP_GET, handleGetThresholds);
   server.on("/thresholds", HTTP_POST, handleUpdateThresholds);
   server.on("/metrics", HTTP_GET, handleMetrics);
@@ -292,6 +314,46 @@ void handleRoot() {
   server.send(200, "text/html", html);
 }
 
+void applyMetrics(JsonObject doc) {
+  // Extract the metrics
+  if (doc.containsKey("cpu_temp")) {
+    if (doc["cpu_temp"] == "N/A") {
+      cpu_temp_str = "N/A";
+    } else {
+      cpu_temp = doc["cpu_temp"].as<float>();
+      cpu_temp_str = String(cpu_temp, 1);
+    }
+  }
+  
+  if (doc.containsKey("cpu_usage")) {
+    cpu_usage = doc["cpu_usage"].as<float>();
+  }
+  
+  if (doc.containsKey("ram_usage")) {
+    ram_usage = doc["ram_usage"].as<float>();
+  }
+  
+  if (doc.containsKey("gpu_temp")) {
+    if (doc["gpu_temp"] == "N/A") {
+      gpu_temp_str = "N/A";
+    } else {
+      gpu_temp = doc["gpu_temp"].as<float>();
+      gpu_temp_str = String(gpu_temp, 1);
+    }
+  }
+  
+  if (doc.containsKey("gpu_usage")) {
+    gpu_usage = doc["gpu_usage"].as<float>();
+  }
+  
+  lastUpdateTime = millis();
+  // Update the display with new metrics
+  updateMetricsDisplay();
+  
+  // Check if any thresholds are exceeded
+  checkThresholds();
+}
+
 void handleUpdate() {
   String message = "";
   
@@ -304,43 +366,14 @@ void handleUpdate() {
     DeserializationError error = deserializeJson(doc, message);
     
     if (!error) {
-      // Extract the metrics
-      if (doc.containsKey("cpu_temp")) {
-        if (doc["cpu_temp"] == "N/A") {
-          cpu_temp_str = "N/A";
-        } else {
-          cpu_temp = doc["cpu_temp"].as<float>();
-          cpu_temp_str = String(cpu_temp, 1);
-        }
+      // HTTP pushes are authoritative: resync the UDP sequence to them
+      if (doc.containsKey("seq")) {
+        udpSessionId = doc["sid"] | 0;
+        lastUdpSeq = doc["seq"] | 0;
+        udpSeqValid = true;
       }
       
-      if (doc.containsKey("cpu_usage")) {
-        cpu_usage = doc["cpu_usage"].as<float>();
-      }
-      
-      if (doc.containsKey("ram_usage")) {
-        ram_usage = doc["ram_usage"].as<float>();
-      }
-      
-      if (doc.containsKey("gpu_temp")) {
-        if (doc["gpu_temp"] == "N/A") {
-          gpu_temp_str = "N/A";
-        } else {
-          gpu_temp = doc["gpu_temp"].as<float>();
-          gpu_temp_str = String(gpu_temp, 1);
-        }
-      }
-      
-      if (doc.containsKey("gpu_usage")) {
-        gpu_usage = doc["gpu_usage"].as<float>();
-      }
-      
-      lastUpdateTime = millis();
-      // Update the display with new metrics
-      updateMetricsDisplay();
-      
-      // Check if any thresholds are exceeded
-      checkThresholds();
+      applyMetrics(doc.as<JsonObject>());
       
       // Respond with success
       server.send(200, "text/plain", "OK");
@@ -353,6 +386,89 @@ void handleUpdate() {
   }
 }
 
+void handleUdpPacket() {
+  int packetSize = udp.parsePacket();
+  if (packetSize <= 0) {
+    return;
+  }
+  
+  char packet[256];
+  int len = udp.read(packet, sizeof(packet) - 1);
+  if (len <= 0) {
+    return;
+  }
+  packet[len] = '\0';
+  
+  DynamicJsonDocument doc(512);
+  if (deserializeJson(doc, packet)) {
+    Serial.println("Failed to parse UDP frame");
+    return;
+  }
+  
+  uint32_t sid = doc["sid"] | 0;
+  uint32_t seq = doc["seq"] | 0;
+  
+  // Drop duplicate or out-of-order frames from the same sender session.
+  // The signed difference keeps the comparison correct across wraparound.
+  if (udpSeqValid && sid == udpSessionId && (int32_t)(seq - lastUdpSeq) <= 0) {
+    return;
+  }
+  
+  udpSessionId = sid;
+  lastUdpSeq = seq;
+  udpSeqValid = true;
+  
+  applyMetrics(doc.as<JsonObject>());
+}
+
+void handleUpdateBatch() {
+  if (!server.hasArg("plain")) {
+    server.send(400, "text/plain", "Bad Request: No data");
+    return;
+  }
+  
+  const String& body = server.arg("plain");
+  if (body.length() > BATCH_MAX_BYTES) {
+    server.send(413, "text/plain", "Payload Too Large: at most " + String(BATCH_MAX_BYTES) + " bytes per batch");
+    return;
+  }
+  
+  // Size the document from the body: one object per '{', and its strings are
+  // copied in, so they never take more than the body itself
+  size_t objects = 0;
+  for (size_t i = 0; i < body.length(); i++) {
+    if (body[i] == '{') {
+      objects++;
+    }
+  }
+  if (objects > BATCH_MAX_SAMPLES) {
+    server.send(413, "text/plain", "Payload Too Large: at most " + String(BATCH_MAX_SAMPLES) + " samples per batch");
+    return;
+  }
+  DynamicJsonDocument doc(JSON_ARRAY_SIZE(objects) + objects * JSON_OBJECT_SIZE(BATCH_SAMPLE_FIELDS) + body.length());
+  if (doc.capacity() == 0) {
+    server.send(503, "text/plain", "Service Unavailable: Out of memory");
+    return;
+  }
+  
+  // Only JSON batches are accepted here; the binary encoding is for host-side receivers
+  DeserializationError error = deserializeJson(doc, body);
+  if (error == DeserializationError::NoMemory) {
+    server.send(413, "text/plain", "Payload Too Large: Batch does not fit in memory");
+    return;
+  }
+  if (error || !doc.is<JsonArray>() || doc.size() == 0) {
+    server.send(400, "text/plain", "Bad Request: Expected a JSON array of samples");
+    return;
+  }
+  
+  // The display only shows the newest reading; older samples are history for other sinks
+  JsonArray samples = doc.as<JsonArray>();
+  applyMetrics(samples[samples.size() - 1].as<JsonObject>());
+  
+  server.send(200, "text/plain", "OK");
+}
+
 void handleGetThresholds() {
   DynamicJsonDocument doc(1024);
   
@@ -763,6 +879,7 @@ void updateMetricsWithNA() {
 
 void loop() {
   server.handleClient();
+  handleUdpPacket();
   
   // Check if we've lost connection to the PC
   if (millis() - lastUpdateTime > 10000) { // 10 seconds timeout
@@ -26,20 +26,28 @@ import psutil
 LIBRARY_PATH = "E:\\vscode\\simple-system-monitor\\library"
 OHM_ZIP_URL = "https://openhardwaremonitor.org/files/openhardwaremonitor-v0.9.6.zip"
 NODEMCU_IP = "192.168.0.150"  # CHANGE THIS TO YOUR NODEMCU's IP
+OHM_READY_TIMEOUT = 60  # seconds to wait for the OHM web server
 
 
-def check_ohm_remote_server():
-    """Check if OHM Remote Server is enabled."""
-    try:
-        r = requests.get("http://localhost:8085/data.json", timeout=2)
-        if r.status_code == 200:
-            print("✅ OHM remote server is running!")
-            return True
-    except:
-        pass
+def check_ohm_remote_server(timeout=OHM_READY_TIMEOUT):
+    """Wait for the OHM Remote Server, polling with exponential backoff."""
+    deadline = time.monotonic() + timeout
+    delay = 0.05
+    while True:
+        try:
+            r = requests.get("http://localhost:8085/data.json", timeout=2)
+            if r.status_code == 200:
+                print("✅ OHM remote server is running!")
+                return True
+        except:
+            pass
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        time.sleep(min(delay, remaining))
+        delay = min(delay * 2, 0.5)
     print("❌ OHM remote server is not responding. Please open OHM, go to 'Options > Remote Web Server' and enable it.")
-    input("Press Enter once the server is enabled...")
-    return check_ohm_remote_server()
+    return False
 
 
 def download_ohm():
@@ -120,7 +128,6 @@ def run_ohm():
         print("🚀 Launching OpenHardwareMonitor...")
         try:
             os.startfile(ohm_exe)
-            time.sleep(2)
         except Exception as e:
             print(f"❌ Failed to launch OHM: {e}")
     else:
@@ -176,7 +183,6 @@ zip_path = download_ohm()
 if zip_path:
     extract_ohm(zip_path)
     run_ohm()
-    time.sleep(5)
 
     if check_ohm_remote_server():
         cpu, gpu = get_temperatures_from_json()
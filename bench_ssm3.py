@@ -0,0 +1,236 @@
+"""Benchmarks for the collector's OHM parsing path and startup, driven by the ohm_data.json fixture.
+
+Every stage is measured on the fixture as captured and on synthetic trees with
+10x and 100x the hardware nodes:
+
+    parse         json.loads of the raw data.json bytes
+    index         build_sensor_index (flat view of every leaf sensor)
+    temperatures  resolve_temperatures (CPU/GPU temperature roles)
+    cpu_load      resolve_cpu_load
+    ram_usage     resolve_ram_usage
+    gpu_load      resolve_gpu_load
+    derived       DerivedMetrics.update with every sensor (EWMA, window, rate state)
+    alerts        AlertEngine.evaluate with a value and a rate rule on every sensor
+    anomaly       AnomalyDetector.update with every sensor (baselines already trained)
+    full_cycle    parse + index + every role resolver
+
+Startup is measured in fresh interpreters and checked against a fixed budget
+as well as the baseline:
+
+    startup/import        python -c "import ssm.cli"
+    startup/first_sample  launching ssm3.py until its first update reaches a
+                          stub NodeMCU (OHM and the NodeMCU are ssm_sim stubs)
+
+Usage:
+    python bench_ssm3.py                # print the results table
+    python bench_ssm3.py --save         # record the results as the baseline
+    python bench_ssm3.py --check        # exit 1 if any stage regressed or startup is over budget
+"""
+import argparse
+import copy
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURE_PATH = os.path.join(BENCH_DIR, "ohm_data.json")
+BASELINE_PATH = os.path.join(BENCH_DIR, "bench_baseline.json")
+SCALES = (1, 10, 100)
+REPEAT = 5
+DEFAULT_TOLERANCE = 0.25  # allowed slowdown before --check fails
+NOISE_FLOOR = 50e-6  # slowdowns smaller than this many seconds per call are jitter
+STARTUP_RUNS = 5
+STARTUP_BUDGETS = {  # seconds; --check fails above these whatever the baseline says
+    'startup/import': 0.25,
+    'startup/first_sample': 1.5,
+}
+
+
+def import_collector():
+    """Import the OHM parsing module with collector logging quietened."""
+    from ssm import logs, ohm
+    logs.logger.setLevel(logging.WARNING)
+    return ohm
+
+
+def scale_tree(data, factor):
+    """Copy the OHM tree with every hardware node under each host repeated `factor` times."""
+    scaled = copy.deepcopy(data)
+    if factor == 1:
+        return scaled
+    for host in scaled.get('Children', []):
+        hardware = host.get('Children', [])
+        copies = []
+        for n in range(1, factor):
+            for node in hardware:
+                clone = copy.deepcopy(node)
+                clone['Text'] = f"{clone.get('Text', '')} #{n + 1}"
+                copies.append(clone)
+        host['Children'] = hardware + copies
+    return scaled
+
+
+def time_stage(func):
+    """Best per-call time in seconds over REPEAT rounds of an auto-ranged loop."""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(REPEAT, number)) / number
+
+
+def run_benchmarks(ohm, fixture):
+    from ssm.alerts import AlertEngine, AlertRule
+    from ssm.anomaly import AnomalyDetector
+    from ssm.derived import DerivedMetrics
+
+    results = {}
+    resolvers = {
+        'temperatures': ohm.resolve_temperatures,
+        'cpu_load': ohm.resolve_cpu_load,
+        'ram_usage': ohm.resolve_ram_usage,
+        'gpu_load': ohm.resolve_gpu_load,
+    }
+
+    for factor in SCALES:
+        raw = json.dumps(scale_tree(fixture, factor)).encode()
+        data = json.loads(raw)
+
+        def full_cycle():
+            tree = json.loads(raw)
+            ohm.build_sensor_index(tree)
+            for resolve in resolvers.values():
+                resolve(tree)
+
+        stages = {
+            'parse': lambda: json.loads(raw),
+            'index': lambda: ohm.build_sensor_index(data),
+        }
+        for name, resolve in resolvers.items():
+            stages[name] = lambda resolve=resolve: resolve(data)
+        stages['full_cycle'] = full_cycle
+
+        engine = DerivedMetrics()
+        index = ohm.build_sensor_index(data)
+        clock = iter(range(10**9))
+        stages['derived'] = lambda: engine.update(float(next(clock)), index)
+
+        # Thresholds nothing reaches, so this measures the steady-state check
+        engine.update(-1.0, index)
+        rules = [AlertRule('hot', '*', group='sensors', above=1e9),
+                 AlertRule('climb', '*', group='sensors', stat='rate', above=1e9)]
+        alerting = AlertEngine(rules, {'sensors': engine})
+        stages['alerts'] = lambda: alerting.evaluate(0.0)
+
+        detector = AnomalyDetector()
+        for t in range(detector.warmup):
+            detector.update(float(t), index)
+        stages['anomaly'] = lambda: detector.update(0.0, index)
+
+        sensors = len(ohm.build_sensor_index(data))
+        for name, func in stages.items():
+            results[f"{factor}x/{name}"] = time_stage(func)
+        print(f"📊 {factor}x tree: {len(raw) / 1024:.0f} KiB, {sensors} sensors")
+    return results
+
+
+def measure_startup():
+    """Best-of-STARTUP_RUNS cold start times, each in a fresh interpreter."""
+    from ssm_sim import StubNodeMcu, StubOhmServer
+
+    results = {}
+    imports = []
+    for _ in range(STARTUP_RUNS):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', 'import ssm.cli'], cwd=BENCH_DIR, check=True)
+        imports.append(time.perf_counter() - start)
+    results['startup/import'] = min(imports)
+
+    ohm = StubOhmServer(('127.0.0.1', 0)).start()
+    nodemcu = StubNodeMcu(('127.0.0.1', 0), udp_port=None).start()
+    command = [sys.executable, os.path.join(BENCH_DIR, "ssm3.py"), '--verbosity', '0',
+               '--ip', f"127.0.0.1:{nodemcu.server_port}",
+               '--ohm-url', f"http://127.0.0.1:{ohm.server_port}/data.json"]
+    first_samples = []
+    # The collector writes ohm_data.json to its working directory, so keep it away from the fixture
+    with tempfile.TemporaryDirectory() as workdir:
+        for _ in range(STARTUP_RUNS):
+            del nodemcu.update_times[:]
+            start = time.time()
+            collector = subprocess.Popen(command, cwd=workdir, stdout=subprocess.DEVNULL)
+            try:
+                while not nodemcu.update_times and time.time() - start < 30:
+                    time.sleep(0.005)
+            finally:
+                collector.terminate()
+                collector.wait(timeout=10)
+            if nodemcu.update_times:
+                first_samples.append(nodemcu.update_times[0] - start)
+    ohm.shutdown()
+    nodemcu.shutdown()
+    results['startup/first_sample'] = min(first_samples) if first_samples else float('inf')
+    return results
+
+
+def print_table(results, baseline=None):
+    header = f"{'stage':<24}{'ms/call':>12}"
+    if baseline:
+        header += f"{'baseline':>12}{'change':>10}"
+    print(header)
+    for key, seconds in results.items():
+        line = f"{key:<24}{seconds * 1e3:>12.3f}"
+        if baseline and key in baseline:
+            change = seconds / baseline[key] - 1
+            line += f"{baseline[key] * 1e3:>12.3f}{change:>+10.1%}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the collector OHM parsing path and startup')
+    parser.add_argument('--save', action='store_true', help='Record these results as the baseline')
+    parser.add_argument('--check', action='store_true', help='Fail if any stage regressed vs the baseline')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help=f'Baseline file (default: {BASELINE_PATH})')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help=f'Allowed slowdown as a fraction (default: {DEFAULT_TOLERANCE})')
+    args = parser.parse_args()
+
+    ohm = import_collector()
+    with open(FIXTURE_PATH, "r", encoding="utf-8") as f:
+        fixture = json.load(f)
+
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+
+    results = run_benchmarks(ohm, fixture)
+    results.update(measure_startup())
+    print_table(results, baseline)
+
+    if args.save:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Baseline saved to {args.baseline}")
+
+    if args.check:
+        if not baseline:
+            print(f"❌ No baseline at {args.baseline}; run with --save first")
+            return 2
+        regressions = [key for key, seconds in results.items()
+                       if key in baseline
+                       and seconds > baseline[key] * (1 + args.tolerance)
+                       and seconds - baseline[key] > NOISE_FLOOR]
+        regressions += [f"{key} ({results[key] * 1e3:.0f} ms, budget {budget * 1e3:.0f} ms)"
+                        for key, budget in STARTUP_BUDGETS.items() if results[key] > budget]
+        if regressions:
+            print(f"❌ Regressed beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+            return 1
+        print("✅ No regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
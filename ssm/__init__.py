@@ -0,0 +1,7 @@
+"""IT Infrastructure Monitoring: collects hardware metrics and pushes them to a NodeMCU display.
+
+Modules are kept free of import-time side effects, and heavy or platform
+specific dependencies (requests, psutil, wmi, zipfile) are imported on first
+use, so importing any part of the package is cheap. Run the collector with
+``python -m ssm`` or ``python ssm3.py``.
+"""
@@ -0,0 +1,5 @@
+from ssm.cli import main
+
+# Guarded so that fleet worker processes (spawned, re-importing __main__) do not start a collector
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,388 @@
+"""Host-side alert rules: thresholds, rates of change and sustained conditions.
+
+Rules are JSON objects, read from the file given with --alert-rules:
+
+    {"name": "cpu-hot", "series": "cpu_temp", "above": 80, "clear": 75, "for": 30}
+    {"name": "temp-climb", "group": "sensors", "series": "*/Temperatures/*",
+     "stat": "rate", "above": 10, "cooldown": 600}
+
+    group     "display" (the five NodeMCU metrics, default) or "sensors" (every
+              OHM sensor, keyed by its sensor index path)
+    series    series name, or an fnmatch pattern expanded over the group
+    stat      "value" (this sample, default), "ewma" or "rate" (per minute)
+    above / below
+              the trigger threshold
+    clear     where a firing alert resolves (hysteresis); defaults to
+              ALERT_HYSTERESIS of the threshold back from it
+    for       seconds the condition must hold before the alert fires
+    cooldown  seconds after a notification during which the same rule and
+              series is not notified again
+
+Each rule is expanded into one instance per matching series. Instances are
+bucketed by (group, stat, direction), and a bucket is checked with a single
+C-level gather (operator.itemgetter over the group's value array) and a
+single map(operator.gt/lt) against per-instance thresholds. An instance's
+threshold is its trigger while idle and its clear level while firing, so
+hysteresis costs nothing per cycle. Python-level work only happens for
+instances whose condition changed this cycle and for those waiting out `for`.
+"""
+import json
+import math
+import threading
+from fnmatch import fnmatchcase
+from itertools import compress
+from operator import gt, itemgetter, lt, ne
+
+from ssm.logs import log
+from ssm.stats import timed
+
+ALERT_HYSTERESIS = 0.05  # default clear level, as a fraction of the threshold
+ALERT_COOLDOWN = 60.0  # seconds; the firmware's NOTIFICATION_COOLDOWN
+ALERT_STATS = ('value', 'ewma', 'rate')
+ALERT_GROUPS = ('display', 'sensors')
+
+# The firmware's default thresholds, used when no rules file is given
+DEFAULT_RULES = [
+    {'name': 'cpu_temp', 'series': 'cpu_temp', 'above': 80.0},
+    {'name': 'cpu_usage', 'series': 'cpu_usage', 'above': 90.0},
+    {'name': 'ram_usage', 'series': 'ram_usage', 'above': 90.0},
+    {'name': 'gpu_temp', 'series': 'gpu_temp', 'above': 80.0},
+    {'name': 'gpu_usage', 'series': 'gpu_usage', 'above': 90.0},
+]
+
+# Called with each event dict the engine emits (firing and resolved)
+alert_listeners = []
+
+
+class AlertRule:
+    """One rule as configured; see the module docstring for the fields."""
+
+    def __init__(self, name, series, above=None, below=None, clear=None, group='display',
+                 stat='value', for_=0.0, cooldown=ALERT_COOLDOWN, severity='warning'):
+        if (above is None) == (below is None):
+            raise ValueError(f"rule {name!r} needs exactly one of 'above' or 'below'")
+        if group not in ALERT_GROUPS:
+            raise ValueError(f"rule {name!r}: group must be one of {', '.join(ALERT_GROUPS)}")
+        if stat not in ALERT_STATS:
+            raise ValueError(f"rule {name!r}: stat must be one of {', '.join(ALERT_STATS)}")
+        self.name = name
+        self.series = series
+        self.group = group
+        self.stat = stat
+        self.above = above is not None
+        self.threshold = float(above if self.above else below)
+        margin = abs(self.threshold) * ALERT_HYSTERESIS
+        if clear is None:
+            clear = self.threshold - margin if self.above else self.threshold + margin
+        self.clear = float(clear)
+        if (self.clear > self.threshold) if self.above else (self.clear < self.threshold):
+            raise ValueError(f"rule {name!r}: 'clear' must be on the idle side of the threshold")
+        self.for_ = float(for_)
+        self.cooldown = float(cooldown)
+        self.severity = severity
+
+    @classmethod
+    def from_dict(cls, spec):
+        spec = dict(spec)
+        if 'for' in spec:
+            spec['for_'] = spec.pop('for')
+        return cls(**spec)
+
+    def matches(self, name):
+        return name == self.series or fnmatchcase(name, self.series)
+
+
+def load_rules(path=None):
+    """Rules from a JSON file (a list of rule objects), or DEFAULT_RULES without one.
+
+    Invalid rules are logged and skipped.
+    """
+    specs = DEFAULT_RULES
+    if path:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                specs = json.load(f)
+        except (OSError, ValueError) as e:
+            log(f"Could not read alert rules from {path}: {e}", "ERROR")
+            return []
+    rules = []
+    for spec in specs:
+        try:
+            rules.append(AlertRule.from_dict(spec))
+        except (TypeError, ValueError) as e:
+            log(f"Skipping alert rule {spec!r}: {e}", "ERROR")
+    return rules
+
+
+class _Bucket:
+    """Instances checked together: same group, stat and direction."""
+
+    def __init__(self, group, stat, op, indexes, slots, trigger, clear, size):
+        self.group = group
+        self.stat = stat
+        self.op = op
+        self.indexes = indexes  # engine instance index per position
+        self.trigger = trigger
+        self.clear = clear
+        self.effective = list(trigger)  # trigger while idle, clear level while firing
+        self.cond = [False] * len(indexes)
+        self.values = [math.nan] * len(indexes)
+        if slots == list(range(size)):
+            # Every series of the group in slot order: check the source as it is
+            self.gather = lambda source: source
+        elif len(slots) == 1:
+            slot = slots[0]
+            self.gather = lambda source: (source[slot],)
+        else:
+            self.gather = itemgetter(*slots)
+
+
+class AlertEngine:
+    """Evaluates alert rules against DerivedMetrics groups once per cycle.
+
+    `groups` maps group name -> DerivedMetrics. Rules are compiled against the
+    series each group holds, and recompiled when a group gains series; the
+    state of existing instances survives recompilation.
+    """
+
+    def __init__(self, rules, groups):
+        self.rules = list(rules)
+        self.groups = groups
+        self.compiled_sizes = None
+        self.buckets = []
+        self.keys = []  # (rule name, series) per instance
+        self.instance_rules = []
+        self.units = []
+        self.active = []
+        self.since = []  # when the condition started holding (pending or firing)
+        self.notified = []  # whether the current firing was notified
+        self.last_notified = []
+        self.pending = {}  # instance -> (bucket, position) while waiting out `for`
+        self.fired_total = {}  # rule name -> firings, notified or not
+        self.suppressed_total = {}  # rule name -> firings held back by the cooldown
+        self.events = []
+        self.next_rules = None  # set by set_rules from another thread, applied by evaluate
+        # Held by evaluate and compile; readers on other threads copy the state under it
+        self.lock = threading.RLock()
+
+    def set_rules(self, rules):
+        """Replace the rules from any thread; the next evaluate recompiles, keeping state."""
+        self.next_rules = list(rules)
+
+    def _group_sizes(self):
+        return {name: len(group) for name, group in self.groups.items() if group is not None}
+
+    def compile(self):
+        """Expand the rules over the groups' series and rebuild the buckets."""
+        with self.lock:
+            self._compile()
+
+    def _compile(self):
+        previous = {key: i for i, key in enumerate(self.keys)}
+        old = (self.active, self.since, self.notified, self.last_notified)
+        was_pending = {self.keys[i] for i in self.pending}
+
+        keys, instance_rules, units, grouped = [], [], [], {}
+        for rule in self.rules:
+            group = self.groups.get(rule.group)
+            if group is None:
+                continue
+            for name in group.names:
+                if rule.matches(name):
+                    entry = grouped.setdefault((rule.group, rule.stat, rule.above), ([], [], [], []))
+                    entry[0].append(len(keys))
+                    entry[1].append(group.slots[name])
+                    entry[2].append(rule.threshold)
+                    entry[3].append(rule.clear)
+                    keys.append((rule.name, name))
+                    instance_rules.append(rule)
+                    units.append(group.units[group.slots[name]])
+
+        count = len(keys)
+        self.keys = keys
+        self.instance_rules = instance_rules
+        self.units = units
+        self.active = [False] * count
+        self.since = [math.nan] * count
+        self.notified = [False] * count
+        self.last_notified = [-math.inf] * count
+        self.pending = {}
+        self.buckets = []
+        for (group, stat, above), (indexes, slots, trigger, clear) in grouped.items():
+            bucket = _Bucket(group, stat, gt if above else lt, indexes, slots, trigger, clear,
+                             len(self.groups[group]))
+            for position, i in enumerate(indexes):
+                j = previous.get(keys[i])
+                if j is None:
+                    continue
+                self.active[i], self.since[i], self.notified[i], self.last_notified[i] = (
+                    state[j] for state in old)
+                if self.active[i]:
+                    bucket.effective[position] = clear[position]
+                    bucket.cond[position] = True
+                elif keys[i] in was_pending:
+                    bucket.cond[position] = True
+                    self.pending[i] = (bucket, position)
+            self.buckets.append(bucket)
+        self.compiled_sizes = self._group_sizes()
+        log("Compiled %d alert rules into %d checks in %d buckets", "DEBUG",
+            len(self.rules), count, len(self.buckets))
+
+    def _source(self, group, stat):
+        metrics = self.groups[group]
+        if stat == 'value':
+            return metrics.current()
+        if stat == 'ewma':
+            return metrics.ewma
+        return metrics.rates()
+
+    @timed("alerts")
+    def evaluate(self, now):
+        """Check every rule against the latest samples. Returns this cycle's events."""
+        with self.lock:
+            events = self._evaluate(now)
+        # Outside the lock: listeners may be slow or read the engine themselves
+        for event in events:
+            for listener in alert_listeners:
+                listener(event)
+        return events
+
+    def _evaluate(self, now):
+        if self.next_rules is not None:
+            self.rules, self.next_rules = self.next_rules, None
+            self.compiled_sizes = None
+        if self.compiled_sizes != self._group_sizes():
+            self._compile()
+        self.events = []
+        sources = {}
+        for bucket in self.buckets:
+            source = sources.get((bucket.group, bucket.stat))
+            if source is None:
+                source = sources[(bucket.group, bucket.stat)] = self._source(bucket.group, bucket.stat)
+            values = bucket.gather(source)
+            cond = list(map(bucket.op, values, bucket.effective))
+            bucket.values = values
+            if cond == bucket.cond:
+                continue
+            previous = bucket.cond
+            for position in compress(range(len(cond)), map(ne, cond, previous)):
+                value = values[position]
+                if value != value:
+                    # A gap says nothing about the condition; keep the current state
+                    cond[position] = previous[position]
+                    continue
+                self._transition(bucket, position, cond[position], now)
+            bucket.cond = cond
+
+        for i, (bucket, position) in list(self.pending.items()):
+            if now - self.since[i] >= self.instance_rules[i].for_:
+                del self.pending[i]
+                self._fire(bucket, position, now)
+        return self.events
+
+    def _transition(self, bucket, position, holds, now):
+        i = bucket.indexes[position]
+        if holds:
+            self.since[i] = now
+            if self.instance_rules[i].for_ > 0:
+                self.pending[i] = (bucket, position)
+            else:
+                self._fire(bucket, position, now)
+        elif self.pending.pop(i, None) is not None:
+            self.since[i] = math.nan
+        elif self.active[i]:
+            self.active[i] = False
+            self.since[i] = math.nan
+            bucket.effective[position] = bucket.trigger[position]
+            if self.notified[i]:
+                self.notified[i] = False
+                self._emit('resolved', bucket, position, now)
+
+    def _fire(self, bucket, position, now):
+        i = bucket.indexes[position]
+        rule = self.instance_rules[i]
+        self.active[i] = True
+        bucket.effective[position] = bucket.clear[position]
+        self.fired_total[rule.name] = self.fired_total.get(rule.name, 0) + 1
+        if now - self.last_notified[i] < rule.cooldown:
+            self.suppressed_total[rule.name] = self.suppressed_total.get(rule.name, 0) + 1
+            return
+        self.notified[i] = True
+        self.last_notified[i] = now
+        self._emit('firing', bucket, position, now)
+
+    def _emit(self, state, bucket, position, now):
+        i = bucket.indexes[position]
+        rule = self.instance_rules[i]
+        self.events.append({
+            'state': state,
+            'rule': rule.name,
+            'series': self.keys[i][1],
+            'stat': rule.stat,
+            'value': bucket.values[position],
+            'unit': self.units[i],
+            'threshold': rule.threshold if state == 'firing' else rule.clear,
+            'direction': 'above' if rule.above else 'below',
+            'severity': rule.severity,
+            'time': now,
+        })
+
+    def snapshot(self):
+        """Firing and pending instances plus counters, for the /alerts route."""
+        def describe(i):
+            rule_name, series = self.keys[i]
+            return {'rule': rule_name, 'series': series, 'since': self.since[i]}
+
+        with self.lock:
+            return {
+                'rules': len(self.rules),
+                'checks': len(self.keys),
+                'firing': [describe(i) for i, active in enumerate(self.active) if active],
+                'pending': [describe(i) for i in self.pending],
+                'fired_total': dict(self.fired_total),
+                'suppressed_total': dict(self.suppressed_total),
+            }
+
+    def series_states(self):
+        """series -> ('firing' | 'pending', rule name), firing winning over pending."""
+        with self.lock:
+            states = {self.keys[i][1]: ('pending', self.keys[i][0]) for i in self.pending}
+            for i, active in enumerate(self.active):
+                if active:
+                    states[self.keys[i][1]] = ('firing', self.keys[i][0])
+            return states
+
+    def format_prometheus(self):
+        """Firing instances as a gauge and per-rule firing counters."""
+        def escape(text):
+            return text.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+        with self.lock:
+            firing = [self.keys[i] for i, active in enumerate(self.active) if active]
+            fired_total = sorted(self.fired_total.items())
+            suppressed_total = sorted(self.suppressed_total.items())
+        lines = ["# TYPE ssm3_alert_firing gauge"]
+        for rule_name, series in firing:
+            lines.append(f'ssm3_alert_firing{{rule="{escape(rule_name)}",series="{escape(series)}"}} 1')
+        lines.append("# TYPE ssm3_alerts_fired_total counter")
+        for rule_name, count in fired_total:
+            lines.append(f'ssm3_alerts_fired_total{{rule="{escape(rule_name)}"}} {count}')
+        lines.append("# TYPE ssm3_alerts_suppressed_total counter")
+        for rule_name, count in suppressed_total:
+            lines.append(f'ssm3_alerts_suppressed_total{{rule="{escape(rule_name)}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+
+def log_alert(event):
+    """Default alert listener: firing alerts as warnings, resolutions as successes."""
+    label = f"{event['rule']} ({event['series']})" if event['rule'] != event['series'] else event['rule']
+    stat = "" if event['stat'] == 'value' else f" {event['stat']}"
+    if event['state'] == 'firing':
+        log("ALERT %s:%s %.1f is %s %g", "WARNING", label, stat, event['value'],
+            event['direction'], event['threshold'], key=f"alert:{label}")
+    else:
+        log("Resolved %s:%s back to %.1f", "SUCCESS", label, stat, event['value'], key=f"alert:{label}")
+
+
+# The collector's engine, set up by the CLI
+engine = None
@@ -0,0 +1,244 @@
+"""Online anomaly detection over every OHM sensor, with baselines conditioned on CPU load.
+
+A fixed threshold cannot tell a fan slowly losing RPM or a CPU running hotter
+than it used to at the same load. The detector keeps, for every sensor and
+every CPU load bin (the host's "Load/CPU Total" split into ANOMALY_LOAD_BINS
+bands), a robust baseline of that sensor's usual value at that load:
+
+    median / MAD   tracked with sign-based stochastic updates, so a single
+                   outlier moves the baseline by at most one small step;
+                   outlying samples move it ten times more slowly still
+    mean / std     exponentially weighted, reported alongside
+
+Memory is bounded: a handful of numbers per (sensor, bin) in flat arrays,
+plus a warm-up buffer of ANOMALY_WARMUP samples that seeds the exact median
+and MAD and is then dropped. Each sample is scored with the modified
+z-score 0.6745 * (x - median) / MAD before it updates the baseline, and a
+sensor is flagged once |score| stays above the threshold for
+ANOMALY_CONSECUTIVE samples in a row.
+"""
+import math
+import threading
+from array import array
+from statistics import median
+
+from ssm.logs import log
+from ssm.options import ANOMALY_THRESHOLD
+from ssm.stats import timed
+
+ANOMALY_LOAD_BINS = 10  # 10%-wide CPU load bands
+ANOMALY_WARMUP = 30  # samples in a (sensor, bin) before it is scored
+ANOMALY_CONSECUTIVE = 3  # outlying samples in a row before a sensor is flagged
+ANOMALY_RATE = 0.01  # baseline step per sample, as a fraction of the current spread
+ANOMALY_OUTLIER_RATE = 0.001  # the same for outlying samples, so a lasting change is learnt slowly
+ANOMALY_ALPHA = 0.02  # EWMA weight for the reported mean/std
+MAD_TO_SIGMA = 1.4826
+LOAD_SERIES_SUFFIX = "/Load/CPU Total"
+
+# Smallest spread a baseline may claim, so a sensor that has sat on one
+# reading does not turn its next quantisation step into an anomaly
+ANOMALY_MIN_SPREAD = {
+    '°C': 0.5,
+    '%': 1.0,
+    'V': 0.01,
+    'W': 1.0,
+    'RPM': 25.0,
+    'MHz': 25.0,
+    'MB/s': 1.0,
+    'MB': 16.0,
+    'GB': 0.1,
+}
+
+
+class AnomalyDetector:
+    """Per-sensor, per-load-bin robust baselines scored against every new sample."""
+
+    def __init__(self, threshold=ANOMALY_THRESHOLD, bins=ANOMALY_LOAD_BINS, warmup=ANOMALY_WARMUP,
+                 consecutive=ANOMALY_CONSECUTIVE):
+        self.threshold = threshold
+        self.bins = bins
+        self.warmup = warmup
+        self.consecutive = consecutive
+        self.names = []
+        self.slots = {}  # sensor path -> slot
+        self.hosts = []  # per slot: the host its path starts with
+        self.min_spread = array('d')  # per slot, from the unit
+        self.streak = array('l')  # per slot: outlying samples in a row
+        # Per (slot, bin), at slot * bins + bin
+        self.count = array('l')
+        self.median = array('d')
+        self.mad = array('d')
+        self.mean = array('d')
+        self.var = array('d')
+        self.warming = {}  # (slot, bin) index -> warm-up samples, dropped once seeded
+        self.load_series = {}  # host -> path of its CPU Total load sensor
+        self.load_bins = {}  # host -> load bin of the current sample
+        self.flagged = {}  # slot -> details of the current anomaly
+        self.flagged_total = 0
+        self.lock = threading.Lock()  # held by update and the readers on the stats server thread
+
+    def __len__(self):
+        return len(self.names)
+
+    def _add_series(self, name, unit):
+        slot = len(self.names)
+        self.names.append(name)
+        self.slots[name] = slot
+        host = name.split('/', 1)[0]
+        self.hosts.append(host)
+        if name.endswith(LOAD_SERIES_SUFFIX):
+            self.load_series.setdefault(host, name)
+        self.min_spread.append(ANOMALY_MIN_SPREAD.get(unit, 0.0))
+        self.streak.append(0)
+        self.count.extend([0] * self.bins)
+        self.median.extend([0.0] * self.bins)
+        self.mad.extend([0.0] * self.bins)
+        self.mean.extend([0.0] * self.bins)
+        self.var.extend([0.0] * self.bins)
+        return slot
+
+    def _update_load_bins(self, readings):
+        bins = self.bins
+        self.load_bins = {}
+        for host, name in self.load_series.items():
+            reading = readings.get(name)
+            if reading is None:
+                continue
+            load = reading[0] if isinstance(reading, tuple) else reading
+            if isinstance(load, (int, float)) and load == load:
+                self.load_bins[host] = min(bins - 1, max(0, int(load * bins / 100.0)))
+
+    def _seed(self, k, samples):
+        """Start the streaming baseline from the exact statistics of the warm-up samples."""
+        centre = median(samples)
+        self.median[k] = centre
+        self.mad[k] = median(abs(x - centre) for x in samples)
+        mean = math.fsum(samples) / len(samples)
+        self.mean[k] = mean
+        self.var[k] = math.fsum((x - mean) ** 2 for x in samples) / len(samples)
+
+    @timed("anomaly")
+    def update(self, timestamp, readings):
+        """Score and learn from one snapshot: `readings` maps path -> value or (value, unit).
+
+        Returns the sensors newly flagged by this sample.
+        """
+        with self.lock:
+            return self._update(timestamp, readings)
+
+    def _update(self, timestamp, readings):
+        if not self.load_series:
+            for name in readings:
+                if name.endswith(LOAD_SERIES_SUFFIX):
+                    self.load_series.setdefault(name.split('/', 1)[0], name)
+        self._update_load_bins(readings)
+
+        bins = self.bins
+        load_bins = self.load_bins
+        count, med, mad, mean, var = self.count, self.median, self.mad, self.mean, self.var
+        slots, hosts, min_spread, streak = self.slots, self.hosts, self.min_spread, self.streak
+        threshold = self.threshold
+        warmup = self.warmup
+        flagged_now = []
+        for name, reading in readings.items():
+            value, unit = reading if isinstance(reading, tuple) else (reading, '')
+            slot = slots.get(name)
+            if slot is None:
+                slot = self._add_series(name, unit)
+            if not isinstance(value, (int, float)) or value != value:
+                continue
+            load_bin = load_bins.get(hosts[slot], 0)
+            k = slot * bins + load_bin
+            n = count[k]
+            count[k] = n + 1
+            if n < warmup:
+                samples = self.warming.setdefault(k, [])
+                samples.append(value)
+                if n + 1 == self.warmup:
+                    self._seed(k, samples)
+                    del self.warming[k]
+                continue
+
+            centre = med[k]
+            spread = max(MAD_TO_SIGMA * mad[k], min_spread[slot], 1e-3 * abs(centre))
+            deviation = value - centre
+            score = deviation / spread
+
+            # Sign-based steps: the median moves towards the sample and the MAD
+            # towards its absolute deviation, each by a fraction of the spread.
+            # Outliers barely move the median and leave the spread alone, so a
+            # slow drift is measured against the baseline rather than absorbed
+            outlier = abs(score) > threshold
+            step = (ANOMALY_OUTLIER_RATE if outlier else ANOMALY_RATE) * spread
+            if deviation > 0:
+                med[k] = centre + step
+            elif deviation < 0:
+                med[k] = centre - step
+            if not outlier:
+                step /= MAD_TO_SIGMA
+                mad[k] = max(0.0, mad[k] + (step if abs(deviation) > mad[k] else -step))
+                delta = value - mean[k]
+                mean[k] += ANOMALY_ALPHA * delta
+                var[k] = (1 - ANOMALY_ALPHA) * (var[k] + ANOMALY_ALPHA * delta * delta)
+
+            if outlier:
+                streak[slot] += 1
+                if streak[slot] == self.consecutive:
+                    details = self._flag(slot, k, load_bin, value, score, timestamp)
+                    flagged_now.append(details)
+                elif slot in self.flagged:
+                    self.flagged[slot]['score'] = round(score, 2)
+                    self.flagged[slot]['value'] = value
+            elif streak[slot]:
+                streak[slot] = 0
+                if self.flagged.pop(slot, None) is not None:
+                    log("Sensor back to its baseline: %s = %g", "DEBUG", name, value)
+        return flagged_now
+
+    def _flag(self, slot, k, load_bin, value, score, timestamp):
+        width = 100 // self.bins
+        details = {
+            'sensor': self.names[slot],
+            'value': value,
+            'score': round(score, 2),
+            'baseline': round(self.median[k], 3),
+            'spread': round(MAD_TO_SIGMA * self.mad[k], 3),
+            'mean': round(self.mean[k], 3),
+            'std': round(math.sqrt(self.var[k]), 3),
+            'load_bin': f"{load_bin * width}-{(load_bin + 1) * width}%",
+            'since': timestamp,
+        }
+        self.flagged[slot] = details
+        self.flagged_total += 1
+        log("Anomaly: %s = %g, usually %g ± %g at %s CPU load (score %+.1f)", "WARNING",
+            details['sensor'], value, details['baseline'], details['spread'], details['load_bin'], score,
+            key=f"anomaly:{details['sensor']}")
+        return details
+
+    def snapshot(self):
+        """Current anomalies and how many baselines are trained, for the /anomalies route."""
+        with self.lock:
+            return {
+                'sensors': len(self.names),
+                'baselines': sum(1 for n in self.count if n >= self.warmup),
+                'warming': len(self.warming),
+                'flagged_total': self.flagged_total,
+                'anomalies': [dict(details) for details in self.flagged.values()],
+            }
+
+    def format_prometheus(self):
+        """Scores of the currently flagged sensors and the total number of anomalies."""
+        with self.lock:
+            flagged = [(details['sensor'], details['score']) for details in self.flagged.values()]
+            flagged_total = self.flagged_total
+        lines = ["# TYPE ssm3_anomaly_score gauge"]
+        for sensor, score in flagged:
+            escaped = sensor.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+            lines.append(f'ssm3_anomaly_score{{sensor="{escaped}"}} {score}')
+        lines.append("# TYPE ssm3_anomalies_total counter")
+        lines.append(f"ssm3_anomalies_total {flagged_total}")
+        return "\n".join(lines) + "\n"
+
+
+# The collector's detector with --anomaly, set up by the CLI
+detector = None
@@ -0,0 +1,237 @@
+"""Batched metrics updates: wire format, sender-side batcher and a reference receiver.
+
+A batch carries many samples (from one host at a high sample rate, or from
+many hosts) in a single POST to /update/batch. Two encodings are supported:
+
+* JSON   - ``application/json``, a list of sample objects.
+* binary - ``application/x-ssm-batch``, a compact little-endian format:
+
+      header:  b"SSMB" | version (u8) | sample count (u16)
+      sample:  host length (u8) | host (utf-8) | ts (f64) | 5 x f32 metrics
+
+  Metrics follow BATCH_FIELDS order, and "N/A" readings are encoded as NaN.
+
+Either body may be gzip-compressed (``Content-Encoding: gzip``).
+
+The NodeMCU firmware takes at most FIRMWARE_BATCH_SAMPLES samples and
+FIRMWARE_BATCH_BYTES bytes per request; split_batch cuts a larger batch
+into requests that fit.
+
+Run the module to start the reference receiver used for testing:
+
+    python -m ssm.batch --port 8080
+"""
+import argparse
+import gzip
+import json
+import math
+import socket
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BATCH_FIELDS = ('cpu_temp', 'cpu_usage', 'ram_usage', 'gpu_temp', 'gpu_usage')
+BATCH_MAGIC = b"SSMB"
+BATCH_VERSION = 1
+JSON_CONTENT_TYPE = 'application/json'
+BINARY_CONTENT_TYPE = 'application/x-ssm-batch'
+
+# Limits of /update/batch in CLdisplaystat.ino (BATCH_MAX_SAMPLES, BATCH_MAX_BYTES)
+FIRMWARE_BATCH_SAMPLES = 48
+FIRMWARE_BATCH_BYTES = 8192
+
+_HEADER = struct.Struct('<4sBH')
+_SAMPLE = struct.Struct('<d5f')
+
+
+def encode_batch(samples, fmt="json"):
+    """Encode samples for /update/batch. Returns (content_type, body)."""
+    if fmt == "binary":
+        parts = [_HEADER.pack(BATCH_MAGIC, BATCH_VERSION, len(samples))]
+        for sample in samples:
+            host = sample.get('host', '').encode()[:255]
+            values = [sample.get(field, "N/A") for field in BATCH_FIELDS]
+            values = [math.nan if v == "N/A" or v is None else float(v) for v in values]
+            parts.append(bytes([len(host)]) + host)
+            parts.append(_SAMPLE.pack(sample.get('ts', 0.0), *values))
+        return BINARY_CONTENT_TYPE, b"".join(parts)
+    return JSON_CONTENT_TYPE, json.dumps(samples, separators=(',', ':')).encode()
+
+
+def split_batch(samples, fmt="json", max_samples=FIRMWARE_BATCH_SAMPLES, max_bytes=FIRMWARE_BATCH_BYTES):
+    """Encode samples as consecutive batches within the limits. Yields (samples, content_type, body).
+
+    A single sample that is larger than max_bytes on its own is still sent alone.
+    """
+    start = 0
+    while start < len(samples):
+        count = min(max_samples, len(samples) - start)
+        content_type, body = encode_batch(samples[start:start + count], fmt)
+        while len(body) > max_bytes and count > 1:
+            count = max(1, min(count - 1, count * max_bytes // len(body)))
+            content_type, body = encode_batch(samples[start:start + count], fmt)
+        yield samples[start:start + count], content_type, body
+        start += count
+
+
+def decode_batch(body, content_type=JSON_CONTENT_TYPE, content_encoding=None):
+    """Decode a /update/batch body back into a list of sample dicts."""
+    if content_encoding == 'gzip':
+        body = gzip.decompress(body)
+
+    if not content_type.startswith(BINARY_CONTENT_TYPE):
+        samples = json.loads(body)
+        if isinstance(samples, dict):
+            samples = [samples]
+        return samples
+
+    magic, version, count = _HEADER.unpack_from(body, 0)
+    if magic != BATCH_MAGIC or version != BATCH_VERSION:
+        raise ValueError(f"Unsupported batch header: {magic!r} v{version}")
+    offset = _HEADER.size
+    samples = []
+    for _ in range(count):
+        host_len = body[offset]
+        host = body[offset + 1:offset + 1 + host_len].decode()
+        offset += 1 + host_len
+        ts, *values = _SAMPLE.unpack_from(body, offset)
+        offset += _SAMPLE.size
+        sample = {'host': host, 'ts': ts}
+        for field, value in zip(BATCH_FIELDS, values):
+            sample[field] = "N/A" if math.isnan(value) else round(value, 1)
+        samples.append(sample)
+    return samples
+
+
+class MetricsBatcher:
+    """Collect samples and flush them as one batch on size or on age."""
+
+    def __init__(self, max_samples, max_age, host=None):
+        self.max_samples = max_samples
+        self.max_age = max_age
+        self.host = host or socket.gethostname()
+        self.samples = []
+        self.first_sample_time = 0
+
+    def __len__(self):
+        return len(self.samples)
+
+    def add(self, sample):
+        """Queue one sample, stamping it with the time and host it came from."""
+        if not self.samples:
+            self.first_sample_time = time.time()
+        sample = dict(sample)
+        sample.setdefault('ts', round(time.time(), 3))
+        sample.setdefault('host', self.host)
+        self.samples.append(sample)
+
+    def due(self):
+        """True once the batch is full or its oldest sample has waited max_age seconds."""
+        if not self.samples:
+            return False
+        return (len(self.samples) >= self.max_samples
+                or time.time() - self.first_sample_time >= self.max_age)
+
+    def drain(self):
+        """Return the queued samples and start a new batch."""
+        samples, self.samples = self.samples, []
+        return samples
+
+
+# --------- REFERENCE RECEIVER --------- #
+
+class BatchReceiver(ThreadingHTTPServer):
+    """HTTP server that accepts /update and /update/batch and keeps counters."""
+
+    daemon_threads = True
+
+    def __init__(self, address, verbose=True):
+        super().__init__(address, _ReceiverHandler)
+        self.verbose = verbose
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.requests = 0
+        self.samples = 0
+        self.latest = {}  # host -> newest sample
+
+    def record(self, samples):
+        with self.lock:
+            self.requests += 1
+            self.samples += len(samples)
+            for sample in samples:
+                host = sample.get('host', '')
+                if sample.get('ts', 0) >= self.latest.get(host, {}).get('ts', 0):
+                    self.latest[host] = sample
+
+    def stats(self):
+        with self.lock:
+            elapsed = max(time.time() - self.started, 1e-9)
+            return {
+                'requests': self.requests,
+                'samples': self.samples,
+                'hosts': len(self.latest),
+                'requests_per_minute': round(self.requests * 60 / elapsed, 1),
+                'samples_per_request': round(self.samples / self.requests, 1) if self.requests else 0,
+            }
+
+
+class _ReceiverHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == '/':
+            self._send(200, 'text/html', b"<html><body>IT Infrastructure batch receiver</body></html>")
+        elif self.path == '/metrics':
+            self._send_json(self.server.latest)
+        elif self.path == '/stats':
+            self._send_json(self.server.stats())
+        else:
+            self._send(404, 'text/plain', b"Not found")
+
+    def do_POST(self):
+        if self.path not in ('/update', '/update/batch'):
+            self._send(404, 'text/plain', b"Not found")
+            return
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        try:
+            samples = decode_batch(body,
+                                   self.headers.get('Content-Type', JSON_CONTENT_TYPE),
+                                   self.headers.get('Content-Encoding'))
+        except (ValueError, struct.error, OSError) as e:
+            self._send(400, 'text/plain', f"Bad Request: {e}".encode())
+            return
+        self.server.record(samples)
+        if self.server.verbose:
+            print(f"📥 {self.path}: {len(samples)} sample(s) from {len({s.get('host') for s in samples})} host(s)")
+        self._send(200, 'text/plain', b"OK")
+
+    def _send_json(self, obj):
+        self._send(200, JSON_CONTENT_TYPE, json.dumps(obj).encode())
+
+    def _send(self, status, content_type, body):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Reference receiver for batched metric updates')
+    parser.add_argument('--host', default='0.0.0.0', help='Address to listen on (default: 0.0.0.0)')
+    parser.add_argument('--port', type=int, default=8080, help='Port to listen on (default: 8080)')
+    parser.add_argument('--quiet', action='store_true', help='Do not print every request')
+    args = parser.parse_args()
+
+    server = BatchReceiver((args.host, args.port), verbose=not args.quiet)
+    print(f"✅ Batch receiver listening on http://{args.host}:{args.port}/update/batch")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"📊 {server.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+"""Installing OpenHardwareMonitor: resumable verified download, atomic extraction, manifest.
+
+Layout under the library path:
+
+    openhardwaremonitor-v0.9.6.zip        the verified download
+    openhardwaremonitor-v0.9.6.zip.part   an interrupted download, resumed with HTTP Range
+    ohm/0.9.6/...                         the extracted release, one directory per version
+    ohm/manifest.json                     what is installed and where its executable is
+
+Once the manifest points at an existing executable, startup costs one small
+JSON read and a stat; the zip is not opened again.
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+
+from ssm.logs import log
+from ssm.options import LIBRARY_PATH, OHM_ZIP_URL
+from ssm.stats import timed
+
+OHM_EXE_NAME = "OpenHardwareMonitor.exe"
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+DOWNLOAD_TIMEOUT = (5, 30)  # (connect, read) seconds
+DOWNLOAD_ATTEMPTS = 3  # tries per start; each retry resumes from the partial file
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def ohm_dir(library_path=LIBRARY_PATH):
+    return os.path.join(library_path, "ohm")
+
+
+def manifest_path(library_path=LIBRARY_PATH):
+    return os.path.join(ohm_dir(library_path), "manifest.json")
+
+
+def release_version(url):
+    """Version string from a release URL like .../openhardwaremonitor-v0.9.6.zip."""
+    match = re.search(r"v?(\d+(?:\.\d+)+)\.zip$", url)
+    return match.group(1) if match else os.path.splitext(url.split("/")[-1])[0]
+
+
+def read_manifest(library_path=LIBRARY_PATH):
+    try:
+        with open(manifest_path(library_path), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_manifest(manifest, library_path=LIBRARY_PATH):
+    """Atomically replace the manifest."""
+    path = manifest_path(library_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def installed_exe(manifest, library_path=LIBRARY_PATH, sha256=None):
+    """Executable recorded in the manifest, or None if it is missing or from another zip."""
+    if not manifest or (sha256 and manifest.get('sha256') != sha256.lower()):
+        return None
+    exe = os.path.join(ohm_dir(library_path), manifest.get('version', ''), manifest.get('exe', ''))
+    return exe if os.path.isfile(exe) else None
+
+
+def _download_once(url, part_path, digest):
+    """Stream `url` into `part_path`, resuming from its current size.
+
+    `digest` must already cover the bytes in the partial file. Returns the
+    digest covering the file afterwards (a fresh one if the server restarted
+    from byte 0).
+    """
+    import requests
+    offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    headers = {'Range': f"bytes={offset}-"} if offset else {}
+
+    with requests.get(url, headers=headers, stream=True, timeout=DOWNLOAD_TIMEOUT) as r:
+        if r.status_code == 416:
+            # Nothing left to fetch: the partial file is already the whole zip
+            return digest
+        r.raise_for_status()
+        if offset and r.status_code != 206:
+            log("Server ignored the range request, restarting the download", "WARNING")
+            offset = 0
+            digest = hashlib.sha256()
+
+        total = r.headers.get('Content-Length')
+        total = int(total) + offset if total else None
+        received = 0
+        last_report = time.monotonic()
+        with open(part_path, "ab" if offset else "wb") as f:
+            for chunk in r.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                f.write(chunk)
+                digest.update(chunk)
+                received += len(chunk)
+                if time.monotonic() - last_report >= 2:
+                    last_report = time.monotonic()
+                    done = offset + received
+                    log("Downloaded %.1f MiB%s", "INFO", done / 2**20,
+                        f" of {total / 2**20:.1f} MiB" if total else "")
+        return digest
+
+
+@timed("ohm_download")
+def download_ohm(url=OHM_ZIP_URL, sha256=None, library_path=LIBRARY_PATH):
+    """Download the OHM zip, resuming partial downloads and verifying the SHA-256.
+
+    Returns (zip_path, digest), or (None, None) if the download failed or did
+    not match `sha256`.
+    """
+    import requests
+    os.makedirs(library_path, exist_ok=True)
+    zip_filename = url.split("/")[-1]
+    zip_path = os.path.join(library_path, zip_filename)
+    part_path = zip_path + ".part"
+
+    if os.path.exists(zip_path):
+        digest = file_sha256(zip_path)
+        if not sha256 or digest == sha256.lower():
+            log(f"{zip_filename} already downloaded", "SUCCESS")
+            return zip_path, digest
+        log(f"{zip_filename} does not match the pinned SHA-256, downloading again", "WARNING")
+        os.remove(zip_path)
+
+    # Hash what an interrupted run already fetched so the digest covers the whole file
+    digest = hashlib.sha256()
+    if os.path.exists(part_path):
+        with open(part_path, "rb") as f:
+            for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+                digest.update(block)
+        log(f"Resuming {zip_filename} from {os.path.getsize(part_path) / 2**20:.1f} MiB")
+    else:
+        log(f"Downloading {zip_filename}...")
+
+    for attempt in range(1, DOWNLOAD_ATTEMPTS + 1):
+        try:
+            digest = _download_once(url, part_path, digest)
+            break
+        except (requests.exceptions.RequestException, OSError) as e:
+            log(f"Download attempt {attempt} failed: {e}", "WARNING")
+            if attempt == DOWNLOAD_ATTEMPTS:
+                log("Download did not complete; it will resume on the next start", "ERROR")
+                return None, None
+
+    actual = digest.hexdigest()
+    if sha256 and actual != sha256.lower():
+        log(f"SHA-256 mismatch for {zip_filename}: expected {sha256.lower()}, got {actual}", "ERROR")
+        os.remove(part_path)
+        return None, None
+    os.replace(part_path, zip_path)
+    log(f"Download complete! SHA-256 {actual}", "SUCCESS")
+    return zip_path, actual
+
+
+@timed("ohm_extract")
+def extract_ohm(zip_path, version, library_path=LIBRARY_PATH):
+    """Extract the zip into ohm/<version> via a temporary directory.
+
+    Returns the executable's path relative to the version directory, or None.
+    """
+    import zipfile
+    base = ohm_dir(library_path)
+    target = os.path.join(base, version)
+    os.makedirs(base, exist_ok=True)
+
+    log("Extracting OpenHardwareMonitor...")
+    staging = tempfile.mkdtemp(prefix=".extract-", dir=base)
+    try:
+        with zipfile.ZipFile(zip_path, "r") as zip_ref:
+            zip_ref.extractall(staging)
+
+        exe = None
+        for root, _, files in os.walk(staging):
+            if OHM_EXE_NAME in files:
+                exe = os.path.relpath(os.path.join(root, OHM_EXE_NAME), staging)
+                break
+        if exe is None:
+            log(f"{OHM_EXE_NAME} not found in {os.path.basename(zip_path)}", "ERROR")
+            return None
+
+        # Only a fully extracted tree ever appears under the version name
+        if os.path.exists(target):
+            shutil.rmtree(target)
+        os.replace(staging, target)
+        staging = None
+        log("Extraction complete!", "SUCCESS")
+        return exe
+    except (zipfile.BadZipFile, OSError) as e:
+        log(f"Could not extract {zip_path}: {e}", "ERROR")
+        if isinstance(e, zipfile.BadZipFile):
+            os.remove(zip_path)  # fetch a fresh copy next time
+        elif isinstance(e, PermissionError):
+            log("Please run the script with admin privileges or change the library path.")
+        return None
+    finally:
+        if staging is not None:
+            shutil.rmtree(staging, ignore_errors=True)
+
+
+def adopt_legacy_install(library_path=LIBRARY_PATH):
+    """Record an OHM unpacked by older versions straight into the library path."""
+    try:
+        entries = os.listdir(library_path)
+    except OSError:
+        return None
+    for item in entries:
+        exe = os.path.join(library_path, item, OHM_EXE_NAME)
+        if item != "ohm" and os.path.isfile(exe):
+            return exe
+    return None
+
+
+def ensure_ohm(url=OHM_ZIP_URL, sha256=None, library_path=LIBRARY_PATH):
+    """Return the path of an installed OpenHardwareMonitor.exe, installing it if needed."""
+    manifest = read_manifest(library_path)
+    exe = installed_exe(manifest, library_path, sha256)
+    if exe:
+        log(f"OpenHardwareMonitor {manifest['version']} is installed", "SUCCESS")
+        return exe
+
+    if manifest is None and not sha256:
+        exe = adopt_legacy_install(library_path)
+        if exe:
+            log(f"Using existing OpenHardwareMonitor at {exe}", "SUCCESS")
+            return exe
+
+    # Without a pin, a re-download must match what was installed from the same URL before
+    if not sha256 and manifest and manifest.get('url') == url:
+        sha256 = manifest.get('sha256')
+
+    zip_path, digest = download_ohm(url, sha256, library_path)
+    if not zip_path:
+        return None
+    if not sha256:
+        log("No SHA-256 pinned (--ohm-sha256); recording this download's digest in the manifest", "WARNING")
+
+    version = release_version(url)
+    relative_exe = extract_ohm(zip_path, version, library_path)
+    if not relative_exe:
+        return None
+    write_manifest({
+        'version': version,
+        'url': url,
+        'sha256': digest,
+        'exe': relative_exe,
+        'installed': round(time.time()),
+    }, library_path)
+    return os.path.join(ohm_dir(library_path), version, relative_exe)
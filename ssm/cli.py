@@ -0,0 +1,264 @@
+"""Command line entry point: startup checks, configuration and the monitoring loop."""
+import importlib.util
+import os
+import sys
+import time
+
+from ssm import alerts, config, derived, logs, nodemcu, notify, ohm, options
+from ssm.logs import log, log_deduper, setup_logging
+from ssm.nodemcu import send_filtered_metrics_to_nodemcu
+from ssm.bootstrap import ensure_ohm
+from ssm.ohm import check_ohm_remote_server, get_temperatures_from_json, run_ohm
+from ssm.stats import (dump_requested_stats, dump_stage_stats, install_stats_signal, register_exporter,
+                       register_json_route, start_stats_server, stats_requested, timed_stage)
+
+def check_modules():
+    """Exit with instructions if a required third-party module is not installed."""
+    required_modules = ["requests", "psutil"]
+    if os.name == 'nt':  # WMI is only available (and only used) on Windows
+        required_modules.append("wmi")
+    
+    # find_spec only locates the modules; they are imported on first use
+    missing_modules = [module for module in required_modules if importlib.util.find_spec(module) is None]
+    if missing_modules:
+        print("❌ Missing modules detected:", ", ".join(missing_modules))
+        print("Please install them manually using pip and run the script again.")
+        sys.exit(1)
+
+
+def configure(args):
+    """Apply the parsed command line to the collector modules."""
+    options.args = args
+    if args.ohm_url:
+        ohm.OHM_DATA_URL = args.ohm_url
+    setup_logging(verbosity=args.verbosity, fmt=args.log_format, log_file=args.log_file)
+    log_deduper.ttl = args.log_once_ttl
+    if args.ip:
+        nodemcu.nodemcu_ip = args.ip
+        log(f"Using manually specified NodeMCU IP: {args.ip}", "SUCCESS")
+
+
+def reconfigure(new, reload_rules=False):
+    """Apply a reloaded configuration to the running collector, then swap it in.
+
+    Most options are read from options.args where they are used and take
+    effect with the swap; this only updates the objects built from them.
+    """
+    old = options.args
+    if (old.batch_size > 0) != (new.batch_size > 0):
+        log("Option batch-size changed between batching and not; restart to apply it", "WARNING")
+        new.batch_size = old.batch_size
+    changed = config.changed_options(old, new)
+    if changed:
+        log("Configuration reloaded: %s", "SUCCESS", ", ".join(dest.replace('_', '-') for dest in changed))
+    if 'verbosity' in changed:
+        logs.logger.setLevel(logs.VERBOSITY_LEVELS[new.verbosity])
+    if 'log_once_ttl' in changed:
+        log_deduper.ttl = new.log_once_ttl
+    if 'ohm_url' in changed:
+        ohm.OHM_DATA_URL = new.ohm_url or options.OHM_DATA_URL
+    if 'ip' in changed:
+        nodemcu.nodemcu_ip = new.ip  # None sends discovery looking again
+    if 'window' in changed or 'smooth_tau' in changed:
+        for stats in (derived.sensor_stats, derived.display_stats):
+            stats.window = new.window
+            stats.tau = new.smooth_tau
+    if old.anomaly and 'anomaly_threshold' in changed:
+        from ssm import anomaly
+        anomaly.detector.threshold = new.anomaly_threshold
+    if notify.notifier is not None and 'notify_window' in changed:
+        notify.notifier.window = new.notify_window
+    if nodemcu.batcher is not None:
+        nodemcu.batcher.max_samples = new.batch_size
+        nodemcu.batcher.max_age = new.batch_interval
+    if reload_rules or 'alert_rules' in changed:
+        alerts.engine.set_rules(alerts.load_rules(new.alert_rules))
+    options.args = new
+
+
+def print_banner():
+    """Print a nice banner at startup."""
+    banner = """
+    ╔════════════════════════════════════════════╗
+    ║                                            ║
+    ║         IT INFRASTRUCTURE MONITORING       ║
+    ║                                            ║
+    ╚════════════════════════════════════════════╝
+    """
+    print(banner)
+
+
+# --------- EXECUTION STARTS HERE --------- #
+
+def main(argv=None):
+    """Main execution function."""
+    if (sys.argv[1:] if argv is None else argv)[:1] == ['export']:
+        from ssm import export
+        sys.exit(export.main((sys.argv[1:] if argv is None else argv)[1:]))
+    check_modules()
+    args = config.load_args(argv)
+    configure(args)
+    watcher = config.ConfigWatcher(argv, args.config)
+    
+    print_banner()
+    log("Starting IT Infrastructure Monitoring")
+    log(f"Using library path: {args.library_path}")
+    if args.config:
+        log(f"Using config file: {args.config} (reloaded when it changes)")
+    
+    from ssm.registry import REGISTRY_FILE, DeviceRegistry
+    nodemcu.registry = DeviceRegistry(os.path.join(args.library_path, REGISTRY_FILE),
+                                      legacy_ip_file=os.path.join(args.library_path, "nodemcu_ip.txt"))
+    register_exporter(lambda: nodemcu.registry.format_prometheus(options.args.discovery_timeout))
+    register_json_route('/devices', nodemcu.registry.snapshot)
+    
+    if args.outbox:
+        from ssm.outbox import MetricsOutbox
+        nodemcu.outbox = MetricsOutbox(os.path.join(args.library_path, "outbox.jsonl"))
+        if not args.replay_url:
+            log("Buffered samples stay in the outbox until a --replay-url history sink is set", "INFO")
+    if args.batch_size > 0:
+        from ssm.batch import MetricsBatcher
+        nodemcu.batcher = MetricsBatcher(args.batch_size, args.batch_interval)
+    
+    # Derived metrics: every OHM sensor, and the display metrics (smoothed with --smooth)
+    derived.sensor_stats = derived.DerivedMetrics(args.window, args.smooth_tau)
+    derived.display_stats = derived.DerivedMetrics(args.window, args.smooth_tau)
+    ohm.sensor_listeners.append(derived.sensor_stats.update)
+    register_exporter(lambda: derived.display_stats.format_prometheus("ssm3_display", "metric"))
+    register_exporter(lambda: derived.sensor_stats.format_prometheus("ssm3_sensor", "sensor"))
+    register_json_route('/derived', lambda: {'display': derived.display_stats.snapshot(),
+                                             'sensors': derived.sensor_stats.snapshot()})
+    # Optional features are imported only when enabled; they are all restart-only options
+    if args.fleet:
+        from ssm import fleet
+        fleet.collector = fleet.FleetCollector(args.fleet, args.fleet_workers).start()
+        ohm.sensor_sources.append(fleet.collector.collect)
+        register_exporter(fleet.collector.format_prometheus)
+        register_json_route('/fleet', fleet.collector.snapshot)
+    if args.anomaly:
+        from ssm import anomaly
+        anomaly.detector = anomaly.AnomalyDetector(args.anomaly_threshold)
+        ohm.sensor_listeners.append(anomaly.detector.update)
+        register_exporter(anomaly.detector.format_prometheus)
+        register_json_route('/anomalies', anomaly.detector.snapshot)
+    if args.record:
+        from ssm import history
+        history.writer = history.HistoryWriter(history.history_dir(args.library_path))
+        ohm.sensor_listeners.append(history.writer.update)
+        log(f"Recording samples to {history.writer.directory} for {args.record_days} days")
+    if args.shm:
+        from ssm import shm
+        shm.table = shm.start_table(args.shm, args.library_path)
+        ohm.sensor_listeners.append(shm.table.update)
+    
+    # Alert rules over both groups, checked once per cycle after the display metrics are built
+    alerts.engine = alerts.AlertEngine(alerts.load_rules(args.alert_rules),
+                                       {'display': derived.display_stats, 'sensors': derived.sensor_stats})
+    alerts.alert_listeners.append(alerts.log_alert)
+    register_exporter(alerts.engine.format_prometheus)
+    register_json_route('/alerts', alerts.engine.snapshot)
+    if args.telegram_token and args.telegram_chat_id:
+        notify.notifier = notify.TelegramNotifier(args.telegram_token, args.telegram_chat_id,
+                                                  args.telegram_url, args.notify_window)
+        if not args.service:
+            notify.notifier.start()  # the service runs the sender as a supervised worker
+        alerts.alert_listeners.append(notify.notifier.submit)
+        register_exporter(notify.notifier.format_prometheus)
+        log(f"Sending alerts to Telegram chat {args.telegram_chat_id}", "SUCCESS")
+    
+    if args.stats_port:
+        start_stats_server(args.stats_port, args.stats_bind)
+    stats_signal = install_stats_signal()
+    if stats_signal is not None:
+        log(f"Send {stats_signal.name} to dump stage timings", "INFO")
+    
+    # OHM can only be installed and launched locally on Windows; anywhere else,
+    # or when --ohm-url points at another machine, use the server as it is
+    if os.name == 'nt' and not args.ohm_url:
+        # Step 1: Download and extract OpenHardwareMonitor if needed
+        ohm_exe = ensure_ohm(library_path=args.library_path, sha256=args.ohm_sha256)
+        if ohm_exe:
+            # Step 2: Run OpenHardwareMonitor if not already running
+            run_ohm(ohm_exe)
+            
+            # Step 3: Wait for the OHM web server; sampling starts as soon as it answers
+            log("Waiting for OpenHardwareMonitor to initialize...")
+            check_ohm_remote_server(args.ohm_timeout)
+    elif check_ohm_remote_server(args.ohm_timeout):
+        log(f"Using OHM data from {ohm.OHM_DATA_URL}")
+    
+    # Without OHM the loop still runs, reporting N/A until the server comes up
+
+    if args.service:
+        from ssm import service
+        if args.tui:
+            log("--tui is ignored in service mode", "WARNING")
+
+        def reload_config():
+            # SIGHUP re-reads the file and the alert rules even when nothing else changed
+            new = watcher.reload()
+            if new is not None:
+                reconfigure(new, reload_rules=True)
+
+        def poll_config():
+            new = watcher.poll()
+            if new is not None:
+                reconfigure(new)
+
+        service.reload_hooks.append(reload_config)
+        service.watch_hooks.append(poll_config)
+        log("IT Infrastructure Monitoring service is active. Send SIGTERM to stop.", "SUCCESS")
+        sys.exit(service.run_service(args))
+    
+    dashboard = None
+    if args.tui:
+        from ssm import tui
+        dashboard = tui.dashboard = tui.start_dashboard()
+    log("IT Infrastructure Monitoring is active. Press Ctrl+C to exit.", "SUCCESS")
+    
+    last_stats_dump = time.time()
+    
+    # Continuous monitoring loop
+    try:
+        while True:
+            with timed_stage("cycle"):
+                # Get temperatures
+                cpu_temp, gpu_temp = get_temperatures_from_json()
+                
+                # Send data to NodeMCU
+                send_filtered_metrics_to_nodemcu(cpu_temp, gpu_temp)
+                
+                alerts.engine.evaluate(time.time())
+            
+            # Visual separator for logs (the dashboard has its own layout)
+            if dashboard is None:
+                log("-" * 40)
+            
+            new = watcher.poll()
+            if new is not None:
+                reconfigure(new)
+            
+            if options.args.stats_interval and time.time() - last_stats_dump >= options.args.stats_interval:
+                dump_stage_stats()
+                last_stats_dump = time.time()
+            
+            # Wait before next update, waking early to answer the stats signal
+            deadline = time.monotonic() + options.args.interval
+            while stats_requested.wait(max(0.0, deadline - time.monotonic())):
+                dump_requested_stats()
+    except KeyboardInterrupt:
+        if dashboard is not None:
+            dashboard.stop()
+        if notify.notifier is not None:
+            notify.notifier.stop()
+        nodemcu.registry.save()
+        if args.fleet:
+            fleet.collector.stop()
+        if args.shm:
+            shm.table.close()
+        if args.record:
+            history.writer.close()
+        dump_stage_stats()
+        log("Exiting monitoring script.")
+
@@ -0,0 +1,197 @@
+"""Layered configuration: defaults < config file < environment < command line, reloadable live.
+
+The config file (--config, or $SSM_CONFIG) is TOML (Python 3.11+, or with
+tomli installed) or JSON, one key per long option, with dashes or underscores:
+
+    interval = 1.0
+    verbosity = 2
+    priority-subnets = ["192.168.137", "10.0.0"]
+    scan-workers = 100
+    push-timeout = 2.0
+
+The environment sets the same options as SSM_<OPTION>, e.g. SSM_INTERVAL=1
+or SSM_TELEGRAM_TOKEN=... Every value is checked with the option's own type
+and choices, so a file entry is exactly as valid as the same flag typed on
+the command line, and unknown keys are rejected rather than ignored.
+
+The collector reads options.args at the point of use, so a reload only has
+to build a complete new namespace and swap it in: the next cycle, scan or
+push sees the new values and nothing in flight is interrupted. The few
+options that size resources at startup keep their running value until a
+restart (RESTART_OPTIONS).
+"""
+import json
+import os
+
+from ssm import options
+from ssm.logs import log
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    try:
+        import tomli as tomllib
+    except ImportError:
+        tomllib = None
+
+CONFIG_ENV = "SSM_CONFIG"
+ENV_PREFIX = "SSM_"
+
+# Options that open files, sockets or threads at startup; changing them takes a restart
+RESTART_OPTIONS = ('config', 'library_path', 'service', 'stats_port', 'stats_bind', 'log_format', 'log_file',
+                   'outbox', 'anomaly', 'telegram_token', 'telegram_chat_id', 'telegram_url',
+                   'fleet', 'fleet_workers', 'shm', 'tui', 'record')
+
+BOOLEAN_STRINGS = {'1': True, 'true': True, 'yes': True, 'on': True,
+                   '0': False, 'false': False, 'no': False, 'off': False, '': False}
+
+
+class ConfigError(ValueError):
+    """A config file or environment value that cannot be used."""
+
+
+def _option_actions(parser):
+    """dest -> argparse action for every option that takes a value or is a flag."""
+    return {action.dest: action for action in parser._actions if action.dest != 'help'}
+
+
+def coerce(action, value):
+    """Convert a file or environment value with the option's type, as argparse would."""
+    name = action.option_strings[-1]
+    if action.nargs == 0:  # store_true flags
+        if isinstance(value, str):
+            if value.strip().lower() not in BOOLEAN_STRINGS:
+                raise ConfigError(f"{name}: expected true or false, got {value!r}")
+            value = BOOLEAN_STRINGS[value.strip().lower()]
+        if not isinstance(value, bool):
+            raise ConfigError(f"{name}: expected true or false, got {value!r}")
+        return value
+    if isinstance(value, (list, tuple)):
+        value = ",".join(str(item) for item in value)
+    elif isinstance(value, bool) or not isinstance(value, (str, int, float)):
+        raise ConfigError(f"{name}: unsupported value {value!r}")
+    raw = str(value)
+    try:
+        value = action.type(raw) if action.type is not None else raw
+    except (TypeError, ValueError):
+        raise ConfigError(f"{name}: invalid value {raw!r}") from None
+    if action.choices is not None and value not in action.choices:
+        raise ConfigError(f"{name}: {value!r} is not one of {', '.join(map(str, action.choices))}")
+    return value
+
+
+def read_config_file(path):
+    """The raw key/value pairs of a TOML or JSON config file."""
+    is_json = path.lower().endswith('.json')
+    if not is_json and tomllib is None:
+        raise ConfigError(f"{path}: TOML needs Python 3.11 or the tomli package; use JSON instead")
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except OSError as e:
+        raise ConfigError(f"cannot read config file {path}: {e.strerror}") from None
+    try:
+        if is_json:
+            values = json.loads(data)
+        else:
+            values = tomllib.loads(data.decode('utf-8'))
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ConfigError(f"{path}: {e}") from None
+    if not isinstance(values, dict):
+        raise ConfigError(f"{path}: expected a table of option = value")
+    return values
+
+
+def layered_defaults(parser, path, environ):
+    """Option defaults from the config file, overridden by SSM_* environment variables."""
+    actions = _option_actions(parser)
+    defaults = {}
+    if path:
+        for key, value in read_config_file(path).items():
+            dest = key.replace('-', '_')
+            if dest not in actions or dest == 'config':
+                raise ConfigError(f"{path}: unknown option {key!r}")
+            if value is not None:
+                try:
+                    defaults[dest] = coerce(actions[dest], value)
+                except ConfigError as e:
+                    raise ConfigError(f"{path}: {e}") from None
+    for dest, action in actions.items():
+        name = ENV_PREFIX + dest.upper()
+        value = environ.get(name)
+        if value is not None and dest != 'config':
+            try:
+                defaults[dest] = coerce(action, value)
+            except ConfigError as e:
+                raise ConfigError(f"${name}: {e}") from None
+    return defaults
+
+
+def load_args(argv=None, environ=None, exit_on_error=True):
+    """Parse the command line on top of the config file and environment layers.
+
+    A bad file or variable exits like a bad flag would, or raises ConfigError
+    when `exit_on_error` is False (as on reload, where the running
+    configuration is kept instead).
+    """
+    environ = os.environ if environ is None else environ
+    parser = options.build_parser()
+    path = parser.parse_args(argv).config or environ.get(CONFIG_ENV)
+    try:
+        defaults = layered_defaults(parser, path, environ)
+    except ConfigError as e:
+        if exit_on_error:
+            parser.error(str(e))
+        raise
+    parser.set_defaults(**defaults, config=path)
+    return parser.parse_args(argv)
+
+
+def changed_options(old, new):
+    """Names of the options whose value differs between two namespaces.
+
+    Restart-only options are reported with a warning and keep their old value in `new`.
+    """
+    changed = []
+    for dest, value in vars(new).items():
+        previous = getattr(old, dest, None)
+        if value == previous:
+            continue
+        if dest in RESTART_OPTIONS:
+            log("Option %s changed; restart to apply it", "WARNING", dest.replace('_', '-'))
+            setattr(new, dest, previous)
+            continue
+        changed.append(dest)
+    return changed
+
+
+class ConfigWatcher:
+    """Re-reads the layered configuration when the config file changes, or on demand."""
+
+    def __init__(self, argv, path):
+        self.argv = argv
+        self.path = path
+        self.mtime = self._mtime()
+
+    def _mtime(self):
+        try:
+            return os.stat(self.path).st_mtime_ns if self.path else None
+        except OSError:
+            return None
+
+    def poll(self):
+        """A new namespace if the file changed since the last look, else None (one stat call)."""
+        if not self.path:
+            return None
+        if self._mtime() == self.mtime:
+            return None
+        return self.reload()
+
+    def reload(self):
+        """A freshly layered namespace, or None (logged) if the configuration is invalid."""
+        self.mtime = self._mtime()
+        try:
+            return load_args(self.argv, exit_on_error=False)
+        except ConfigError as e:
+            log("Keeping the current configuration: %s", "ERROR", e, key="config_error")
+            return None
@@ -0,0 +1,242 @@
+"""Derived metrics: EWMA smoothing, rolling min/max/p95 and rates of change, computed as samples arrive.
+
+A DerivedMetrics instance tracks one group of series that are sampled
+together (every OHM sensor, or the five display metrics). All state lives in
+flat arrays indexed by series slot, plus one timestamp ring shared by the
+whole group:
+
+    ewma    exponentially weighted moving average with time constant `tau`,
+            corrected for uneven sample spacing (O(1) per sample)
+    rate    change per minute across the rolling window (O(1) per sample)
+    min/max/p95
+            over the last `window` seconds, read from a sorted copy of the
+            window kept up to date with bisect (O(log n) search per sample)
+
+Updates and reads take the group's lock, so other threads (the stats
+server, the --tui dashboard) always see whole samples: readers copy what
+they need under it and format outside it.
+"""
+import math
+import threading
+from array import array
+from bisect import bisect_left, insort
+
+DERIVED_WINDOW = 60.0  # seconds covered by the rolling min/max/p95 and rate
+DERIVED_TAU = 10.0  # EWMA time constant in seconds
+DERIVED_CAPACITY = 512  # samples kept per series; bounds the window at short intervals
+DERIVED_STATS = ('value', 'ewma', 'min', 'max', 'p95', 'rate')
+
+NAN = float('nan')
+
+
+class DerivedMetrics:
+    """Streaming statistics for a group of series sampled at the same instants."""
+
+    def __init__(self, window=DERIVED_WINDOW, tau=DERIVED_TAU, capacity=DERIVED_CAPACITY):
+        self.window = window
+        self.tau = tau
+        self.capacity = capacity
+        self.names = []
+        self.slots = {}  # series name -> slot
+        self.units = []
+        # Timestamp ring shared by every series: oldest sample at `head`
+        self.times = array('d', [0.0] * capacity)
+        self.head = 0
+        self.count = 0
+        # Per-slot state; `values` holds one ring of `capacity` samples per slot
+        self.values = array('d')
+        self.latest = array('d')
+        self.ewma = array('d')
+        self.ewma_time = array('d')
+        self.sorted = []  # per slot: the window's finite values in ascending order
+        self.lock = threading.RLock()  # held by update and every reader
+
+    def __len__(self):
+        return len(self.names)
+
+    def _add_series(self, name, unit):
+        slot = len(self.names)
+        self.names.append(name)
+        self.units.append(unit)
+        self.slots[name] = slot
+        self.values.extend([NAN] * self.capacity)
+        self.latest.append(NAN)
+        self.ewma.append(NAN)
+        self.ewma_time.append(0.0)
+        self.sorted.append([])
+        return slot
+
+    def _expire_oldest(self):
+        head = self.head
+        capacity = self.capacity
+        values = self.values
+        for slot, window in enumerate(self.sorted):
+            value = values[slot * capacity + head]
+            if value == value:  # not NaN
+                del window[bisect_left(window, value)]
+        self.head = (head + 1) % capacity
+        self.count -= 1
+
+    def update(self, timestamp, readings):
+        """Add one sample per series: `readings` maps name -> value or (value, unit).
+
+        Series missing from `readings` record a gap for this sample.
+        """
+        with self.lock:
+            self._update(timestamp, readings)
+
+    def _update(self, timestamp, readings):
+        while self.count and (self.count == self.capacity
+                              or timestamp - self.times[self.head] >= self.window):
+            self._expire_oldest()
+
+        capacity = self.capacity
+        position = (self.head + self.count) % capacity
+        self.times[position] = timestamp
+        self.count += 1
+
+        values = self.values
+        seen = set()
+        for name, reading in readings.items():
+            value, unit = reading if isinstance(reading, tuple) else (reading, '')
+            slot = self.slots.get(name)
+            if slot is None:
+                slot = self._add_series(name, unit)
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                continue  # "N/A" and friends are gaps
+            if value != value:
+                continue
+            seen.add(slot)
+            values[slot * capacity + position] = value
+            self.latest[slot] = value
+            insort(self.sorted[slot], value)
+
+            previous = self.ewma[slot]
+            if previous != previous:
+                self.ewma[slot] = value
+            else:
+                alpha = 1.0 - math.exp(-(timestamp - self.ewma_time[slot]) / self.tau) if self.tau > 0 else 1.0
+                self.ewma[slot] = previous + alpha * (value - previous)
+            self.ewma_time[slot] = timestamp
+
+        if len(seen) < len(self.names):
+            for slot in range(len(self.names)):
+                if slot not in seen:
+                    values[slot * capacity + position] = NAN
+
+    def stats(self, name):
+        """Current statistics for one series as a dict (None where not yet known)."""
+        with self.lock:
+            slot = self.slots.get(name)
+            if slot is None:
+                return None
+            return self._stats(slot)
+
+    def _stats(self, slot):
+        window = self.sorted[slot]
+
+        def known(value):
+            return None if value != value else value
+
+        result = {
+            'value': known(self.latest[slot]),
+            'ewma': known(self.ewma[slot]),
+            'min': window[0] if window else None,
+            'max': window[-1] if window else None,
+            'p95': window[max(0, math.ceil(0.95 * len(window)) - 1)] if window else None,
+            'rate': None,
+        }
+        if self.count >= 2:
+            capacity = self.capacity
+            oldest = self.head
+            newest = (self.head + self.count - 1) % capacity
+            first = self.values[slot * capacity + oldest]
+            last = self.values[slot * capacity + newest]
+            elapsed = self.times[newest] - self.times[oldest]
+            if first == first and last == last and elapsed > 0:
+                result['rate'] = (last - first) / elapsed * 60.0
+        return result
+
+    def current(self):
+        """This sample's value for every slot (NaN where the series had a gap), as an array.
+
+        The newest column of the value rings is one strided slice, so this is a
+        single C-level copy however many series the group holds.
+        """
+        with self.lock:
+            if not self.count:
+                return array('d', [NAN] * len(self.names))
+            newest = (self.head + self.count - 1) % self.capacity
+            return self.values[newest::self.capacity]
+
+    def rates(self):
+        """Change per minute across the window for every slot (NaN where unknown), as a list."""
+        with self.lock:
+            if self.count < 2:
+                return [NAN] * len(self.names)
+            capacity = self.capacity
+            oldest = self.head
+            newest = (self.head + self.count - 1) % capacity
+            elapsed = self.times[newest] - self.times[oldest]
+            if elapsed <= 0:
+                return [NAN] * len(self.names)
+            scale = 60.0 / elapsed
+            return [(last - first) * scale
+                    for first, last in zip(self.values[oldest::capacity], self.values[newest::capacity])]
+
+    def newest_time(self):
+        """Timestamp of the latest sample (0.0 before the first)."""
+        with self.lock:
+            return self.times[(self.head + self.count - 1) % self.capacity] if self.count else 0.0
+
+    def recent(self, width):
+        """(name, unit, latest, window min, window max, last `width` samples) per series, copied together."""
+        with self.lock:
+            capacity = self.capacity
+            count = min(self.count, width)
+            positions = [(self.head + self.count - count + i) % capacity for i in range(count)]
+            values = self.values
+            rows = []
+            for slot, name in enumerate(self.names):
+                window = self.sorted[slot]
+                base = slot * capacity
+                rows.append((name, self.units[slot], self.latest[slot],
+                             window[0] if window else NAN, window[-1] if window else NAN,
+                             [values[base + position] for position in positions]))
+            return rows
+
+    def snapshot(self):
+        """Statistics for every series, keyed by name."""
+        with self.lock:
+            return {name: self._stats(slot) for slot, name in enumerate(self.names)}
+
+    def format_prometheus(self, metric, label):
+        """Render every series as gauge lines: metric{label="name",stat="ewma"} value."""
+        snapshot = self.snapshot()
+        lines = [f"# TYPE {metric} gauge"]
+        for name, stats in snapshot.items():
+            escaped = name.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+            for stat, value in stats.items():
+                if value is not None:
+                    lines.append(f'{metric}{{{label}="{escaped}",stat="{stat}"}} {value:.6g}')
+        return "\n".join(lines) + "\n"
+
+
+# Groups fed by the collector, set up by the CLI
+sensor_stats = None  # every OHM sensor, keyed by its path in the sensor index
+display_stats = None  # the five metrics pushed to the NodeMCU
+
+
+def smooth_payload(payload, stats):
+    """Replace numeric display metrics with their EWMA and add temperature trends (°C/min)."""
+    smoothed = dict(payload)
+    for key, value in payload.items():
+        current = stats.stats(key)
+        if current is None or value == "N/A" or current['ewma'] is None:
+            continue
+        smoothed[key] = round(current['ewma'], 1)
+        if key.endswith('_temp') and current['rate'] is not None:
+            smoothed[f"{key}_rate"] = round(current['rate'], 1)
+    return smoothed
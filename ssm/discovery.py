@@ -0,0 +1,242 @@
+"""Discovery planning: which addresses to probe for the NodeMCU, and in what order.
+
+Probing one address is cheap, sweeping a subnet is not, so a scan starts
+with the addresses most likely to answer and only then sweeps networks:
+
+    known       displays in the device registry, healthiest first
+    neighbours  hosts in the OS neighbour (ARP) table, which are known to be up
+    networks    --subnet, then each interface's real network from its netmask,
+                networks with past hits first and busier interfaces ahead of
+                quieter ones, then past networks no interface is on now and
+                the --priority-subnets fallbacks
+
+Each address is probed at most once per scan. Networks wider than
+DISCOVERY_MAX_PREFIX are narrowed to the block around the interface's own
+address. Hits go to discovery_history.json in the library path, so the next
+scan starts where the last one succeeded.
+"""
+import ipaddress
+import json
+import os
+import re
+import socket
+import subprocess
+import time
+
+from ssm import options
+from ssm.logs import log
+
+DISCOVERY_MAX_PREFIX = 22  # wider interface networks are narrowed to this (1022 hosts)
+DISCOVERY_HISTORY_FILE = "discovery_history.json"
+DISCOVERY_HISTORY_SIZE = 16  # networks remembered
+DISCOVERY_HISTORY_HALF_LIFE = 30 * 86400.0  # seconds until a past hit counts half as much
+ARP_TABLE_PATH = "/proc/net/arp"
+ARP_TIMEOUT = 2.0  # seconds for `arp -a` where there is no /proc/net/arp
+
+IPV4_PATTERN = re.compile(r"\b(\d{1,3}(?:\.\d{1,3}){3})\b")
+MAC_PATTERN = re.compile(r"\b([0-9a-fA-F]{1,2}(?:[:-][0-9a-fA-F]{1,2}){5})\b")
+
+# Interface byte counters from the previous plan, to rank by recent traffic
+_last_counters = {}
+
+
+def parse_network(text):
+    """A network from "192.168.1" (a /24 prefix, as --subnet takes) or CIDR notation."""
+    text = text.strip()
+    if '/' not in text and text.count('.') == 2:
+        text += ".0/24"
+    return ipaddress.IPv4Network(text, strict=False)
+
+
+def _history_path():
+    return os.path.join(options.args.library_path, DISCOVERY_HISTORY_FILE)
+
+
+def load_history():
+    """network -> {"hits", "last_hit"} from the library path.
+
+    Without a history file, the last_subnet.txt written by older versions
+    seeds it with one hit.
+    """
+    try:
+        with open(_history_path(), "r", encoding="utf-8") as f:
+            history = json.load(f)
+        if isinstance(history, dict):
+            return history
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError) as e:
+        log(f"Ignoring unreadable discovery history: {e}", "WARNING")
+        return {}
+    history = {}
+    legacy = os.path.join(options.args.library_path, "last_subnet.txt")
+    try:
+        with open(legacy, "r") as f:
+            network = str(parse_network(f.read()))
+        history[network] = {'hits': 1, 'last_hit': os.path.getmtime(legacy)}
+    except (OSError, ValueError):
+        pass
+    return history
+
+
+def history_score(entry, now):
+    """Past hits, each weighed down by its age (half as much every half-life)."""
+    age = max(0.0, now - entry.get('last_hit', 0.0))
+    return entry.get('hits', 0) * 0.5 ** (age / DISCOVERY_HISTORY_HALF_LIFE)
+
+
+def record_hit(address):
+    """Remember that the display answered at `address`, for the next scan's plan."""
+    ip = ipaddress.IPv4Address(address)
+    network = next((net for net, _, _ in interface_networks() if ip in net), None)
+    network = str(network or ipaddress.IPv4Network(f"{ip}/24", strict=False))
+    history = load_history()
+    entry = history.setdefault(network, {'hits': 0})
+    entry['hits'] = entry.get('hits', 0) + 1
+    now = entry['last_hit'] = time.time()
+    if len(history) > DISCOVERY_HISTORY_SIZE:
+        ranked = sorted(history, key=lambda net: history_score(history[net], now), reverse=True)
+        history = {net: history[net] for net in ranked[:DISCOVERY_HISTORY_SIZE]}
+    try:
+        os.makedirs(options.args.library_path, exist_ok=True)
+        path = _history_path()
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(history, f, indent=1)
+        os.replace(path + ".tmp", path)
+    except OSError as e:
+        log(f"Could not save discovery history: {e}", "WARNING")
+
+
+def interface_networks():
+    """(network, own address, activity) for every IPv4 interface that is up, busiest first.
+
+    Activity is the bytes moved since the previous call, or since boot on the first.
+    """
+    global _last_counters
+    import psutil
+    try:
+        stats = psutil.net_if_stats()
+        counters = psutil.net_io_counters(pernic=True)
+    except Exception as e:
+        log(f"Error reading network interfaces: {e}", "ERROR")
+        return []
+    networks = []
+    for interface, addrs in psutil.net_if_addrs().items():
+        if interface in stats and not stats[interface].isup:
+            continue
+        traffic = counters.get(interface)
+        total = traffic.bytes_sent + traffic.bytes_recv if traffic else 0
+        activity = total - _last_counters.get(interface, 0)
+        for addr in addrs:
+            if addr.family != socket.AF_INET or not addr.netmask:
+                continue
+            try:
+                interface_address = ipaddress.IPv4Interface(f"{addr.address}/{addr.netmask}")
+            except ValueError:
+                continue
+            if interface_address.ip.is_loopback or interface_address.network.prefixlen >= 31:
+                continue
+            network = interface_address.network
+            if network.prefixlen < DISCOVERY_MAX_PREFIX:
+                network = ipaddress.IPv4Network(f"{interface_address.ip}/{DISCOVERY_MAX_PREFIX}", strict=False)
+            networks.append((network, interface_address.ip, activity))
+    _last_counters = {name: c.bytes_sent + c.bytes_recv for name, c in counters.items()}
+    networks.sort(key=lambda item: item[2], reverse=True)
+    return networks
+
+
+def read_neighbours():
+    """{address: MAC} from the OS neighbour table: /proc/net/arp on Linux, `arp -a` elsewhere."""
+    entries = []
+    try:
+        if os.path.exists(ARP_TABLE_PATH):
+            with open(ARP_TABLE_PATH, "r") as f:
+                next(f, None)  # header
+                for line in f:
+                    fields = line.split()
+                    # Flags 0x0 is an incomplete entry: the host never answered
+                    if len(fields) >= 4 and fields[2] != "0x0":
+                        entries.append((fields[0], fields[3]))
+        else:
+            kwargs = {'creationflags': subprocess.CREATE_NO_WINDOW} if os.name == 'nt' else {}
+            output = subprocess.run(["arp", "-a"], capture_output=True, text=True,
+                                    timeout=ARP_TIMEOUT, **kwargs).stdout
+            for line in output.splitlines():
+                match = IPV4_PATTERN.search(line)
+                # Windows lists the interface itself as "Interface: <ip>"
+                if match and "incomplete" not in line and not line.lstrip().startswith("Interface"):
+                    mac = MAC_PATTERN.search(line)
+                    entries.append((match.group(1), mac.group(1) if mac else None))
+    except (OSError, subprocess.SubprocessError) as e:
+        log(f"Could not read the neighbour table: {e}", "DEBUG")
+    neighbours = {}
+    for address, mac in entries:
+        try:
+            ip = ipaddress.IPv4Address(address)
+        except ValueError:
+            continue
+        if not (ip.is_multicast or ip.is_loopback or ip.is_unspecified or address.endswith(".255")):
+            neighbours[ip] = mac.replace('-', ':').lower() if mac else None
+    return neighbours
+
+
+def describe_host(address):
+    """(MAC, hostname) of a display just found, from the neighbour table and reverse DNS."""
+    mac = read_neighbours().get(ipaddress.IPv4Address(address))
+    try:
+        hostname = socket.gethostbyaddr(address)[0]
+    except OSError:
+        hostname = None
+    return mac, hostname
+
+
+def plan_discovery(known=()):
+    """Stages of the next scan as (label, [address, ...]), most promising first.
+
+    `known` lists the addresses to try before anything else (the registry's displays).
+    """
+    now = time.time()
+    history = load_history()
+    ranked_history = sorted(history, key=lambda net: history_score(history[net], now), reverse=True)
+    interfaces = interface_networks()
+    own_addresses = {ip for _, ip, _ in interfaces}
+    stages = []
+
+    if known:
+        stages.append(("known addresses", list(known)))
+
+    neighbours = [ip for ip in read_neighbours() if ip not in own_addresses]
+    if neighbours:
+        stages.append(("neighbour table", [str(ip) for ip in neighbours]))
+
+    networks = []
+    if options.args.subnet:
+        try:
+            networks.append(parse_network(options.args.subnet))
+        except ValueError:
+            log(f"Ignoring invalid --subnet {options.args.subnet!r}", "ERROR")
+    # Interface networks are already busiest first; sorting is stable, so past hits lead
+    scores = {}
+    for net in ranked_history:
+        try:
+            scores[parse_network(net)] = history_score(history[net], now)
+        except ValueError:
+            continue
+    networks += sorted((net for net, _, _ in interfaces),
+                       key=lambda net: max((s for past, s in scores.items() if past.overlaps(net)), default=0.0),
+                       reverse=True)
+    networks += [net for net in scores if scores[net] > 0]
+    for prefix in options.args.priority_subnets:
+        try:
+            networks.append(parse_network(prefix))
+        except ValueError:
+            log(f"Ignoring invalid priority subnet {prefix!r}", "WARNING")
+
+    seen = set()
+    for network in networks:
+        if network in seen or any(network.subnet_of(done) for done in seen):
+            continue
+        seen.add(network)
+        hosts = [str(ip) for ip in network.hosts() if ip not in own_addresses]
+        stages.append((f"network {network}", hosts))
+    return stages
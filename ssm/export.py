@@ -0,0 +1,261 @@
+"""`ssm3.py export`: stream recorded samples (--record) to CSV, NDJSON or Parquet.
+
+    ssm3.py export --from 7d --sensor "*/Temperatures/*" --bucket 5m --agg avg,max -o temps.csv
+    ssm3.py export --from 2026-09-01 --to 2026-10-01 --host DESKTOP --format parquet -o sept.parquet
+
+Rows are long format, one per sample and series: time (UTC), host, sensor,
+unit, then `value`, or with --bucket one column per aggregate over each
+bucket plus the number of samples it held. Hosts are the first component of
+a sensor path (the machine name OHM reports), so fleet hosts can be
+selected like the local one.
+
+Everything streams: day files are read in chunks, buckets are folded as
+records go by (one accumulator per selected series), and rows are written
+as they are produced, or in row groups of EXPORT_PARQUET_ROWS for Parquet.
+Months of 1 Hz data export in bounded memory. Parquet needs pyarrow.
+"""
+import argparse
+import csv
+import datetime
+import json
+import math
+import re
+import sys
+import time
+from fnmatch import fnmatchcase
+
+from ssm import history
+from ssm.options import LIBRARY_PATH, comma_list
+
+EXPORT_FORMATS = ('csv', 'ndjson', 'parquet')
+EXPORT_AGGREGATES = ('avg', 'min', 'max')
+EXPORT_PARQUET_ROWS = 65536  # rows per Parquet row group
+
+DURATION_PATTERN = re.compile(r"^(\d+(?:\.\d+)?)([smhdw]?)$")
+DURATION_UNITS = {'': 1, 's': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+
+
+def parse_duration(text):
+    """Seconds from "90", "90s", "15m", "12h", "7d" or "2w"."""
+    match = DURATION_PATTERN.match(text.strip())
+    if not match:
+        raise argparse.ArgumentTypeError(f"invalid duration {text!r} (e.g. 30s, 15m, 12h, 7d)")
+    return float(match.group(1)) * DURATION_UNITS[match.group(2)]
+
+
+def parse_time(text, now=None):
+    """Epoch seconds from ISO 8601 (local time unless it has an offset), "now", or a duration ago."""
+    now = time.time() if now is None else now
+    text = text.strip()
+    if text == "now":
+        return now
+    try:
+        return now - parse_duration(text)
+    except argparse.ArgumentTypeError:
+        pass
+    try:
+        return datetime.datetime.fromisoformat(text).timestamp()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid time {text!r} (e.g. 2026-10-01, 2026-10-01T12:00, 7d)") from None
+
+
+def format_time(timestamp):
+    return datetime.datetime.fromtimestamp(timestamp, datetime.timezone.utc).isoformat(timespec='milliseconds')
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='ssm3.py export', description='Export samples recorded with --record')
+    parser.add_argument('--library-path', default=LIBRARY_PATH,
+                        help=f'Library path the collector records into (default: {LIBRARY_PATH})')
+    parser.add_argument('--from', dest='start', type=parse_time,
+                        help='Start: ISO date/time or how long ago, e.g. 7d (default: the first sample)')
+    parser.add_argument('--to', dest='end', type=parse_time,
+                        help='End (exclusive), same forms as --from (default: now)')
+    parser.add_argument('--sensor', type=comma_list, default=[],
+                        help='Comma separated sensor path patterns, * and ? as wildcards (default: all)')
+    parser.add_argument('--host', type=comma_list, default=[],
+                        help='Comma separated host names (default: all)')
+    parser.add_argument('--bucket', type=parse_duration,
+                        help='Downsample into buckets of this length, e.g. 1m or 1h')
+    parser.add_argument('--agg', type=comma_list, default=['avg'],
+                        help=f'Aggregates per bucket: {", ".join(EXPORT_AGGREGATES)} (default: avg)')
+    parser.add_argument('--format', choices=EXPORT_FORMATS,
+                        help='Output format (default: from the --output extension, else csv)')
+    parser.add_argument('-o', '--output', default='-', help='Output file (default: standard output)')
+    parser.add_argument('--list', action='store_true', help='List the recorded series and exit')
+    return parser
+
+
+def select_series(schema, sensors, hosts):
+    """Slots of the series matching any sensor pattern (a path, or its part after the host) and host."""
+    slots = []
+    for slot, (path, _) in enumerate(schema):
+        host, _, rest = path.partition('/')
+        if hosts and host not in hosts:
+            continue
+        if sensors and not any(fnmatchcase(path, p) or fnmatchcase(rest, p) for p in sensors):
+            continue
+        slots.append(slot)
+    return slots
+
+
+def sample_rows(records, series):
+    """(time, host, sensor, unit, value) for every reading of the selected series."""
+    for timestamp, values in records:
+        for (host, sensor, unit), value in zip(series, values):
+            if value == value:
+                yield (timestamp, host, sensor, unit, value)
+
+
+def bucket_rows(records, series, bucket, aggregates):
+    """(bucket start, host, sensor, unit, *aggregates, samples) per series and bucket with readings."""
+    size = len(series)
+    current = None
+    sums, counts, lows, highs = [], [], [], []
+    for timestamp, values in records:
+        start = math.floor(timestamp / bucket) * bucket
+        if start != current:
+            if current is not None:
+                yield from _flush_bucket(current, series, aggregates, sums, counts, lows, highs)
+            current = start
+            sums, counts = [0.0] * size, [0] * size
+            lows, highs = [math.inf] * size, [-math.inf] * size
+        for i, value in enumerate(values):
+            if value == value:
+                sums[i] += value
+                counts[i] += 1
+                if value < lows[i]:
+                    lows[i] = value
+                if value > highs[i]:
+                    highs[i] = value
+    if current is not None:
+        yield from _flush_bucket(current, series, aggregates, sums, counts, lows, highs)
+
+
+def _flush_bucket(start, series, aggregates, sums, counts, lows, highs):
+    for i, (host, sensor, unit) in enumerate(series):
+        if counts[i]:
+            computed = {'avg': sums[i] / counts[i], 'min': lows[i], 'max': highs[i]}
+            yield (start, host, sensor, unit, *(computed[name] for name in aggregates), counts[i])
+
+
+class CsvOutput:
+    def __init__(self, stream, columns):
+        self.writer = csv.writer(stream, lineterminator="\n")
+        self.writer.writerow(columns)
+
+    def write(self, row):
+        self.writer.writerow((format_time(row[0]),) + row[1:])
+
+    def close(self):
+        pass
+
+
+class NdjsonOutput:
+    def __init__(self, stream, columns):
+        self.stream = stream
+        self.columns = columns
+
+    def write(self, row):
+        entry = dict(zip(self.columns, row))
+        entry['time'] = format_time(row[0])
+        self.stream.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def close(self):
+        pass
+
+
+class ParquetOutput:
+    """Columnar, zstd compressed; rows are buffered into row groups of EXPORT_PARQUET_ROWS."""
+
+    def __init__(self, path, columns):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self.pa = pa
+        types = {'time': pa.timestamp('ms', tz='UTC'), 'host': pa.string(), 'sensor': pa.string(),
+                 'unit': pa.string(), 'samples': pa.int64()}
+        self.schema = pa.schema([(name, types.get(name, pa.float64())) for name in columns])
+        self.writer = pq.ParquetWriter(path, self.schema, compression='zstd')
+        self.columns = [[] for _ in columns]
+
+    def write(self, row):
+        self.columns[0].append(int(row[0] * 1000))
+        for column, value in zip(self.columns[1:], row[1:]):
+            column.append(value)
+        if len(self.columns[0]) >= EXPORT_PARQUET_ROWS:
+            self._flush()
+
+    def _flush(self):
+        if self.columns[0]:
+            self.writer.write_table(self.pa.Table.from_arrays(
+                [self.pa.array(column, type=field.type) for column, field in zip(self.columns, self.schema)],
+                schema=self.schema))
+            self.columns = [[] for _ in self.columns]
+
+    def close(self):
+        self._flush()
+        self.writer.close()
+
+
+def main(argv=None):
+    """Run the export subcommand; returns the exit status."""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    directory = history.history_dir(args.library_path)
+    schema = history.load_schema(directory)
+    if not schema:
+        parser.error(f"no recorded samples in {directory} (run the collector with --record)")
+
+    slots = select_series(schema, args.sensor, args.host)
+    if args.list:
+        for slot in slots:
+            path, unit = schema[slot]
+            print(f"{path}\t{unit}")
+        return 0
+    if not slots:
+        parser.error("no recorded series match --sensor/--host (see --list)")
+
+    unknown = [name for name in args.agg if name not in EXPORT_AGGREGATES]
+    if unknown:
+        parser.error(f"unknown aggregate {', '.join(unknown)} (choose from {', '.join(EXPORT_AGGREGATES)})")
+    # A repeated aggregate would repeat a column name, which Parquet rejects
+    args.agg = list(dict.fromkeys(args.agg))
+    fmt = args.format or next((f for f in EXPORT_FORMATS if args.output.lower().endswith('.' + f)), 'csv')
+    if fmt == 'parquet' and args.output == '-':
+        parser.error("Parquet needs an --output file")
+
+    series = []
+    for slot in slots:
+        path, unit = schema[slot]
+        host, _, sensor = path.partition('/')
+        series.append((host, sensor, unit))
+    records = history.read_records(directory, slots, args.start, args.end)
+    if args.bucket:
+        columns = ['time', 'host', 'sensor', 'unit'] + args.agg + ['samples']
+        rows = bucket_rows(records, series, args.bucket, args.agg)
+    else:
+        columns = ['time', 'host', 'sensor', 'unit', 'value']
+        rows = sample_rows(records, series)
+
+    if fmt == 'parquet':
+        try:
+            output = ParquetOutput(args.output, columns)
+        except ImportError:
+            parser.error("Parquet export needs pyarrow: pip install pyarrow")
+        stream = None
+    else:
+        stream = sys.stdout if args.output == '-' else open(args.output, "w", encoding="utf-8", newline="")
+        output = (CsvOutput if fmt == 'csv' else NdjsonOutput)(stream, columns)
+    written = 0
+    try:
+        for row in rows:
+            output.write(row)
+            written += 1
+    except BrokenPipeError:  # e.g. piped into head
+        return 0
+    finally:
+        output.close()
+        if stream is not None and stream is not sys.stdout:
+            stream.close()
+    print(f"Exported {written} rows of {len(slots)} series", file=sys.stderr)
+    return 0
@@ -0,0 +1,247 @@
+"""Fleet mode: poll other machines' OHM servers from worker processes, one shard each.
+
+Decoding data.json and walking its tree is pure Python and holds the GIL, so
+one process tops out at one core's worth of hosts. With --fleet, the URLs are
+dealt round-robin into up to --fleet-workers shards, and each shard is a
+process of its own that fetches, decodes and indexes its hosts every cycle.
+
+Shards answer the aggregator over a pipe in a compact form: the sensor values
+of each host as one packed array of doubles, with the sensor names and units
+sent only when they change. Each shard always serves the same hosts, so both
+ends can keep that schema between cycles. The aggregator unpacks the arrays
+into the sensor index, where every host's paths start with its machine name,
+so derived metrics, alert rules and anomaly detection cover the whole fleet.
+Two hosts reporting the same machine name would overwrite each other's
+paths, so only the first in --fleet order is used and the other is marked
+down.
+
+A fleet poll runs inside the local collection cycle, so it gets a budget of
+FLEET_CYCLE_SHARE of --interval. Shards stop fetching when the budget is
+spent, and hosts that did not answer within it are marked down for the
+cycle, so one dead host cannot stall the display.
+"""
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from array import array
+
+from ssm import options
+from ssm.logs import log
+
+FLEET_CYCLE_SHARE = 0.8  # fraction of --interval a fleet poll may take
+FLEET_MIN_BUDGET = 0.5  # seconds; the budget at very short intervals
+FLEET_REPLY_SLACK = 0.5  # seconds the aggregator waits beyond the budget for a shard's reply
+
+
+def _shard_main(conn, urls):
+    """Worker process: poll `urls` each time the aggregator asks, until it says stop."""
+    import requests
+    from ssm import logs, ohm
+
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+C is the aggregator's to handle
+    logs.logger.setLevel(logging.CRITICAL)  # failures are reported back with the results
+    session = requests.Session()
+    sent_names = {}
+    while True:
+        try:
+            request = conn.recv()
+        except (EOFError, OSError):
+            return
+        if request is None:
+            return
+        sequence, fetch_timeout, budget = request
+        deadline = time.monotonic() + budget
+        results = []
+        for url in urls:
+            started = time.perf_counter()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                sent_names.pop(url, None)
+                results.append((url, None, None, None, "not polled: the cycle's time budget ran out", 0.0))
+                continue
+            try:
+                data = session.get(url, timeout=min(fetch_timeout, remaining)).json()
+                index = ohm.build_sensor_index(data)
+                cpu_temp, gpu_temp = ohm.resolve_temperatures(data)
+                display = {
+                    'cpu_temp': cpu_temp,
+                    'cpu_usage': ohm.resolve_cpu_load(data),
+                    'ram_usage': ohm.resolve_ram_usage(data),
+                    'gpu_temp': gpu_temp,
+                    'gpu_usage': ohm.resolve_gpu_load(data),
+                }
+                names = list(index)
+                schema = None
+                if names != sent_names.get(url):
+                    schema = (names, [unit for _, unit in index.values()])
+                    sent_names[url] = names
+                values = array('d', [value for value, _ in index.values()]).tobytes()
+                results.append((url, schema, values, display, None, time.perf_counter() - started))
+            except Exception as e:
+                sent_names.pop(url, None)
+                results.append((url, None, None, None, f"{type(e).__name__}: {e}",
+                                time.perf_counter() - started))
+        conn.send((sequence, results))
+
+
+class _Shard:
+    def __init__(self, urls):
+        self.urls = urls
+        self.process = None
+        self.conn = None
+        self.restarts = 0
+
+
+class FleetCollector:
+    """Aggregator for the shard processes; `collect` is an ohm.sensor_sources entry."""
+
+    def __init__(self, urls, workers=None):
+        workers = max(1, min(workers or os.cpu_count() or 1, len(urls)))
+        self.shards = [_Shard(urls[i::workers]) for i in range(workers)]
+        self.context = multiprocessing.get_context("spawn")  # same behaviour on Windows and Linux
+        self.sequence = 0
+        self.schemas = {}  # url -> (names, units) last sent by its shard
+        self.hosts = {url: {'up': False, 'error': None, 'poll_seconds': None, 'display': None}
+                      for url in urls}
+        self.polls = 0
+        self.lock = threading.Lock()  # guards `hosts` and `polls` against the stats server and dashboard
+
+    def __len__(self):
+        return len(self.hosts)
+
+    def _start_shard(self, shard):
+        parent, child = self.context.Pipe()
+        shard.process = self.context.Process(target=_shard_main, name="ssm-fleet-shard", daemon=True,
+                                             args=(child, shard.urls))
+        shard.process.start()
+        child.close()
+        shard.conn = parent
+        for url in shard.urls:
+            self.schemas.pop(url, None)
+
+    def start(self):
+        for shard in self.shards:
+            self._start_shard(shard)
+        log("Polling %d fleet hosts from %d worker processes", "INFO", len(self.hosts), len(self.shards))
+        return self
+
+    def stop(self, timeout=2.0):
+        for shard in self.shards:
+            if shard.process is None:
+                continue
+            try:
+                shard.conn.send(None)
+            except (OSError, ValueError):
+                pass
+            shard.process.join(timeout)
+            if shard.process.is_alive():
+                shard.process.terminate()
+            shard.conn.close()
+            shard.process = None
+
+    def collect(self):
+        """Poll every host once, all shards in parallel; returns {path: (value, unit)} for the fleet."""
+        self.sequence += 1
+        fetch_timeout = options.args.ohm_fetch_timeout
+        budget = max(FLEET_MIN_BUDGET, options.args.interval * FLEET_CYCLE_SHARE)
+        asked = []
+        for shard in self.shards:
+            if shard.process is None or not shard.process.is_alive():
+                if shard.process is not None:
+                    shard.restarts += 1
+                    log("Fleet worker for %s died, restarting", "WARNING", ", ".join(shard.urls))
+                self._start_shard(shard)
+            try:
+                shard.conn.send((self.sequence, fetch_timeout, budget))
+                asked.append(shard)
+            except (OSError, ValueError):
+                shard.process.terminate()
+
+        polled = {}  # url -> (names, readings, units, display, elapsed)
+        deadline = time.monotonic() + budget + FLEET_REPLY_SLACK
+        for shard in asked:
+            reply = None
+            try:
+                # Replies to earlier, timed-out requests may still be queued: skip them,
+                # but keep their schemas, which the shard will not send again
+                while shard.conn.poll(max(0.0, deadline - time.monotonic())):
+                    sequence, results = shard.conn.recv()
+                    for url, schema, *_ in results:
+                        if schema is not None:
+                            self.schemas[url] = schema
+                    if sequence == self.sequence:
+                        reply = results
+                        break
+            except (EOFError, OSError):
+                reply = None
+            if reply is None:
+                for url in shard.urls:
+                    self._host_failed(url, "no reply from the worker process within the cycle")
+                continue
+            for url, schema, values, display, error, elapsed in reply:
+                if error is not None:
+                    self.schemas.pop(url, None)
+                    self._host_failed(url, error)
+                    continue
+                names, units = self.schemas[url]
+                readings = array('d')
+                readings.frombytes(values)
+                polled[url] = (names, readings, units, display, elapsed)
+
+        # Paths start with the machine name: the first host in --fleet order to report a name owns it
+        sensors = {}
+        owners = {}
+        for url in self.hosts:
+            if url not in polled:
+                continue
+            names, readings, units, display, elapsed = polled[url]
+            if names:
+                machine = names[0].split('/', 1)[0]
+                if machine in owners:
+                    self._host_failed(url, f"machine name {machine!r} is already reported by {owners[machine]}")
+                    continue
+                owners[machine] = url
+            sensors.update(zip(names, zip(readings, units)))
+            with self.lock:
+                host = self.hosts[url]
+                was_up = host['up']
+                host.update(up=True, error=None, poll_seconds=round(elapsed, 4), display=display)
+            if not was_up:
+                log("Fleet host %s is up", "SUCCESS", url, key=f"fleet:{url}")
+        with self.lock:
+            self.polls += 1
+        return sensors
+
+    def _host_failed(self, url, error):
+        with self.lock:
+            host = self.hosts[url]
+            report = host['up'] or host['error'] is None
+            host.update(up=False, error=error, display=None)
+        if report:
+            log("Fleet host %s is down: %s", "WARNING", url, error, key=f"fleet:{url}")
+
+    def snapshot(self):
+        """Per-host state and display metrics, for the /fleet route; a copy, safe to serialise."""
+        with self.lock:
+            hosts = {url: dict(host, display=dict(host['display']) if host['display'] is not None else None)
+                     for url, host in self.hosts.items()}
+            return {'workers': len(self.shards), 'polls': self.polls, 'hosts': hosts}
+
+    def format_prometheus(self):
+        hosts = self.snapshot()['hosts']
+        lines = ["# TYPE ssm3_fleet_host_up gauge"]
+        lines += [f'ssm3_fleet_host_up{{url="{url}"}} {int(host["up"])}' for url, host in hosts.items()]
+        lines.append("# TYPE ssm3_fleet_poll_seconds gauge")
+        lines += [f'ssm3_fleet_poll_seconds{{url="{url}"}} {host["poll_seconds"]}'
+                  for url, host in hosts.items() if host['poll_seconds'] is not None]
+        lines.append("# TYPE ssm3_fleet_worker_restarts_total counter")
+        lines += [f'ssm3_fleet_worker_restarts_total{{worker="{i}"}} {shard.restarts}'
+                  for i, shard in enumerate(self.shards)]
+        return "\n".join(lines) + "\n"
+
+
+# The collector's fleet poller with --fleet, set up by the CLI
+collector = None
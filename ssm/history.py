@@ -0,0 +1,195 @@
+"""Sample history: every cycle's sensor values appended to day files, for `ssm3.py export`.
+
+With --record, the collector keeps what it would otherwise throw away after
+each push. Files live in <library path>/history:
+
+    schema.json         {"series": [{"path": ..., "unit": ...}, ...]}, one
+                        entry per slot; series are only ever appended
+    YYYY-MM-DD.samples  one record per cycle (UTC days): timestamp (double)
+                        and slot count (uint32), then that many doubles,
+                        NaN where a series had no reading
+
+A record is as wide as the schema was when it was written, so series added
+later simply read as missing in older records. At 1 Hz, 100 sensors take
+about 70 MB a day; day files older than --record-days are deleted.
+
+Readers stream the files in chunks, so memory stays bounded however long
+the requested range is. A crash can leave part of a record at the end of a
+day file; the writer truncates it to the last whole record before appending
+again, and readers stop at a record that cannot be whole (wider than the
+schema or past the end of the file).
+"""
+import json
+import os
+import struct
+import time
+from array import array
+
+from ssm import options
+from ssm.logs import log
+
+HISTORY_DIR = "history"
+HISTORY_SCHEMA = "schema.json"
+HISTORY_SUFFIX = ".samples"
+HISTORY_RECORD = struct.Struct("<dI")
+HISTORY_READ_CHUNK = 1 << 20  # bytes read from a day file at a time
+
+NAN = float('nan')
+
+
+def history_dir(library_path):
+    return os.path.join(library_path, HISTORY_DIR)
+
+
+def day_name(timestamp):
+    return time.strftime("%Y-%m-%d", time.gmtime(timestamp)) + HISTORY_SUFFIX
+
+
+def load_schema(directory):
+    """[(path, unit), ...] by slot; empty if nothing was recorded yet."""
+    try:
+        with open(os.path.join(directory, HISTORY_SCHEMA), "r", encoding="utf-8") as f:
+            return [(series['path'], series['unit']) for series in json.load(f)['series']]
+    except FileNotFoundError:
+        return []
+
+
+class HistoryWriter:
+    """Appends one record per cycle; a sensor listener."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.series = load_schema(directory)
+        self.slots = {path: slot for slot, (path, _) in enumerate(self.series)}
+        self.file = None
+        self.day = None
+
+    def _write_schema(self):
+        path = os.path.join(self.directory, HISTORY_SCHEMA)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({'series': [{'path': name, 'unit': unit} for name, unit in self.series]}, f, indent=1)
+        os.replace(path + ".tmp", path)
+
+    def _rotate(self, day):
+        if self.file is not None:
+            self.file.close()
+        path = os.path.join(self.directory, day)
+        self.file = open(path, "ab")
+        complete = complete_length(path, len(self.series))
+        if complete < self.file.tell():
+            log("Dropping %d bytes of an incomplete record at the end of %s", "WARNING",
+                self.file.tell() - complete, day)
+            self.file.truncate(complete)
+        self.day = day
+        self.prune()
+
+    def prune(self):
+        """Delete day files older than --record-days."""
+        oldest = day_name(time.time() - options.args.record_days * 86400)
+        for name in os.listdir(self.directory):
+            if name.endswith(HISTORY_SUFFIX) and name < oldest and name != self.day:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                    log("Deleted sample history %s", "INFO", name)
+                except OSError as e:
+                    log(f"Could not delete sample history {name}: {e}", "WARNING")
+
+    def update(self, timestamp, readings):
+        """Record one cycle of {path: (value, unit)}."""
+        try:
+            values = array('d', [NAN]) * len(self.series)
+            added = False
+            for name, (value, unit) in readings.items():
+                slot = self.slots.get(name)
+                if slot is None:
+                    slot = self.slots[name] = len(self.series)
+                    self.series.append((name, unit))
+                    values.append(NAN)
+                    added = True
+                values[slot] = value
+            if added:
+                self._write_schema()  # before the first record that uses the new slots
+            day = day_name(timestamp)
+            if day != self.day:
+                self._rotate(day)
+            self.file.write(HISTORY_RECORD.pack(timestamp, len(values)) + values.tobytes())
+            self.file.flush()
+        except OSError as e:
+            log(f"Could not record samples: {e}", "ERROR", key="history_error")
+            # Part of the record may be on disk; reopening truncates it before the next one
+            self.close()
+            self.day = None
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+def complete_length(path, width):
+    """Bytes of `path` covered by whole records of at most `width` values each."""
+    header = HISTORY_RECORD.size
+    offset = 0
+    with open(path, "rb", buffering=0) as f:
+        size = os.fstat(f.fileno()).st_size
+        while offset + header <= size:
+            f.seek(offset)
+            _, count = HISTORY_RECORD.unpack(f.read(header))
+            if count > width or offset + header + 8 * count > size:
+                break
+            offset += header + 8 * count
+    return offset
+
+
+def day_files(directory, start=None, end=None):
+    """Day files that can hold samples between `start` and `end` (epoch seconds), oldest first."""
+    first = day_name(start) if start is not None else ""
+    last = day_name(end) if end is not None else "~"
+    try:
+        names = sorted(name for name in os.listdir(directory) if name.endswith(HISTORY_SUFFIX))
+    except FileNotFoundError:
+        return []
+    return [os.path.join(directory, name) for name in names if first <= name <= last]
+
+
+def read_records(directory, slots, start=None, end=None, chunk=HISTORY_READ_CHUNK):
+    """Yield (timestamp, [value per slot in `slots`]) in time order, within [start, end)."""
+    header = HISTORY_RECORD.size
+    width = len(load_schema(directory))
+    for path in day_files(directory, start, end):
+        with open(path, "rb") as f:
+            pending = b""
+            position = 0  # file offset of pending[0]
+            damaged = False
+            while not damaged:
+                data = f.read(chunk)
+                if not data:
+                    break
+                buf = pending + data if pending else data
+                view = memoryview(buf)
+                offset = 0
+                while offset + header <= len(buf):
+                    timestamp, count = HISTORY_RECORD.unpack_from(buf, offset)
+                    if count > width:
+                        # Not a record header: the rest of the file cannot be framed
+                        log("Ignoring %s from byte %d on: damaged record", "WARNING", path, position + offset)
+                        damaged = True
+                        break
+                    size = header + 8 * count
+                    if offset + size > len(buf):
+                        break
+                    if (start is None or timestamp >= start) and (end is None or timestamp < end):
+                        values = array('d')
+                        values.frombytes(view[offset + header:offset + size])
+                        yield timestamp, [values[slot] if slot < count else NAN for slot in slots]
+                    offset += size
+                view.release()
+                pending = buf[offset:]
+                position += offset
+            if pending and not damaged:
+                log("Ignoring %d bytes of an incomplete record at the end of %s", "WARNING", len(pending), path)
+
+
+# The collector's history with --record, set up by the CLI
+writer = None
@@ -0,0 +1,220 @@
+"""Leveled, rate-limited logging through a queue to a background writer thread."""
+import atexit
+import json
+import logging
+import logging.handlers
+import sys
+import threading
+import time
+from collections import OrderedDict
+from queue import Queue, Full
+
+# Custom levels so SUCCESS and METRIC lines can be filtered like any other
+SUCCESS = 25
+METRIC = 15
+logging.addLevelName(SUCCESS, "SUCCESS")
+logging.addLevelName(METRIC, "METRIC")
+
+LOG_LEVELS = {
+    "INFO": logging.INFO,
+    "SUCCESS": SUCCESS,
+    "WARNING": logging.WARNING,
+    "ERROR": logging.ERROR,
+    "DEBUG": logging.DEBUG,
+    "METRIC": METRIC
+}
+
+LOG_PREFIXES = {
+    "INFO": "ℹ️",
+    "SUCCESS": "✅",
+    "WARNING": "⚠️",
+    "ERROR": "❌",
+    "DEBUG": "🔍",
+    "METRIC": "📊"
+}
+
+# Verbosity -> lowest level that is emitted
+VERBOSITY_LEVELS = {0: logging.WARNING, 1: METRIC, 2: logging.DEBUG}
+
+LOG_QUEUE_SIZE = 10000  # records buffered for the writer thread before dropping
+LOG_RATE_PERIOD = 10.0  # seconds per rate-limit window
+LOG_RATE_BURST = 5  # records per message key allowed in each window
+LOG_RATE_MAX_KEYS = 1024  # tracked keys; beyond this the oldest windows are forgotten
+
+LOG_ONCE_MAX_KEYS = 4096  # distinct (category, id) pairs remembered by log_once
+
+logger = logging.getLogger("ssm3")
+log_listener = None
+console_output = None  # the handler setup_logging writes through
+
+def log(message, type="INFO", *args, key=None):
+    """Log a message with the given type.
+    
+    Pass values as extra arguments ("%s"-style) rather than pre-formatting an
+    f-string, so that suppressed levels never pay for formatting. Messages are
+    rate limited per key, which defaults to the unformatted message.
+    """
+    level = LOG_LEVELS.get(type, logging.INFO)
+    if not logger.isEnabledFor(level):
+        return
+    logger.log(level, message, *args, extra={'type': type, 'key': key or message})
+
+class RateLimitFilter(logging.Filter):
+    """Allow at most `burst` records per key in each `period` seconds."""
+    
+    def __init__(self, period=LOG_RATE_PERIOD, burst=LOG_RATE_BURST):
+        super().__init__()
+        self.period = period
+        self.burst = burst
+        self.windows = OrderedDict()  # key -> [window start, records emitted, records suppressed], oldest first
+        self.lock = threading.Lock()  # handlers run filters outside their own lock
+    
+    def filter(self, record):
+        key = getattr(record, 'key', record.msg)
+        now = record.created
+        with self.lock:
+            window = self.windows.get(key)
+            if window is None or now - window[0] >= self.period:
+                suppressed = window[2] if window else 0
+                if window is None:
+                    # Evict the oldest windows so one-off messages can't pile up
+                    while len(self.windows) >= LOG_RATE_MAX_KEYS:
+                        self.windows.popitem(last=False)
+                window = self.windows[key] = [now, 0, 0]
+                self.windows.move_to_end(key)
+                record.suppressed = suppressed
+            if window[1] >= self.burst:
+                window[2] += 1
+                return False
+            window[1] += 1
+            return True
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Queue records for the writer thread without ever blocking the caller.
+    
+    Formatting is left to the writer thread, and records are dropped (and
+    counted) if the queue is full rather than stalling a collection cycle.
+    """
+    
+    def __init__(self, queue):
+        super().__init__(queue)
+        self.dropped = 0
+    
+    def prepare(self, record):
+        return record
+    
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except Full:
+            self.dropped += 1
+
+class ConsoleFormatter(logging.Formatter):
+    """Human-readable output with the emoji prefix for each log type."""
+    
+    def format(self, record):
+        type = getattr(record, 'type', record.levelname)
+        message = f"{LOG_PREFIXES.get(type, 'ℹ️')} {record.getMessage()}"
+        if getattr(record, 'suppressed', 0):
+            message += f" (+{record.suppressed} similar suppressed)"
+        if record.exc_info:
+            message += "\n" + self.formatException(record.exc_info)
+        return message
+
+class JsonLinesFormatter(logging.Formatter):
+    """One JSON object per record, for log shippers and later analysis."""
+    
+    def format(self, record):
+        entry = {
+            'ts': round(record.created, 3),
+            'level': record.levelname,
+            'type': getattr(record, 'type', record.levelname),
+            'msg': record.getMessage()
+        }
+        if getattr(record, 'suppressed', 0):
+            entry['suppressed'] = record.suppressed
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+class LogDeduper:
+    """Remembers which (category, id) pairs have been logged, in bounded LRU order.
+    
+    With a TTL, a pair is reported again once that many seconds have passed
+    since it was last emitted.
+    """
+    
+    def __init__(self, max_keys=LOG_ONCE_MAX_KEYS, ttl=None):
+        self.max_keys = max_keys
+        self.ttl = ttl
+        self.seen = OrderedDict()  # (category, id) -> time last emitted
+    
+    def __len__(self):
+        return len(self.seen)
+    
+    def first_time(self, category, identifier):
+        """Return True if this pair should be logged now, and remember it."""
+        key = (category, identifier)
+        now = time.monotonic()
+        emitted = self.seen.get(key)
+        if emitted is not None and (self.ttl is None or now - emitted < self.ttl):
+            self.seen.move_to_end(key)
+            return False
+        self.seen[key] = now
+        self.seen.move_to_end(key)
+        if len(self.seen) > self.max_keys:
+            self.seen.popitem(last=False)
+        return True
+
+log_deduper = LogDeduper()
+
+def setup_logging(verbosity=1, fmt="text", log_file=None):
+    """Route log() through a queue to a background writer thread."""
+    global log_listener, console_output
+    
+    level = VERBOSITY_LEVELS.get(verbosity, METRIC)
+    
+    if log_file:
+        output = logging.FileHandler(log_file, encoding="utf-8")
+    else:
+        output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JsonLinesFormatter() if fmt == "json" else ConsoleFormatter())
+    
+    queue_handler = NonBlockingQueueHandler(Queue(LOG_QUEUE_SIZE))
+    queue_handler.addFilter(RateLimitFilter())
+    
+    logger.handlers[:] = [queue_handler]
+    logger.setLevel(level)
+    logger.propagate = False
+    
+    stop_logging()
+    console_output = output
+    log_listener = logging.handlers.QueueListener(queue_handler.queue, output)
+    log_listener.start()
+
+def redirect_console(handler):
+    """Send the console's records to `handler` instead, or back to the console with None.
+    
+    A --log-file keeps its records either way.
+    """
+    if log_listener is None or isinstance(console_output, logging.FileHandler):
+        return
+    log_listener.handlers = (handler or console_output,)
+
+def stop_logging():
+    """Flush queued records and stop the writer thread."""
+    global log_listener
+    
+    if log_listener is not None:
+        log_listener.stop()
+        log_listener = None
+
+atexit.register(stop_logging)
+
+def log_once(category, identifier, message, type="DEBUG", *args):
+    """Log a message only the first time (or once per TTL) for a category and id.
+    
+    Arguments after `type` are formatted into the message only if it is emitted.
+    """
+    if log_deduper.first_time(category, identifier):
+        log(message, type, *args)
@@ -0,0 +1,322 @@
+"""Finding the NodeMCU display on the network and pushing metrics to it."""
+import json
+import os
+import socket
+import time
+from queue import Queue
+from threading import Thread
+
+from ssm import derived, discovery, options
+from ssm.logs import log
+from ssm.stats import timed, timed_stage
+from ssm.system import get_system_metrics
+
+# NodeMCU IP address (will be discovered)
+nodemcu_ip = None
+last_discovery_time = 0
+
+udp_socket = None
+udp_session_id = int.from_bytes(os.urandom(4), "little")
+udp_sequence = 0
+last_http_push_time = 0
+
+# Offline outbox (ssm.outbox.MetricsOutbox), set up by the CLI with --outbox
+outbox = None
+
+# Batched updates: many samples per request to /update/batch (ssm.batch.MetricsBatcher)
+batcher = None
+
+# Known displays and their health (ssm.registry.DeviceRegistry), set up by the CLI
+registry = None
+
+def check_port_80(ip, queue):
+    """Check if port 80 is open on the given IP."""
+    import requests
+    try:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.settimeout(options.args.scan_connect_timeout)
+        result = sock.connect_ex((ip, 80))
+        if result == 0:  # Port is open
+            try:
+                # Try to get the root page
+                response = requests.get(f"http://{ip}/", timeout=options.args.scan_probe_timeout)
+                # Check if it's our NodeMCU by looking for specific content
+                if "IT Infrastructure" in response.text:
+                    queue.put(ip)
+            except:
+                pass
+    except:
+        pass
+    finally:
+        sock.close()
+
+def probe_hosts(hosts, heartbeat=None):
+    """Probe `hosts` for the NodeMCU, --scan-workers at a time; returns the first found or None.
+    
+    `heartbeat` is called after every batch, so a supervised caller is not
+    taken for stuck during a long scan.
+    """
+    result_queue = Queue()
+    workers = max(1, options.args.scan_workers)
+    for start in range(0, len(hosts), workers):
+        threads = [Thread(target=check_port_80, args=(ip, result_queue), daemon=True)
+                   for ip in hosts[start:start + workers]]
+        for thread in threads:
+            thread.start()
+        # Each probe gives up after its connect and page timeouts, so this bounds the batch
+        deadline = time.monotonic() + options.args.scan_connect_timeout + options.args.scan_probe_timeout + 0.1
+        for thread in threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        if heartbeat is not None:
+            heartbeat()
+        if not result_queue.empty():
+            return result_queue.get_nowait()
+    return None
+
+@timed("discover_nodemcu")
+def discover_nodemcu(heartbeat=None):
+    """Discover NodeMCU by probing the planned addresses (see ssm.discovery and probe_hosts)."""
+    global nodemcu_ip, last_discovery_time
+    import requests
+    
+    # A push (or probe) that got through recently is proof enough; no round trip needed
+    if nodemcu_ip and registry is not None and registry.is_live(nodemcu_ip, options.args.discovery_timeout):
+        return True
+    
+    # If already manually specified, skip discovery
+    if options.args.ip:
+        try:
+            response = requests.get(f"http://{nodemcu_ip}/", timeout=1)
+            if response.status_code == 200:
+                if registry is not None:
+                    registry.found(nodemcu_ip)
+                return True
+            else:
+                log(f"Manually specified IP {nodemcu_ip} is not responding correctly", "ERROR")
+        except Exception as e:
+            log(f"Error connecting to manually specified IP {nodemcu_ip}: {e}", "ERROR")
+            return False
+    
+    # If we have a recent discovery and the IP is still responding, use it
+    if nodemcu_ip and time.time() - last_discovery_time < options.args.discovery_timeout:
+        try:
+            response = requests.get(f"http://{nodemcu_ip}/", timeout=1)
+            if response.status_code == 200:
+                return True
+        except:
+            pass
+    
+    log("Searching for NodeMCU on the network...")
+    
+    # Known displays and live neighbours first, then whole networks
+    known = [address for address in registry.ranked() if ':' not in address] if registry is not None else []
+    probed = set()
+    for label, hosts in discovery.plan_discovery(known):
+        hosts = [ip for ip in hosts if ip not in probed]
+        if not hosts:
+            continue
+        probed.update(hosts)
+        log(f"Probing {label} ({len(hosts)} addresses)")
+        found = probe_hosts(hosts, heartbeat)
+        if found:
+            nodemcu_ip = found
+            last_discovery_time = time.time()
+            log(f"Found NodeMCU at {nodemcu_ip}", "SUCCESS")
+            discovery.record_hit(nodemcu_ip)
+            if registry is not None:
+                registry.found(nodemcu_ip, *discovery.describe_host(nodemcu_ip))
+            return True
+    
+    log("NodeMCU not found on the network", "ERROR")
+    log("Please ensure:", "ERROR")
+    log("  • NodeMCU is powered on", "ERROR")
+    log("  • NodeMCU is connected to the same WiFi network", "ERROR")
+    log("  • The WiFi credentials are correct", "ERROR")
+    log("You can specify the subnet with --subnet parameter (e.g., --subnet 192.168.137)", "INFO")
+    return False
+
+def build_filtered_metrics(cpu_temp, gpu_temp):
+    """Collect system metrics and combine them with the temperatures into the display payload."""
+    metrics = get_system_metrics()
+    
+    # Add temperature data (ensuring we have numeric values)
+    if cpu_temp == "N/A":
+        metrics['cpu_temp'] = "N/A"
+    else:
+        metrics['cpu_temp'] = round(float(cpu_temp) if cpu_temp is not None else 0, 1)
+        
+    if gpu_temp == "N/A":
+        metrics['gpu_temp'] = "N/A"
+    else:
+        metrics['gpu_temp'] = round(float(gpu_temp) if gpu_temp is not None else 0, 1)
+    
+    log("  • cpu_temp: %s°C", "METRIC", metrics['cpu_temp'])
+    log("  • gpu_temp: %s°C", "METRIC", metrics['gpu_temp'])
+    
+    # Create a simplified JSON payload with only the required metrics
+    payload = {
+        'cpu_temp': metrics['cpu_temp'],
+        'cpu_usage': metrics['cpu_usage'],
+        'ram_usage': metrics['ram_usage'],
+        'gpu_temp': metrics['gpu_temp'],
+        'gpu_usage': metrics['gpu_usage']
+    }
+    
+    if derived.display_stats is not None:
+        derived.display_stats.update(time.time(), payload)
+        if options.args.smooth:
+            payload = derived.smooth_payload(payload, derived.display_stats)
+            log("Smoothed payload: %s", "DEBUG", payload)
+    return payload
+
+def send_metrics_via_udp(filtered_metrics):
+    """Send a metrics frame to the NodeMCU over UDP without waiting for a reply."""
+    global udp_socket
+    
+    if udp_socket is None:
+        udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        udp_socket.setblocking(False)
+    
+    host = nodemcu_ip.split(':')[0]
+    try:
+        udp_socket.sendto(json.dumps(filtered_metrics).encode(), (host, options.args.udp_port))
+        return True
+    except OSError as e:
+        # A full send buffer or unreachable network only costs us this frame
+        log(f"UDP frame to NodeMCU dropped: {e}", "DEBUG")
+        return False
+
+@timed("send_filtered_metrics_to_nodemcu")
+def send_filtered_metrics_to_nodemcu(cpu_temp, gpu_temp):
+    """Send only the required filtered metrics to the NodeMCU."""
+    try:
+        # Built every cycle, display or not: it feeds the display stats the alert rules read
+        filtered_metrics = build_filtered_metrics(cpu_temp, gpu_temp)
+        
+        # If we don't have the NodeMCU IP, try to discover it
+        if not nodemcu_ip:
+            if not discover_nodemcu():
+                if outbox is not None:
+                    outbox.add(filtered_metrics)
+                return
+        
+        push_metrics(filtered_metrics)
+            
+    except Exception as e:
+        log(f"Error preparing metrics for NodeMCU: {e}", "ERROR")
+
+def push_metrics(filtered_metrics, rediscover=True):
+    """Push one display payload to the known NodeMCU over UDP, as a batch or over HTTP.
+    
+    With rediscover=False a failed connection only forgets the IP and leaves
+    finding the device again to the caller (the service's discovery worker).
+    """
+    global udp_sequence
+    
+    # Sequence numbers let the NodeMCU drop stale or reordered UDP frames
+    if options.args.udp:
+        udp_sequence = (udp_sequence + 1) & 0xFFFFFFFF
+        filtered_metrics['sid'] = udp_session_id
+        filtered_metrics['seq'] = udp_sequence
+        
+        if time.time() - last_http_push_time < options.args.reconcile_interval:
+            if send_metrics_via_udp(filtered_metrics):
+                log("Sent UDP frame #%d to NodeMCU", "DEBUG", udp_sequence)
+            return
+        
+        log("Reconciling NodeMCU state over HTTP", "DEBUG")
+    
+    # In batch mode, queue the sample and only hit the network once the batch is due
+    if batcher is not None:
+        batcher.add(filtered_metrics)
+        if not batcher.due():
+            log("Queued sample for batch (%d/%d)", "DEBUG", len(batcher), batcher.max_samples)
+            return
+        flush_batch(rediscover)
+    else:
+        payload = json.dumps(filtered_metrics)
+        log("Sending data to NodeMCU: %s", "INFO", payload)
+        post_samples([filtered_metrics], f"http://{nodemcu_ip}/update", 'application/json', payload, rediscover)
+
+def flush_batch(rediscover=True):
+    """Send whatever the batcher holds now, due or not (also used at shutdown)."""
+    if batcher is None or not len(batcher):
+        return
+    from ssm.batch import encode_batch, split_batch
+    samples = batcher.drain()
+    if not nodemcu_ip:
+        if outbox is not None:
+            for sample in samples:
+                outbox.add(sample)
+        return
+    fmt = options.args.batch_format
+    if options.args.batch_url:
+        url = options.args.batch_url
+        batches = [(samples, *encode_batch(samples, fmt))]
+    else:
+        # The display only takes batches up to its firmware limits
+        url = f"http://{nodemcu_ip}/update/batch"
+        batches = split_batch(samples, fmt)
+    sent = 0
+    for chunk, content_type, payload in batches:
+        log("Sending batch of %d samples to NodeMCU (%d bytes, %s)", "INFO", len(chunk), len(payload), fmt)
+        if not post_samples(chunk, url, content_type, payload, rediscover):
+            # The failed chunk is in the outbox already; keep the rest with it
+            if outbox is not None:
+                for sample in samples[sent + len(chunk):]:
+                    outbox.add(sample)
+            return
+        sent += len(chunk)
+
+def post_samples(samples, url, content_type, payload, rediscover=True):
+    """POST an encoded payload, keeping `samples` in the outbox if it does not get through."""
+    global nodemcu_ip, last_discovery_time, last_http_push_time
+    import requests
+    
+    # Mark the push before sending so a dead device is not retried every cycle
+    last_http_push_time = time.time()
+    headers = {'Content-Type': content_type}
+    
+    address = nodemcu_ip
+    try:
+        # Set a reasonable timeout to prevent hanging
+        with timed_stage("nodemcu_post"):
+            started = time.perf_counter()
+            r = requests.post(url, data=payload, headers=headers, timeout=options.args.push_timeout)
+            
+    except (requests.exceptions.Timeout, requests.exceptions.ConnectionError):
+        log("Connection to NodeMCU failed. Retrying discovery...", "ERROR")
+        if registry is not None:
+            registry.record_push(address, False)
+        if outbox is not None:
+            for sample in samples:
+                outbox.add(sample)
+        nodemcu_ip = None  # Reset IP to trigger rediscovery
+        last_discovery_time = 0  # Reset discovery time to force new scan
+        if rediscover:
+            discover_nodemcu()
+        
+    except Exception as e:
+        log(f"Failed to send metrics to NodeMCU: {e}", "ERROR")
+        if outbox is not None:
+            for sample in samples:
+                outbox.add(sample)
+        
+    else:
+        # Every push doubles as the display's liveness check
+        if registry is not None:
+            registry.record_push(address, r.status_code == 200, time.perf_counter() - started)
+        
+        if r.status_code == 200:
+            log("Filtered metrics sent to NodeMCU successfully!", "SUCCESS")
+            # The device is reachable again, drain anything buffered during the outage into
+            # the history sink (the display itself only shows the latest sample)
+            if outbox is not None and options.args.replay_url:
+                outbox.replay(options.args.replay_url)
+            return True
+        log(f"Unexpected response from NodeMCU: HTTP {r.status_code}", "WARNING")
+        log(f"Response: {r.text}", "WARNING")
+        if outbox is not None:
+            for sample in samples:
+                outbox.add(sample)
+    return False
@@ -0,0 +1,201 @@
+"""Telegram notifications for host-side alerts: a bounded queue, digests and paced sends.
+
+The collector only ever calls TelegramNotifier.submit, which puts the alert
+on a bounded queue and returns; when the queue is full the alert is counted
+and dropped, so an alert storm never blocks collection. A background thread
+waits `window` seconds after the first queued alert for others to arrive,
+then sends everything collected as one digest message. Sends are paced by a
+token bucket to stay inside the Bot API limits, and a 429 reply pauses the
+bucket for the `retry_after` the API asks for.
+"""
+import socket
+import time
+from queue import Empty, Full, Queue
+from threading import Thread
+
+from ssm.logs import log
+
+TELEGRAM_API_URL = "https://api.telegram.org"
+TELEGRAM_RATE = 1.0  # messages per second to one chat, per the Bot API limits
+TELEGRAM_BURST = 1  # messages that may go out back to back; a digest is usually one
+TELEGRAM_MAX_MESSAGE = 4096  # characters per sendMessage
+TELEGRAM_TIMEOUT = (5, 10)  # (connect, read) seconds
+NOTIFY_WINDOW = 5.0  # seconds an alert waits for others to share its message
+NOTIFY_QUEUE_SIZE = 1000  # alerts buffered for the sender thread before dropping
+NOTIFY_SEND_ATTEMPTS = 3
+
+# Same wording as the firmware's checkThresholds messages
+DISPLAY_LABELS = {
+    'cpu_temp': ("CPU Temperature", "°C"),
+    'cpu_usage': ("CPU Usage", "%"),
+    'ram_usage': ("RAM Usage", "%"),
+    'gpu_temp': ("GPU Temperature", "°C"),
+    'gpu_usage': ("GPU Usage", "%"),
+}
+
+
+class TokenBucket:
+    """Pacing for `rate` events per second with bursts of up to `burst`."""
+
+    def __init__(self, rate=TELEGRAM_RATE, burst=TELEGRAM_BURST, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.tokens = float(burst)
+        self.updated = clock()
+
+    def reserve(self):
+        """Take a token; returns how many seconds to wait before using it."""
+        now = self.clock()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def pause(self, seconds):
+        """Hold every token back for at least `seconds` (a 429's retry_after)."""
+        self.reserve()
+        self.tokens = min(self.tokens, -seconds * self.rate)
+
+
+def format_event(event):
+    """One line per alert, e.g. "⚠️ CPU Temperature: 85.0°C (Threshold: 80.0°C)"."""
+    label, unit = DISPLAY_LABELS.get(event['series'], (event['series'], event.get('unit', "")))
+    if event['rule'] not in (event['series'], label):
+        label = f"{event['rule']}: {label}"
+    if event['stat'] == 'rate':
+        label, unit = f"{label} trend", f"{unit}/min"
+    elif event['stat'] == 'ewma':
+        label = f"{label} (average)"
+    if event['state'] == 'firing':
+        return f"⚠️ {label}: {event['value']:.1f}{unit} (Threshold: {event['threshold']:.1f}{unit})"
+    return f"✅ {label} back to {event['value']:.1f}{unit}"
+
+
+def format_digest(events, host=None, limit=TELEGRAM_MAX_MESSAGE):
+    """Messages (each within `limit` characters) covering every event in order."""
+    firing = sum(event['state'] == 'firing' for event in events)
+    header = f"🖥️ {host or socket.gethostname()}: {firing} alert{'s' if firing != 1 else ''}"
+    if firing < len(events):
+        header += f", {len(events) - firing} resolved"
+    messages, lines, size = [], [header], len(header)
+    for event in events:
+        line = format_event(event)[:limit - 1]
+        if size + 1 + len(line) > limit:
+            messages.append("\n".join(lines))
+            lines, size = [], -1
+        lines.append(line)
+        size += 1 + len(line)
+    messages.append("\n".join(lines))
+    return messages
+
+
+class TelegramNotifier:
+    """Sends alert digests to one Telegram chat from a background thread."""
+
+    def __init__(self, token, chat_id, base_url=TELEGRAM_API_URL, window=NOTIFY_WINDOW,
+                 queue_size=NOTIFY_QUEUE_SIZE, bucket=None):
+        self.token = token
+        self.chat_id = chat_id
+        self.url = f"{base_url.rstrip('/')}/bot{token}/sendMessage"
+        self.window = window
+        self.queue = Queue(maxsize=queue_size)
+        self.bucket = bucket or TokenBucket()
+        self.session = None
+        self.thread = None
+        self.counters = {'queued': 0, 'dropped': 0, 'digests': 0, 'sent': 0, 'failed': 0, 'throttled': 0}
+
+    def start(self):
+        self.thread = Thread(target=self.run, name="telegram-notifier", daemon=True)
+        self.thread.start()
+        return self
+
+    def submit(self, event):
+        """Queue an alert event without blocking. Returns False if it was dropped."""
+        try:
+            self.queue.put_nowait(event)
+        except Full:
+            self.counters['dropped'] += 1
+            return False
+        self.counters['queued'] += 1
+        return True
+
+    def stop(self, timeout=10.0):
+        """Send what is queued, then end the sender loop (and join it if start() ran it)."""
+        try:
+            self.queue.put(None, timeout=timeout)
+        except Full:
+            log("Telegram queue still full at shutdown; queued alerts are lost", "WARNING")
+            return
+        if self.thread is not None:
+            self.thread.join(timeout)
+            self.thread = None
+
+    def run(self):
+        """Sender loop: collect a window of alerts, send them as a digest, repeat."""
+        stopping = False
+        while not stopping:
+            event = self.queue.get()
+            if event is None:
+                return
+            events = [event]
+            deadline = time.monotonic() + self.window
+            while True:
+                remaining = deadline - time.monotonic()
+                try:
+                    event = self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait()
+                except Empty:
+                    break
+                if event is None:
+                    stopping = True
+                    break
+                events.append(event)
+            self.counters['digests'] += 1
+            for text in format_digest(events):
+                self._send(text)
+
+    def _send(self, text):
+        import requests
+        if self.session is None:
+            self.session = requests.Session()
+        for attempt in range(1, NOTIFY_SEND_ATTEMPTS + 1):
+            delay = self.bucket.reserve()
+            if delay:
+                time.sleep(delay)
+            try:
+                r = self.session.post(self.url, json={'chat_id': self.chat_id, 'text': text},
+                                      timeout=TELEGRAM_TIMEOUT)
+            except requests.exceptions.RequestException as e:
+                # The exception text carries the URL, and with it the bot token
+                log("Telegram send attempt %d failed: %s", "WARNING", attempt, type(e).__name__)
+                continue
+            if r.status_code == 429:
+                self.counters['throttled'] += 1
+                try:
+                    retry_after = float(r.json().get('parameters', {}).get('retry_after', 1))
+                except (ValueError, AttributeError):
+                    retry_after = 1.0
+                log("Telegram rate limit hit, pausing %.0fs", "WARNING", retry_after)
+                self.bucket.pause(retry_after)
+                continue
+            if r.ok:
+                self.counters['sent'] += 1
+                return True
+            log("Telegram rejected the message: HTTP %d", "WARNING", r.status_code)
+            if r.status_code < 500:
+                break  # a bad token or chat id will not fix itself
+        self.counters['failed'] += 1
+        log("Telegram notification not delivered", "ERROR", key="telegram_failed")
+        return False
+
+    def format_prometheus(self):
+        lines = ["# TYPE ssm3_telegram_total counter"]
+        for name, count in self.counters.items():
+            lines.append(f'ssm3_telegram_total{{event="{name}"}} {count}')
+        lines.append("# TYPE ssm3_telegram_queue_depth gauge")
+        lines.append(f"ssm3_telegram_queue_depth {self.queue.qsize()}")
+        return "\n".join(lines) + "\n"
+
+
+# The collector's notifier when Telegram is configured, set up by the CLI
+notifier = None
@@ -0,0 +1,356 @@
+"""OpenHardwareMonitor: launching it, fetching data.json and reading sensors from it."""
+import json
+import os
+import time
+
+from ssm import options, topology
+from ssm.logs import log, log_once
+from ssm.options import OHM_DATA_URL, OHM_READY_TIMEOUT
+from ssm.stats import timed, timed_stage
+
+# Called with (timestamp, sensor index) each cycle; see build_sensor_index
+sensor_listeners = []
+# Called each cycle for more {path: (value, unit)} sensors to merge into the index (ssm.fleet)
+sensor_sources = []
+
+# Sensor names preferred when picking the display metrics, best first (see topology.ranked)
+CPU_TEMPERATURE_NAMES = ('Package', 'Tctl', 'Tdie', 'Total', 'CPU')
+GPU_TEMPERATURE_NAMES = ('GPU Core', 'Core', 'Die', 'GPU', 'Hot Spot', 'Junction')
+CPU_LOAD_NAMES = ('CPU Total', 'Total')
+GPU_LOAD_NAMES = ('GPU Core', 'Core', 'GPU')
+RAM_LOAD_NAMES = ('Memory',)
+
+# Readiness probe: first retry after OHM_PROBE_MIN_DELAY, doubling up to OHM_PROBE_MAX_DELAY
+OHM_PROBE_MIN_DELAY = 0.05
+OHM_PROBE_MAX_DELAY = 0.5
+
+class OhmProcess:
+    """Tracks the OpenHardwareMonitor process so liveness checks are O(1).
+    
+    Once OHM has been found (or launched by us) only that process is checked.
+    psutil.Process compares the creation time too, so a recycled PID is not
+    mistaken for OHM. The full process scan runs only when no process is
+    tracked, e.g. after OHM has exited.
+    """
+    
+    def __init__(self):
+        self.process = None  # psutil.Process of the OHM we know about
+        self.child = None  # Popen handle when we launched OHM ourselves
+        self.scans = 0
+    
+    @property
+    def pid(self):
+        return self.process.pid if self.process is not None else None
+    
+    def _scan(self):
+        """Walk every process looking for OHM; the slow path."""
+        import psutil
+        self.scans += 1
+        for proc in psutil.process_iter(['pid', 'name']):
+            try:
+                process_name = proc.info['name'].lower()
+                if 'openhardwaremonitor' in process_name:
+                    return proc
+            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess, AttributeError):
+                pass
+        return None
+    
+    def is_running(self):
+        """Check the tracked OHM process, rescanning only if it has gone away."""
+        import psutil
+        if self.child is not None and self.child.poll() is not None:
+            log(f"OpenHardwareMonitor exited with code {self.child.returncode}", "WARNING")
+            self.child = None
+            self.process = None
+        if self.process is not None:
+            try:
+                if self.process.is_running() and self.process.status() != psutil.STATUS_ZOMBIE:
+                    return True
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                pass
+            log("Tracked OpenHardwareMonitor process %d is gone", "DEBUG", self.process.pid)
+            self.process = None
+        
+        self.process = self._scan()
+        if self.process is not None:
+            log("Tracking OpenHardwareMonitor process %d", "DEBUG", self.process.pid)
+        return self.process is not None
+    
+    def launch(self, exe_path):
+        """Start OHM as a child process and track it. Returns True if it started."""
+        import psutil
+        import subprocess
+        try:
+            self.child = subprocess.Popen([exe_path], cwd=os.path.dirname(exe_path))
+        except OSError as e:
+            if getattr(e, 'winerror', None) != 740:
+                raise
+            # ERROR_ELEVATION_REQUIRED: only the shell can show the UAC prompt,
+            # so launch through it and pick the process up by scanning
+            log("OpenHardwareMonitor needs elevation, launching through the shell", "DEBUG")
+            os.startfile(exe_path)
+            return True
+        try:
+            self.process = psutil.Process(self.child.pid)
+        except psutil.NoSuchProcess:
+            self.process = None
+        return True
+
+ohm_process = OhmProcess()
+
+def is_ohm_running():
+    """Check if OpenHardwareMonitor is already running."""
+    return ohm_process.is_running()
+
+@timed("wait_for_ohm")
+def wait_for_ohm(timeout=OHM_READY_TIMEOUT):
+    """Poll OHM's data.json with exponential backoff until it answers or `timeout` seconds pass."""
+    import requests
+    deadline = time.monotonic() + timeout
+    delay = OHM_PROBE_MIN_DELAY
+    attempts = 0
+    while True:
+        attempts += 1
+        remaining = deadline - time.monotonic()
+        try:
+            r = requests.get(OHM_DATA_URL, timeout=max(0.1, min(remaining, 5)))
+            if r.status_code == 200:
+                log("OHM answered after %d probe(s)", "DEBUG", attempts)
+                return True
+            log("OHM probe %d: HTTP %d", "DEBUG", attempts, r.status_code)
+        except requests.exceptions.RequestException as e:
+            log("OHM probe %d failed: %s", "DEBUG", attempts, e)
+        
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        time.sleep(min(delay, remaining))
+        delay = min(delay * 2, OHM_PROBE_MAX_DELAY)
+
+
+def check_ohm_remote_server(timeout=OHM_READY_TIMEOUT):
+    """Check if OHM Remote Server is enabled, waiting up to `timeout` seconds for it to start."""
+    if wait_for_ohm(timeout):
+        log("OHM remote server is running!", "SUCCESS")
+        return True
+    
+    log(f"OHM remote server did not respond within {timeout:g}s. Please follow these steps:", "ERROR")
+    log("1. Open OpenHardwareMonitor")
+    log("2. Go to Options > Remote Web Server")
+    log("3. Check 'Run web server'")
+    log("4. Make sure port is set to 8085")
+    return False
+
+
+def run_ohm(ohm_exe):
+    """Runs OpenHardwareMonitor.exe (see ssm.bootstrap.ensure_ohm) if not already running."""
+    # First, check if OHM is already running
+    if is_ohm_running():
+        log("OpenHardwareMonitor is already running!", "SUCCESS")
+        return True
+        
+    # If not running, launch it
+    if os.path.exists(ohm_exe):
+        log("Launching OpenHardwareMonitor...", "SUCCESS")
+        try:
+            return ohm_process.launch(ohm_exe)
+        except Exception as e:
+            log(f"Failed to launch OHM: {e}", "ERROR")
+            return False
+    else:
+        log("OpenHardwareMonitor.exe not found!", "ERROR")
+        return False
+
+
+def fetch_ohm_data():
+    """Fetch and decode OHM's data.json, timing the request and the decode separately."""
+    import requests
+    with timed_stage("ohm_fetch"):
+        r = requests.get(OHM_DATA_URL, timeout=options.args.ohm_fetch_timeout)
+    with timed_stage("json_decode"):
+        return r.json()
+
+
+def build_sensor_index(data):
+    """Flatten the OHM tree into {path: (value, unit)} for every numeric leaf sensor.
+    
+    Paths start below the root "Sensor" node, e.g.
+    "DESKTOP/AMD Ryzen 9 5900X/Temperatures/CPU Package".
+    """
+    index = {}
+    stack = [(child, "") for child in reversed(data.get('Children', []))]
+    while stack:
+        node, parent_path = stack.pop()
+        text = node.get('Text', '')
+        path = f"{parent_path}/{text}" if parent_path else text
+        children = node.get('Children')
+        if children:
+            stack.extend((child, path) for child in reversed(children))
+            continue
+        value = node.get('Value', '')
+        number, _, unit = value.partition(' ')
+        try:
+            index[path] = (float(number), unit)
+        except ValueError:
+            continue
+    return index
+
+
+def _resolve(data, query):
+    """(sensor, value) of the first sensor from `query(topology)` that reads a number.
+
+    If a sensor turns out to have moved, the topology is rebuilt and the query run once more.
+    """
+    for rebuild in (False, True):
+        topo = topology.current(data, rebuild=rebuild)
+        for sensor in query(topo):
+            value = sensor.read(data)
+            if value is not None:
+                return sensor, value
+        if not topo.stale:
+            break
+    return None, None
+
+
+def resolve_temperatures(data):
+    """Resolve CPU and GPU temperatures from a decoded OHM tree (None when not found)."""
+    log("Parsing hardware sensor data...", "DEBUG")
+    
+    # The CPU's own package sensor first; a Super I/O "CPU" reading if the CPU reports none
+    sensor, cpu_temp = _resolve(data, lambda topo: topology.ranked(topo.sensors('cpu', 'Temperatures'),
+                                                                    CPU_TEMPERATURE_NAMES)
+                                + [s for s in topo.sensors('superio', 'Temperatures') if 'CPU' in s.name])
+    if sensor is not None:
+        log_once("CPU", sensor.path, "Found CPU temperature: %s°C from %s", "SUCCESS", cpu_temp, sensor.path)
+    
+    sensor, gpu_temp = _resolve(data, lambda topo: topology.ranked(topo.sensors('gpu', 'Temperatures'),
+                                                                    GPU_TEMPERATURE_NAMES))
+    if sensor is not None:
+        log_once("GPU", sensor.path, "Found GPU temperature: %s°C from %s", "SUCCESS", gpu_temp, sensor.path)
+    
+    return cpu_temp, gpu_temp
+
+
+def resolve_gpu_load(data):
+    """Resolve the GPU load percentage from a decoded OHM tree (None when not found)."""
+    sensor, gpu_load = _resolve(data, lambda topo: topology.ranked(
+        [s for s in topo.sensors('gpu', 'Load') if s.unit == '%'], GPU_LOAD_NAMES))
+    if sensor is not None:
+        log_once("gpu_load", sensor.path, "Found GPU Load node: %s = %s%%", "DEBUG", sensor.path, gpu_load)
+    return gpu_load
+
+
+def resolve_cpu_load(data):
+    """Resolve the CPU Total load percentage from a decoded OHM tree (None when not found)."""
+    sensor, cpu_load = _resolve(data, lambda topo: topology.ranked(topo.sensors('cpu', 'Load'), CPU_LOAD_NAMES))
+    if sensor is not None:
+        log_once("cpu_total_load", sensor.path, "Found CPU Load node: %s = %s%%", "DEBUG", sensor.path, cpu_load)
+    return cpu_load
+
+
+def resolve_ram_usage(data):
+    """Resolve the memory load percentage from a decoded OHM tree (None when not found)."""
+    sensor, ram_usage = _resolve(data, lambda topo: topology.ranked(
+        [s for s in topo.sensors('memory', 'Load') if s.unit == '%'], RAM_LOAD_NAMES))
+    if sensor is not None:
+        log_once("memory_load", sensor.path, "Found Memory Load node: %s = %s%%", "DEBUG", sensor.path, ram_usage)
+    return ram_usage
+
+
+@timed("get_temperatures_from_json")
+def get_temperatures_from_json():
+    """Fetch CPU and GPU temperatures from OHM's JSON."""
+    try:
+        data = fetch_ohm_data()
+
+        # Dump raw JSON for debugging
+        with open("ohm_data.json", "w") as f:
+            json.dump(data, f, indent=2)
+        
+        cpu_temp, gpu_temp = resolve_temperatures(data)
+    except Exception as e:
+        log(f"Failed to parse OHM JSON: {e}", "ERROR")
+        publish_sensors(None)  # other sources still report without the local tree
+        return "N/A", "N/A"  # Return N/A instead of default values
+    
+    # Once per cycle, outside the parse: a failing listener is not a parse failure
+    publish_sensors(data)
+    
+    # Report results
+    if cpu_temp is not None:
+        log("Final CPU Temperature: %s°C", "SUCCESS", cpu_temp)
+    else:
+        log("CPU temperature could not be determined, reporting as N/A", "WARNING")
+        cpu_temp = "N/A"  # Use N/A instead of default value
+    
+    if gpu_temp is not None:
+        log("Final GPU Temperature: %s°C", "SUCCESS", gpu_temp)
+    else:
+        log("GPU temperature could not be determined, reporting as N/A", "WARNING")
+        gpu_temp = "N/A"  # Use N/A instead of default value
+    
+    return cpu_temp, gpu_temp
+
+
+def _hook_name(hook):
+    return getattr(hook, '__qualname__', None) or repr(hook)
+
+
+def publish_sensors(data):
+    """Hand this cycle's sensor index (the local tree plus every sensor source) to the listeners.
+    
+    Each source and listener runs on its own: one that raises is logged and
+    skipped, and the others still see the cycle.
+    """
+    if not sensor_listeners:
+        return
+    sensors = {}
+    if data is not None:
+        try:
+            sensors = build_sensor_index(data)
+        except Exception as e:
+            log(f"Could not index OHM sensors: {e}", "ERROR", key="sensor_index_error")
+    for source in sensor_sources:
+        try:
+            sensors.update(source())
+        except Exception as e:
+            name = _hook_name(source)
+            log(f"Sensor source {name} failed: {e}", "ERROR", key=f"sensor_source_error {name}")
+    now = time.time()
+    for listener in sensor_listeners:
+        try:
+            listener(now, sensors)
+        except Exception as e:
+            name = _hook_name(listener)
+            log(f"Sensor listener {name} failed: {e}", "ERROR", key=f"sensor_listener_error {name}")
+
+@timed("get_cpu_usage_from_ohm")
+def get_cpu_usage_from_ohm():
+    """Get CPU usage from OpenHardwareMonitor, specifically targeting CPU Total load."""
+    try:
+        data = fetch_ohm_data()
+        cpu_load = resolve_cpu_load(data)
+        
+        if cpu_load is not None:
+            log("Using CPU usage from OHM: %s%%", "SUCCESS", cpu_load)
+            return cpu_load
+    except Exception as e:
+        log(f"Could not get CPU usage from OHM: {e}", "DEBUG")
+    
+    return None
+
+
+@timed("get_ram_usage_from_ohm")
+def get_ram_usage_from_ohm():
+    """Get RAM usage from OpenHardwareMonitor, specifically targeting Generic Memory - Load - Memory."""
+    try:
+        data = fetch_ohm_data()
+        ram_usage = resolve_ram_usage(data)
+        
+        if ram_usage is not None:
+            log("Using RAM usage from OHM: %s%%", "SUCCESS", ram_usage)
+            return ram_usage
+    except Exception as e:
+        log(f"Could not get RAM usage from OHM: {e}", "DEBUG")
+    
+    return None
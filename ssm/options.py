@@ -0,0 +1,160 @@
+"""Paths, defaults and command line options shared by the collector modules.
+
+Every option can also be set in a config file (--config) or the environment
+(SSM_<OPTION>); see ssm.config for how the layers combine and reload.
+"""
+import argparse
+import os
+
+from ssm.derived import DERIVED_TAU, DERIVED_WINDOW
+from ssm.notify import NOTIFY_WINDOW, TELEGRAM_API_URL
+
+# Define paths - Use AppData on Windows, or ~/.local on Linux/Mac
+if os.name == 'nt':  # Windows
+    LIBRARY_PATH = os.path.join(os.environ.get('LOCALAPPDATA', os.path.expanduser('~')), 'ITInfrastructureMonitor')
+else:  # Linux/Mac
+    LIBRARY_PATH = os.path.join(os.path.expanduser('~'), '.local', 'share', 'ITInfrastructureMonitor')
+
+OHM_ZIP_URL = "https://openhardwaremonitor.org/files/openhardwaremonitor-v0.9.6.zip"
+OHM_DATA_URL = "http://localhost:8085/data.json"
+OHM_READY_TIMEOUT = 60  # seconds to wait for OHM's web server at startup
+
+# UDP push mode: frames are fire-and-forget, with a periodic HTTP push to reconcile
+UDP_PORT = 4210
+HTTP_RECONCILE_INTERVAL = 30  # seconds between HTTP pushes while in UDP mode
+
+STATS_BIND = "127.0.0.1"  # address the --stats-port server listens on
+
+DRAIN_TIMEOUT = 10.0  # seconds the service spends finishing queued work at shutdown
+TUI_FPS = 4.0  # --tui frames per second
+RECORD_DAYS = 30  # days of sample history kept with --record
+ANOMALY_THRESHOLD = 3.5  # |modified z-score| that counts as an outlier (Iglewicz & Hoaglin)
+
+# NodeMCU discovery and push tuning
+DISCOVERY_TIMEOUT = 300  # 5 minutes between full network scans
+PRIORITY_SUBNETS = ['192.168.137', '192.168.0', '192.168.1', '172.20.10', '10.0.0', '10.0.1']
+SCAN_WORKERS = 50  # concurrent probe threads during a subnet scan
+SCAN_CONNECT_TIMEOUT = 0.1  # seconds to wait for port 80 on each scanned address
+SCAN_PROBE_TIMEOUT = 0.5  # seconds to wait for the root page of an open port
+PUSH_TIMEOUT = 5.0  # seconds per HTTP push to the NodeMCU
+OHM_FETCH_TIMEOUT = 5.0  # seconds per data.json request once OHM is up
+
+
+def comma_list(value):
+    """argparse type for comma separated lists (empty entries are dropped)."""
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='IT Infrastructure Monitoring System',
+                                     epilog='Run "%(prog)s export --help" to export samples recorded with --record.')
+    parser.add_argument('--config',
+                        help='TOML or JSON file of option defaults, reloaded when it changes (default: $SSM_CONFIG)')
+    parser.add_argument('--library-path', default=LIBRARY_PATH,
+                        help=f'Directory for OHM, the outbox and discovery state (default: {LIBRARY_PATH})')
+    parser.add_argument('--ip', help='Manually specify the NodeMCU IP address')
+    parser.add_argument('--subnet', help='Manually specify subnet to scan (e.g., 192.168.1)')
+    parser.add_argument('--priority-subnets', type=comma_list, default=PRIORITY_SUBNETS,
+                        help='Comma separated /24 prefixes scanned before the local interfaces '
+                             '(default: common hotspot and home subnets)')
+    parser.add_argument('--discovery-timeout', type=float, default=DISCOVERY_TIMEOUT,
+                        help=f'Seconds a discovered address is trusted before rescanning (default: {DISCOVERY_TIMEOUT})')
+    parser.add_argument('--scan-workers', type=int, default=SCAN_WORKERS,
+                        help=f'Concurrent probes while scanning a subnet (default: {SCAN_WORKERS})')
+    parser.add_argument('--scan-connect-timeout', type=float, default=SCAN_CONNECT_TIMEOUT,
+                        help=f'Seconds to wait for port 80 on each scanned address (default: {SCAN_CONNECT_TIMEOUT:g})')
+    parser.add_argument('--scan-probe-timeout', type=float, default=SCAN_PROBE_TIMEOUT,
+                        help=f'Seconds to wait for the page of an open port (default: {SCAN_PROBE_TIMEOUT:g})')
+    parser.add_argument('--push-timeout', type=float, default=PUSH_TIMEOUT,
+                        help=f'Seconds per HTTP push to the NodeMCU (default: {PUSH_TIMEOUT:g})')
+    parser.add_argument('--verbosity', type=int, choices=[0, 1, 2], default=1,
+                        help='0 = warnings and errors, 1 = normal, 2 = verbose debug output (default: 1)')
+    parser.add_argument('--log-format', choices=['text', 'json'], default='text',
+                        help='Console text with emoji, or JSON lines (default: text)')
+    parser.add_argument('--log-file', help='Write logs to this file instead of the console')
+    parser.add_argument('--log-once-ttl', type=float,
+                        help='Repeat one-time discovery messages after this many seconds (default: never)')
+    parser.add_argument('--stats-port', type=int,
+                        help='Serve stage timing metrics on this port (/metrics and /stats)')
+    parser.add_argument('--stats-bind', default=STATS_BIND,
+                        help=f'Address for the --stats-port server; 0.0.0.0 allows remote scrapes '
+                             f'(default: {STATS_BIND})')
+    parser.add_argument('--stats-interval', type=float,
+                        help='Log the stage timing table every this many seconds')
+    parser.add_argument('--ohm-url',
+                        help=f'OHM data.json URL; skips the local OHM setup (default: {OHM_DATA_URL})')
+    parser.add_argument('--ohm-sha256',
+                        help='Expected SHA-256 of the OHM zip; downloads that do not match are rejected')
+    parser.add_argument('--ohm-timeout', type=float, default=OHM_READY_TIMEOUT,
+                        help=f'Seconds to wait for the OHM web server at startup (default: {OHM_READY_TIMEOUT})')
+    parser.add_argument('--ohm-fetch-timeout', type=float, default=OHM_FETCH_TIMEOUT,
+                        help=f'Seconds per OHM data.json request (default: {OHM_FETCH_TIMEOUT:g})')
+    parser.add_argument('--fleet', type=comma_list, default=[],
+                        help='Comma separated data.json URLs of other machines to poll from worker processes')
+    parser.add_argument('--fleet-workers', type=int,
+                        help='Worker processes polling the --fleet hosts (default: one per CPU, at most one per host)')
+    parser.add_argument('--shm', metavar='NAME',
+                        help='Publish the latest sensor values to the shared memory segment NAME for local readers')
+    parser.add_argument('--record', action='store_true',
+                        help='Keep every sensor sample in the library path for `ssm3.py export`')
+    parser.add_argument('--record-days', type=int, default=RECORD_DAYS,
+                        help=f'Days of recorded samples to keep (default: {RECORD_DAYS})')
+    parser.add_argument('--tui', action='store_true',
+                        help='Show a live table of every sensor, its trend and alert state instead of log lines')
+    parser.add_argument('--tui-fps', type=float, default=TUI_FPS,
+                        help=f'Dashboard frames per second, independent of --interval (default: {TUI_FPS:g})')
+    parser.add_argument('--service', action='store_true',
+                        help='Run as a service: supervised workers, SIGTERM drains and exits, SIGHUP reloads')
+    parser.add_argument('--drain-timeout', type=float, default=DRAIN_TIMEOUT,
+                        help=f'Seconds to finish queued pushes and alerts at shutdown (default: {DRAIN_TIMEOUT:g})')
+    parser.add_argument('--interval', type=float, default=3.0,
+                        help='Seconds between updates (default: 3, sub-second values work best with --udp)')
+    parser.add_argument('--smooth', action='store_true',
+                        help='Send EWMA-smoothed values and temperature trends (°C/min) to the NodeMCU')
+    parser.add_argument('--smooth-tau', type=float, default=DERIVED_TAU,
+                        help=f'EWMA time constant in seconds (default: {DERIVED_TAU:g})')
+    parser.add_argument('--window', type=float, default=DERIVED_WINDOW,
+                        help=f'Rolling window in seconds for min/max/p95 and rates (default: {DERIVED_WINDOW:g})')
+    parser.add_argument('--anomaly', action='store_true',
+                        help='Learn per-sensor baselines by CPU load and log sensors that leave them')
+    parser.add_argument('--anomaly-threshold', type=float, default=ANOMALY_THRESHOLD,
+                        help=f'Robust z-score that counts as an outlier (default: {ANOMALY_THRESHOLD:g})')
+    parser.add_argument('--alert-rules',
+                        help='JSON file of alert rules checked on this machine (default: the firmware thresholds)')
+    parser.add_argument('--telegram-token',
+                        help='Telegram bot token for alert notifications (default: $SSM_TELEGRAM_TOKEN)')
+    parser.add_argument('--telegram-chat-id',
+                        help='Telegram chat to notify (default: $SSM_TELEGRAM_CHAT_ID)')
+    parser.add_argument('--telegram-url', default=TELEGRAM_API_URL,
+                        help=f'Telegram Bot API base URL (default: {TELEGRAM_API_URL})')
+    parser.add_argument('--notify-window', type=float, default=NOTIFY_WINDOW,
+                        help=f'Seconds to collect alerts into one notification (default: {NOTIFY_WINDOW:g})')
+    parser.add_argument('--udp', action='store_true',
+                        help='Push metrics over UDP and only reconcile over HTTP periodically')
+    parser.add_argument('--udp-port', type=int, default=UDP_PORT,
+                        help=f'UDP port the NodeMCU listens on (default: {UDP_PORT})')
+    parser.add_argument('--outbox', action='store_true',
+                        help='Keep samples on disk while the NodeMCU is unreachable and replay them later')
+    parser.add_argument('--replay-url',
+                        help='History sink to replay buffered samples to; the display keeps no history, '
+                             'so without one they stay in the outbox')
+    parser.add_argument('--batch-size', type=int, default=0,
+                        help='Send samples in batches of this many (default: 0, no batching); batches for the '
+                             'display are split to fit its firmware limits')
+    parser.add_argument('--batch-interval', type=float, default=30.0,
+                        help='Flush a partial batch after this many seconds (default: 30)')
+    parser.add_argument('--batch-format', choices=['json', 'binary'], default='json',
+                        help='Encoding for batched updates (default: json)')
+    parser.add_argument('--batch-url',
+                        help='Where to send batches (default: http://<nodemcu>/update/batch)')
+    parser.add_argument('--reconcile-interval', type=float, default=HTTP_RECONCILE_INTERVAL,
+                        help=f'Seconds between HTTP reconciliation pushes in UDP mode (default: {HTTP_RECONCILE_INTERVAL})')
+    return parser
+
+
+# Parse command line arguments (without the config file and environment layers)
+def parse_args(argv=None):
+    return build_parser().parse_args(argv)
+
+# Defaults until the CLI parses the real command line, so the modules work when imported
+args = parse_args([])
@@ -0,0 +1,152 @@
+"""Offline outbox: bounded, disk-backed store of samples the NodeMCU never received."""
+import gzip
+import json
+import os
+import time
+
+from ssm.logs import log
+
+OUTBOX_MAX_RECORDS = 2000  # records kept in memory and on disk
+OUTBOX_MAX_BYTES = 512 * 1024  # size cap for the outbox file
+OUTBOX_WINDOW = 60  # seconds per aggregate once raw samples no longer fit
+OUTBOX_REPLAY_BATCH = 100  # records per replay request
+OUTBOX_REPLAY_INTERVAL = 2  # minimum seconds between replay requests
+OUTBOX_NO_SINK_DELAY = 60  # seconds before asking again after the sink answered 404
+
+class MetricsOutbox:
+    """Bounded, disk-backed queue of samples waiting to be delivered.
+    
+    Raw samples are kept while they fit. Once the record cap is reached the
+    oldest raw samples are folded into per-window aggregates (count, avg, min,
+    max per metric), and if that is still not enough the oldest records are
+    dropped, so memory and disk use stay capped during long outages.
+    """
+    
+    def __init__(self, path, max_records=OUTBOX_MAX_RECORDS, max_bytes=OUTBOX_MAX_BYTES,
+                 window=OUTBOX_WINDOW):
+        self.path = path
+        self.max_records = max_records
+        self.max_bytes = max_bytes
+        self.window = window
+        self.records = []
+        self.size = 0
+        self.next_replay_time = 0
+        self._load()
+    
+    def __len__(self):
+        return len(self.records)
+    
+    def _load(self):
+        """Load records left over from a previous run, skipping torn lines."""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r") as f:
+                for line in f:
+                    try:
+                        self.records.append(json.loads(line))
+                    except ValueError:
+                        continue
+        except OSError as e:
+            log(f"Could not read outbox {self.path}: {e}", "WARNING")
+        if self.records:
+            self._enforce_limits(force_rewrite=True)
+            log(f"Loaded {len(self.records)} buffered samples from outbox", "INFO")
+    
+    def _rewrite(self):
+        """Atomically replace the outbox file with the in-memory records."""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            for record in self.records:
+                f.write(json.dumps(record, separators=(',', ':')) + "\n")
+        os.replace(tmp_path, self.path)
+        self.size = os.path.getsize(self.path)
+    
+    def _aggregate(self, records):
+        """Fold raw samples into one aggregate per window; aggregates pass through."""
+        folded = []
+        current = None
+        for record in records:
+            if 'count' in record:
+                folded.append(record)
+                current = None
+                continue
+            start = record['ts'] - record['ts'] % self.window
+            if current is None or current['ts'] != start:
+                current = {'ts': start, 'window': self.window, 'count': 0,
+                           'avg': {}, 'min': {}, 'max': {}}
+                sums = {}
+                counts = {}
+                folded.append(current)
+            current['count'] += 1
+            for key, value in record.items():
+                if key == 'ts' or not isinstance(value, (int, float)):
+                    continue
+                sums[key] = sums.get(key, 0) + value
+                counts[key] = counts.get(key, 0) + 1
+                current['avg'][key] = round(sums[key] / counts[key], 1)
+                current['min'][key] = min(value, current['min'].get(key, value))
+                current['max'][key] = max(value, current['max'].get(key, value))
+        return folded
+    
+    def _enforce_limits(self, force_rewrite=False):
+        rewrite = force_rewrite
+        if len(self.records) > self.max_records or self.size > self.max_bytes:
+            # Keep the newest half raw and aggregate everything older
+            keep = self.max_records // 2
+            self.records = self._aggregate(self.records[:-keep]) + self.records[-keep:]
+            rewrite = True
+        if len(self.records) > self.max_records:
+            self.records = self.records[-self.max_records:]
+            rewrite = True
+        if rewrite:
+            self._rewrite()
+            while self.size > self.max_bytes and self.records:
+                del self.records[:max(1, len(self.records) // 10)]
+                self._rewrite()
+    
+    def add(self, sample):
+        """Buffer one sample (a dict of metric values) stamped with the current time."""
+        # UDP sequencing fields only matter for live frames
+        record = {k: v for k, v in sample.items() if k not in ('sid', 'seq')}
+        record.setdefault('ts', round(time.time(), 3))
+        self.records.append(record)
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            line = json.dumps(record, separators=(',', ':')) + "\n"
+            with open(self.path, "a") as f:
+                f.write(line)
+            self.size += len(line)
+            self._enforce_limits()
+        except OSError as e:
+            log(f"Could not write to outbox: {e}", "WARNING")
+    
+    def replay(self, url):
+        """Send the oldest batch to a history sink, at most once per replay interval."""
+        if not self.records or time.time() < self.next_replay_time:
+            return
+        self.next_replay_time = time.time() + OUTBOX_REPLAY_INTERVAL
+        
+        import requests
+        batch = self.records[:OUTBOX_REPLAY_BATCH]
+        body = gzip.compress(json.dumps(batch, separators=(',', ':')).encode())
+        headers = {'Content-Type': 'application/json', 'Content-Encoding': 'gzip'}
+        try:
+            r = requests.post(url, data=body, headers=headers, timeout=2)
+        except requests.exceptions.RequestException as e:
+            log(f"Outbox replay failed, will retry: {e}", "DEBUG")
+            return
+        
+        if r.status_code == 404:
+            # No history sink there (yet): keep every sample and ask again later
+            log(f"No history sink at {url}, keeping {len(self.records)} buffered samples", "WARNING",
+                key="outbox_no_sink")
+            self.next_replay_time = time.time() + OUTBOX_NO_SINK_DELAY
+            return
+        if not 200 <= r.status_code < 300:
+            log(f"Outbox replay rejected: HTTP {r.status_code}", "WARNING")
+            return
+        del self.records[:len(batch)]
+        log(f"Replayed {len(batch)} buffered samples ({len(self.records)} left)", "SUCCESS")
+        self._rewrite()
@@ -0,0 +1,199 @@
+"""Registry of known NodeMCU displays: where they are, how they answer and how healthy they look.
+
+Replaces the single address in nodemcu_ip.txt. Each display is keyed by its
+address and keeps its MAC and hostname (from discovery), when it was first
+and last seen, push counts, round-trip time statistics and a health score:
+
+    health = success * min(1, REGISTRY_RTT_TARGET / rtt)
+
+where `success` is an EWMA of push outcomes and `rtt` an EWMA of push round
+trips. Liveness comes from the pushes themselves: every POST records its
+outcome and round trip, so a display that took a push within
+--discovery-timeout seconds counts as up without any extra probe.
+
+The registry is saved to devices.json in the library path when a display is
+found, at most every REGISTRY_SAVE_INTERVAL seconds while pushing and at exit.
+"""
+import json
+import os
+import threading
+import time
+
+from ssm.logs import log
+
+REGISTRY_FILE = "devices.json"
+REGISTRY_MAX_DEVICES = 32  # least recently seen displays are forgotten beyond this
+REGISTRY_SAVE_INTERVAL = 60.0  # seconds between saves caused by pushes
+REGISTRY_ALPHA = 0.1  # EWMA weight of each push outcome and round trip
+REGISTRY_RTT_TARGET = 0.25  # seconds; slower average round trips lower the health proportionally
+REGISTRY_MAX_FAILURES = 3  # failed pushes in a row before a display no longer counts as up
+
+DEVICE_FIELDS = ('address', 'mac', 'hostname', 'first_seen', 'last_seen', 'last_failure', 'pushes',
+                 'failures', 'consecutive_failures', 'success', 'rtt', 'rtt_min', 'rtt_max')
+
+
+class Device:
+    """What is known about one display."""
+
+    def __init__(self, address, first_seen=None):
+        self.address = address
+        self.mac = None
+        self.hostname = None
+        self.first_seen = time.time() if first_seen is None else first_seen
+        self.last_seen = 0.0  # last successful probe or push
+        self.last_failure = 0.0
+        self.pushes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.success = 1.0  # EWMA of push outcomes, 1 = every push got through
+        self.rtt = None  # EWMA of push round trips in seconds
+        self.rtt_min = None
+        self.rtt_max = None
+
+    @classmethod
+    def from_dict(cls, spec):
+        device = cls(spec['address'])
+        for field in DEVICE_FIELDS:
+            if field in spec:
+                setattr(device, field, spec[field])
+        return device
+
+    def to_dict(self):
+        result = {field: getattr(self, field) for field in DEVICE_FIELDS}
+        result['health'] = self.health
+        return result
+
+    @property
+    def health(self):
+        """0 (unreachable) to 1 (every push through, round trips within target)."""
+        speed = 1.0 if not self.rtt else min(1.0, REGISTRY_RTT_TARGET / self.rtt)
+        return round(self.success * speed, 3)
+
+
+class DeviceRegistry:
+    """Known displays, persisted as JSON and updated from discovery and every push."""
+
+    def __init__(self, path, legacy_ip_file=None):
+        self.path = path
+        self.devices = {}  # address -> Device
+        self.lock = threading.Lock()
+        self.dirty = False
+        self.last_save = time.time()
+        self._load(legacy_ip_file)
+
+    def __len__(self):
+        return len(self.devices)
+
+    def _load(self, legacy_ip_file):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                specs = json.load(f)
+            for spec in specs:
+                device = Device.from_dict(spec)
+                self.devices[device.address] = device
+            return
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, TypeError, KeyError) as e:
+            log(f"Ignoring unreadable device registry {self.path}: {e}", "WARNING")
+            return
+        # First run with a registry: carry over the address older versions saved
+        try:
+            with open(legacy_ip_file, "r") as f:
+                address = f.read().strip()
+            if address:
+                self.devices[address] = Device(address, first_seen=os.path.getmtime(legacy_ip_file))
+        except (OSError, TypeError):
+            pass
+
+    def save(self):
+        """Write the registry if anything changed since the last save."""
+        with self.lock:
+            if not self.dirty:
+                return
+            specs = [device.to_dict() for device in self.devices.values()]
+            self.dirty = False
+            self.last_save = time.time()
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(specs, f, indent=1)
+            os.replace(self.path + ".tmp", self.path)
+        except OSError as e:
+            log(f"Could not save device registry: {e}", "WARNING")
+
+    def _device(self, address):
+        device = self.devices.get(address)
+        if device is None:
+            if len(self.devices) >= REGISTRY_MAX_DEVICES:
+                oldest = min(self.devices.values(), key=lambda d: d.last_seen)
+                del self.devices[oldest.address]
+            device = self.devices[address] = Device(address)
+        return device
+
+    def found(self, address, mac=None, hostname=None):
+        """Discovery reached the display at `address`; saved right away."""
+        with self.lock:
+            device = self._device(address)
+            device.last_seen = time.time()
+            device.consecutive_failures = 0
+            device.mac = mac or device.mac
+            device.hostname = hostname or device.hostname
+            self.dirty = True
+        self.save()
+
+    def record_push(self, address, ok, rtt=None):
+        """Fold one push outcome (and its round trip in seconds) into the display's statistics."""
+        now = time.time()
+        with self.lock:
+            device = self._device(address)
+            device.pushes += 1
+            device.success += REGISTRY_ALPHA * ((1.0 if ok else 0.0) - device.success)
+            if ok:
+                device.last_seen = now
+                device.consecutive_failures = 0
+            else:
+                device.failures += 1
+                device.consecutive_failures += 1
+                device.last_failure = now
+            if rtt is not None:
+                device.rtt = rtt if device.rtt is None else device.rtt + REGISTRY_ALPHA * (rtt - device.rtt)
+                device.rtt_min = rtt if device.rtt_min is None else min(device.rtt_min, rtt)
+                device.rtt_max = rtt if device.rtt_max is None else max(device.rtt_max, rtt)
+            self.dirty = True
+            due = now - self.last_save >= REGISTRY_SAVE_INTERVAL
+        if due:
+            self.save()
+
+    def is_live(self, address, max_age):
+        """True if the display got a push or probe through in the last `max_age` seconds."""
+        device = self.devices.get(address)
+        return (device is not None and device.consecutive_failures < REGISTRY_MAX_FAILURES
+                and time.time() - device.last_seen < max_age)
+
+    def ranked(self):
+        """Known addresses, healthiest (then most recently seen) first."""
+        with self.lock:
+            devices = sorted(self.devices.values(), key=lambda d: (d.health, d.last_seen), reverse=True)
+        return [device.address for device in devices]
+
+    def snapshot(self):
+        """Every known display as a dict, for the /devices route."""
+        with self.lock:
+            return [device.to_dict() for device in self.devices.values()]
+
+    def format_prometheus(self, max_age):
+        lines = ["# TYPE ssm3_device_up gauge"]
+        with self.lock:
+            devices = list(self.devices.values())
+        for device in devices:
+            lines.append(f'ssm3_device_up{{address="{device.address}"}} {int(self.is_live(device.address, max_age))}')
+        lines.append("# TYPE ssm3_device_health gauge")
+        lines += [f'ssm3_device_health{{address="{d.address}"}} {d.health}' for d in devices]
+        lines.append("# TYPE ssm3_device_rtt_seconds gauge")
+        lines += [f'ssm3_device_rtt_seconds{{address="{d.address}"}} {d.rtt:.6f}' for d in devices if d.rtt]
+        lines.append("# TYPE ssm3_device_pushes_total counter")
+        lines += [f'ssm3_device_pushes_total{{address="{d.address}"}} {d.pushes}' for d in devices]
+        lines.append("# TYPE ssm3_device_push_failures_total counter")
+        lines += [f'ssm3_device_push_failures_total{{address="{d.address}"}} {d.failures}' for d in devices]
+        return "\n".join(lines) + "\n"
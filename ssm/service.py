@@ -0,0 +1,340 @@
+"""Service mode: supervised worker threads, bounded queues, signals and a draining shutdown.
+
+    collector   samples OHM and the system every --interval, runs the alert
+                engine and hands each display payload to the sink queues
+    discovery   finds the NodeMCU whenever its address is unknown
+    nodemcu     pushes queued payloads (HTTP, UDP or batches, outbox on failure)
+    telegram    the alert notifier's sender loop, when Telegram is configured
+
+Workers only meet through bounded queues that drop their oldest entry when
+full, so the collector never waits on a slow or wedged sink. A worker that
+raises is restarted with exponential backoff; one that stops heartbeating is
+reported. SIGTERM (and Ctrl+C) stops collection, lets the sinks drain for up
+to --drain-timeout seconds, flushes any partial batch (only once the nodemcu
+worker has stopped, as it owns the batcher) and exits. SIGHUP runs
+the registered reload hooks without restarting anything, and the watch hooks
+run on every supervisor tick (the CLI polls the config file there).
+"""
+import signal
+import threading
+import time
+import traceback
+from collections import deque
+
+from ssm import alerts, nodemcu, notify, options
+from ssm.logs import log
+from ssm.stats import dump_requested_stats, dump_stage_stats, register_exporter, timed_stage
+
+SAMPLE_QUEUE_SIZE = 256  # display payloads buffered per sink before the oldest is dropped
+RESTART_MIN_DELAY = 1.0  # seconds before restarting a crashed worker, doubling per crash
+RESTART_MAX_DELAY = 60.0
+RESTART_RESET_AFTER = 60.0  # a worker that ran this long has its backoff reset
+WEDGE_TIMEOUT = 30.0  # seconds without a heartbeat before a worker is reported as stuck
+SUPERVISE_INTERVAL = 0.5
+DISCOVERY_RETRY_MIN = 2.0  # seconds between failed discovery scans, doubling
+DISCOVERY_RETRY_MAX = 60.0
+
+# Called on SIGHUP; the CLI adds whatever can be reloaded in place
+reload_hooks = []
+# Called every SUPERVISE_INTERVAL from the supervisor thread
+watch_hooks = []
+
+
+class DropOldestQueue:
+    """Bounded FIFO whose put never blocks: when full, the oldest item is dropped."""
+
+    def __init__(self, maxsize=SAMPLE_QUEUE_SIZE):
+        self.items = deque(maxlen=maxsize)
+        self.ready = threading.Condition()
+        self.dropped = 0
+
+    def __len__(self):
+        return len(self.items)
+
+    def put(self, item):
+        with self.ready:
+            if len(self.items) == self.items.maxlen:
+                self.dropped += 1
+            self.items.append(item)
+            self.ready.notify()
+
+    def get(self, timeout=None):
+        """Oldest item, or None if nothing arrived within `timeout` seconds."""
+        with self.ready:
+            if not self.items:
+                self.ready.wait(timeout)
+            return self.items.popleft() if self.items else None
+
+
+class Worker:
+    """A named thread running `target(worker)`, restarted by the supervisor if it dies.
+
+    Targets loop until `worker.stopping` is set, calling `worker.beat()` as
+    they make progress and `worker.wait(seconds)` instead of time.sleep.
+    """
+
+    def __init__(self, name, target, on_stop=None, wedge_timeout=WEDGE_TIMEOUT):
+        self.name = name
+        self.target = target
+        self.on_stop = on_stop  # called after `stopping` is set, to wake a blocked target
+        self.wedge_timeout = wedge_timeout  # None for workers that legitimately idle without beating
+        self.stopping = threading.Event()
+        self.thread = None
+        self.started = 0.0
+        self.last_beat = 0.0
+        self.restarts = 0
+        self.crashed = False
+        self.delay = RESTART_MIN_DELAY
+        self.restart_at = None
+        self.reported_wedged = False
+
+    def start(self):
+        self.started = self.last_beat = time.monotonic()
+        self.crashed = False
+        self.reported_wedged = False
+        self.thread = threading.Thread(target=self._run, name=f"ssm-{self.name}", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        try:
+            self.target(self)
+        except Exception:
+            self.crashed = True
+            log("Worker %s crashed:\n%s", "ERROR", self.name, traceback.format_exc().rstrip(),
+                key=f"worker_crash:{self.name}")
+
+    def beat(self):
+        self.last_beat = time.monotonic()
+
+    def wait(self, seconds):
+        """Sleep up to `seconds`; returns True if the worker is being stopped."""
+        return self.stopping.wait(seconds)
+
+    def is_alive(self):
+        return self.thread is not None and self.thread.is_alive()
+
+
+class Supervisor:
+    """Starts the workers, restarts them when they die and stops them in order."""
+
+    def __init__(self):
+        self.workers = []
+        self.shutdown = threading.Event()
+        self.reload = threading.Event()
+
+    def add(self, name, target, on_stop=None, wedge_timeout=WEDGE_TIMEOUT):
+        worker = Worker(name, target, on_stop, wedge_timeout)
+        self.workers.append(worker)
+        return worker
+
+    def start(self):
+        for worker in self.workers:
+            worker.start()
+        log("Service started with workers: %s", "INFO", ", ".join(w.name for w in self.workers))
+
+    def check(self):
+        """Restart dead workers (with backoff) and report stuck ones."""
+        now = time.monotonic()
+        for worker in self.workers:
+            if worker.stopping.is_set():
+                continue
+            if worker.is_alive():
+                if worker.wedge_timeout is None:
+                    continue
+                if now - worker.last_beat > worker.wedge_timeout and not worker.reported_wedged:
+                    worker.reported_wedged = True
+                    log("Worker %s has made no progress for %.0fs", "WARNING",
+                        worker.name, now - worker.last_beat)
+                elif now - worker.last_beat <= worker.wedge_timeout and worker.reported_wedged:
+                    worker.reported_wedged = False
+                    log("Worker %s is making progress again", "SUCCESS", worker.name)
+                continue
+            if worker.restart_at is None:
+                if now - worker.started >= RESTART_RESET_AFTER:
+                    worker.delay = RESTART_MIN_DELAY
+                reason = "crashed" if worker.crashed else "exited"
+                log("Worker %s %s, restarting in %.1fs", "WARNING", worker.name, reason, worker.delay)
+                worker.restart_at = now + worker.delay
+                worker.delay = min(worker.delay * 2, RESTART_MAX_DELAY)
+            elif now >= worker.restart_at:
+                worker.restart_at = None
+                worker.restarts += 1
+                worker.start()
+
+    def stop(self, names, timeout):
+        """Signal the named workers to stop and wait up to `timeout` seconds for them.
+
+        Returns the names of the workers still running after the wait.
+        """
+        stopping = [w for w in self.workers if w.name in names]
+        for worker in stopping:
+            worker.stopping.set()
+            if worker.on_stop is not None:
+                worker.on_stop()
+        deadline = time.monotonic() + timeout
+        running = set()
+        for worker in stopping:
+            if worker.thread is not None:
+                worker.thread.join(max(0.0, deadline - time.monotonic()))
+                if worker.thread.is_alive():
+                    log("Worker %s did not stop within %.0fs", "WARNING", worker.name, timeout)
+                    running.add(worker.name)
+        return running
+
+    def format_prometheus(self):
+        lines = ["# TYPE ssm3_worker_up gauge"]
+        lines += [f'ssm3_worker_up{{worker="{w.name}"}} {int(w.is_alive())}' for w in self.workers]
+        lines.append("# TYPE ssm3_worker_restarts_total counter")
+        lines += [f'ssm3_worker_restarts_total{{worker="{w.name}"}} {w.restarts}' for w in self.workers]
+        return "\n".join(lines) + "\n"
+
+
+# --------- WORKERS --------- #
+
+def collect_loop(worker, queues):
+    """Sample every --interval and fan the display payload out to the sink queues."""
+    from ssm.ohm import get_temperatures_from_json
+    next_tick = time.monotonic()
+    while not worker.stopping.is_set():
+        with timed_stage("cycle"):
+            cpu_temp, gpu_temp = get_temperatures_from_json()
+            sample = nodemcu.build_filtered_metrics(cpu_temp, gpu_temp)
+            if alerts.engine is not None:
+                alerts.engine.evaluate(time.time())
+        for queue in queues:
+            queue.put(sample)
+        worker.beat()
+        # Fixed-rate ticks: a slow cycle shortens the next wait instead of shifting the schedule
+        next_tick += options.args.interval
+        delay = next_tick - time.monotonic()
+        if delay < 0:
+            next_tick = time.monotonic()
+            delay = 0
+        worker.wait(delay)
+
+
+def discovery_loop(worker):
+    """Keep the NodeMCU address known, rescanning with backoff while it is not."""
+    delay = DISCOVERY_RETRY_MIN
+    while not worker.stopping.is_set():
+        worker.beat()
+        if nodemcu.nodemcu_ip:
+            delay = DISCOVERY_RETRY_MIN
+            worker.wait(1.0)
+            continue
+        if options.args.ip:
+            nodemcu.nodemcu_ip = options.args.ip
+        # A full scan can outlast the wedge timeout; beat between probe batches
+        if nodemcu.discover_nodemcu(heartbeat=worker.beat):
+            log(f"NodeMCU available at {nodemcu.nodemcu_ip}", "SUCCESS")
+            continue
+        nodemcu.nodemcu_ip = None
+        worker.wait(delay)
+        delay = min(delay * 2, DISCOVERY_RETRY_MAX)
+
+
+def nodemcu_loop(worker, queue):
+    """Push queued payloads to the NodeMCU; outbox them (or drop) while it is unknown."""
+    while not (worker.stopping.is_set() and not len(queue)):
+        worker.beat()
+        sample = queue.get(timeout=0.5)
+        if sample is None:
+            continue
+        try:
+            if nodemcu.nodemcu_ip:
+                nodemcu.push_metrics(sample, rediscover=False)
+            elif nodemcu.outbox is not None:
+                nodemcu.outbox.add(sample)
+        except Exception as e:
+            log(f"Failed to push metrics to NodeMCU: {e}", "ERROR")
+
+
+def telegram_loop(worker, notifier):
+    """Run the notifier's sender; it returns once stop() has queued its end marker."""
+    notifier.run()
+    if not worker.stopping.is_set():
+        raise RuntimeError("Telegram sender stopped unexpectedly")
+
+
+# --------- ENTRY POINT --------- #
+
+def install_signals(supervisor):
+    """SIGTERM/SIGINT stop the service, SIGHUP reloads; handlers only set events."""
+    def request_stop(signum, frame):
+        supervisor.shutdown.set()
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+    sighup = getattr(signal, 'SIGHUP', None)
+    if sighup is not None:
+        signal.signal(sighup, lambda signum, frame: supervisor.reload.set())
+
+
+def run_service(args):
+    """Run the collector as supervised workers until SIGTERM/Ctrl+C. Returns an exit code."""
+    supervisor = Supervisor()
+    display_queue = DropOldestQueue()
+    supervisor.add("collector", lambda worker: collect_loop(worker, [display_queue]),
+                   wedge_timeout=max(WEDGE_TIMEOUT, 3 * args.interval))
+    supervisor.add("discovery", discovery_loop)
+    supervisor.add("nodemcu", lambda worker: nodemcu_loop(worker, display_queue))
+    if notify.notifier is not None:
+        supervisor.add("telegram", lambda worker: telegram_loop(worker, notify.notifier),
+                       on_stop=lambda: notify.notifier.stop(args.drain_timeout), wedge_timeout=None)
+
+    register_exporter(supervisor.format_prometheus)
+    register_exporter(lambda: "# TYPE ssm3_queue_dropped_total counter\n"
+                              f'ssm3_queue_dropped_total{{queue="nodemcu"}} {display_queue.dropped}\n'
+                              "# TYPE ssm3_queue_depth gauge\n"
+                              f'ssm3_queue_depth{{queue="nodemcu"}} {len(display_queue)}\n')
+    install_signals(supervisor)
+    supervisor.start()
+
+    last_stats_dump = time.time()
+    while not supervisor.shutdown.wait(SUPERVISE_INTERVAL):
+        supervisor.check()
+        hooks = watch_hooks
+        if supervisor.reload.is_set():
+            supervisor.reload.clear()
+            log("Reloading configuration", "INFO")
+            hooks = reload_hooks
+        for hook in hooks:
+            try:
+                hook()
+            except Exception as e:
+                log(f"Reload failed: {e}", "ERROR")
+        args = options.args
+        if args.stats_interval and time.time() - last_stats_dump >= args.stats_interval:
+            dump_stage_stats()
+            last_stats_dump = time.time()
+        dump_requested_stats()
+
+    log("Shutting down: draining %d queued samples", "INFO", len(display_queue))
+    supervisor.stop({"collector", "discovery"}, args.drain_timeout)
+    still_sending = supervisor.stop({"nodemcu"}, args.drain_timeout)
+    if len(display_queue):
+        log("Dropped %d samples that could not be sent in time", "WARNING", len(display_queue))
+    if still_sending:
+        # The worker owns the batcher and outbox until it returns; flushing here would race it
+        log("Skipping the last batch flush: the nodemcu worker is still sending", "WARNING")
+    else:
+        try:
+            nodemcu.flush_batch(rediscover=False)
+        except Exception as e:
+            log(f"Could not flush the last batch: {e}", "ERROR")
+    supervisor.stop({"telegram"}, args.drain_timeout)
+    if nodemcu.registry is not None:
+        nodemcu.registry.save()
+    # Only loaded when enabled (see ssm.cli.main)
+    if args.fleet:
+        from ssm import fleet
+        fleet.collector.stop()
+    if args.shm:
+        from ssm import shm
+        shm.table.close()
+    if args.record:
+        from ssm import history
+        history.writer.close()
+    dump_stage_stats()
+    log("Exiting monitoring service.")
+    return 0
@@ -0,0 +1,269 @@
+"""Latest sensor values in named shared memory, for local readers that should not poll OHM.
+
+With --shm NAME the collector publishes every cycle's sensor vector into a
+multiprocessing.shared_memory segment. Readers attach by name and read the
+values in place: no HTTP, no copies beyond the ones they choose to make, and
+no extra requests to OHM however many of them there are.
+
+Segment layout (little endian):
+
+    0   4s  magic b"SSM3"
+    4   H   layout version (SHM_LAYOUT)
+    8   Q   sequence: odd while the collector is writing, even when stable
+    16  Q   schema generation, bumped whenever a sensor is added
+    24  d   timestamp of the sample
+    32  I   sensors in use
+    36  I   capacity (value slots in this segment)
+    64  d[capacity]  values, NaN where a sensor had no reading this cycle
+
+The schema lives in a JSON sidecar next to the other state files,
+<library path>/<NAME>.schema.json: the current segment name, its
+generation and every sensor's path, unit and slot. Slots never move, so a
+reader only reloads the sidecar when the generation changes. When the
+sensors outgrow the segment, a larger one is created under a new name and
+the sidecar points readers to it.
+
+Readers use the sequence as a seqlock: read it, read the values, read it
+again, and retry if it was odd or changed. SharedValuesReader does this.
+"""
+import json
+import math
+import os
+import struct
+import time
+from array import array
+
+from ssm.logs import log
+
+SHM_LAYOUT = 1
+SHM_MAGIC = b"SSM3"
+SHM_HEADER = struct.Struct("<4sH2xQQdII")
+SHM_SEQUENCE = struct.Struct("<Q")
+SHM_SEQUENCE_OFFSET = 8
+SHM_VALUES_OFFSET = 64
+SHM_MIN_CAPACITY = 256  # value slots in the first segment
+SHM_READ_RETRIES = 100  # attempts at a consistent read before giving up
+SHM_RETRY_SLEEP = 0.001  # seconds between attempts
+
+NAN = float('nan')
+
+
+def schema_path(name, library_path):
+    return os.path.join(library_path, f"{name}.schema.json")
+
+
+def _untrack(segment):
+    """Stop this process's resource tracker from unlinking a segment it only attached to."""
+    if os.name == 'nt':
+        return
+    try:
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(segment._name, "shared_memory")
+    except (ImportError, AttributeError, KeyError):
+        pass
+
+
+class SharedValuesTable:
+    """The collector side: a sensor listener that publishes each cycle into shared memory."""
+
+    def __init__(self, name, library_path):
+        self.name = name
+        self.sidecar = schema_path(name, library_path)
+        self.segment = None
+        self.capacity = 0
+        self.sequence = 0
+        self.generation = 0
+        self.names = []
+        self.units = []
+        self.slots = {}  # sensor path -> slot
+        self.values = array('d')
+
+    def _create_segment(self, capacity):
+        """Switch to a new segment of `capacity` slots; returns the old one, still open."""
+        from multiprocessing import shared_memory
+        old = self.segment
+        # A new name for each size: Windows cannot recreate a name that readers still hold
+        segment_name = self.name if old is None else f"{self.name}-{self.generation}"
+        size = SHM_VALUES_OFFSET + 8 * capacity
+        try:
+            segment = shared_memory.SharedMemory(segment_name, create=True, size=size)
+        except FileExistsError:
+            # Left behind by a collector that did not shut down cleanly
+            stale = shared_memory.SharedMemory(segment_name)
+            stale.close()
+            stale.unlink()
+            segment = shared_memory.SharedMemory(segment_name, create=True, size=size)
+        self.segment = segment
+        self.capacity = capacity
+        return old
+
+    def _write_schema(self, timestamp):
+        schema = {
+            'layout': SHM_LAYOUT,
+            'segment': self.segment.name.lstrip('/'),
+            'generation': self.generation,
+            'capacity': self.capacity,
+            'updated': timestamp,
+            'sensors': [{'path': name, 'unit': unit, 'slot': slot}
+                        for slot, (name, unit) in enumerate(zip(self.names, self.units))],
+        }
+        os.makedirs(os.path.dirname(self.sidecar), exist_ok=True)
+        with open(self.sidecar + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(schema, f, ensure_ascii=False)
+        os.replace(self.sidecar + ".tmp", self.sidecar)
+
+    def update(self, timestamp, readings):
+        """Publish one snapshot of {path: (value, unit)}."""
+        values = self.values
+        for slot in range(len(values)):
+            values[slot] = NAN
+        added = False
+        for name, (value, unit) in readings.items():
+            slot = self.slots.get(name)
+            if slot is None:
+                slot = self.slots[name] = len(self.names)
+                self.names.append(name)
+                self.units.append(unit)
+                values.append(NAN)
+                added = True
+            if isinstance(value, (int, float)):
+                values[slot] = value
+
+        if added or self.segment is None:
+            self.generation += 1
+            retired = None
+            if self.segment is None or len(values) > self.capacity:
+                retired = self._create_segment(max(SHM_MIN_CAPACITY, 2 * len(values)))
+            # Published before the values, so a reader seeing the new generation finds its schema
+            self._write_schema(timestamp)
+            if retired is not None:
+                # Readers still on the old segment see the new generation and follow the sidecar
+                self._begin_write(retired.buf)
+                self._write_header(retired.buf, timestamp, 0)
+                retired.close()
+                retired.unlink()
+
+        buf = self.segment.buf
+        self._begin_write(buf)
+        buf[SHM_VALUES_OFFSET:SHM_VALUES_OFFSET + 8 * len(values)] = values.tobytes()
+        self._write_header(buf, timestamp, len(values))
+
+    def _begin_write(self, buf):
+        self.sequence += 1  # odd: writing
+        SHM_SEQUENCE.pack_into(buf, SHM_SEQUENCE_OFFSET, self.sequence)
+
+    def _write_header(self, buf, timestamp, count):
+        """Finish a write: the other header fields under the odd sequence, then the even one.
+        
+        The even sequence gets its own store, issued last, so a reader never
+        sees it before the timestamp and count that go with it.
+        """
+        SHM_HEADER.pack_into(buf, 0, SHM_MAGIC, SHM_LAYOUT, self.sequence, self.generation,
+                             timestamp, count, self.capacity)
+        self.sequence += 1  # even: stable
+        SHM_SEQUENCE.pack_into(buf, SHM_SEQUENCE_OFFSET, self.sequence)
+
+    def close(self):
+        """Remove the segment and its sidecar (at shutdown)."""
+        if self.segment is None:
+            return
+        # Attached readers get no values from now on rather than the last ones forever
+        self._begin_write(self.segment.buf)
+        self._write_header(self.segment.buf, time.time(), 0)
+        self.segment.close()
+        self.segment.unlink()
+        self.segment = None
+        try:
+            os.remove(self.sidecar)
+        except OSError:
+            pass
+
+
+class SharedValuesReader:
+    """Reads the collector's latest values from shared memory.
+
+        reader = SharedValuesReader("ssm3", LIBRARY_PATH)
+        timestamp, values = reader.read()  # {path: value}
+        reader.get("DESKTOP/AMD Ryzen 9 5900X/Temperatures/CPU Package")
+    """
+
+    def __init__(self, name, library_path):
+        self.sidecar = schema_path(name, library_path)
+        self.segment = None
+        self.generation = None
+        self.names = []
+        self.units = []
+        self.slots = {}
+        self._attach()
+
+    def _attach(self):
+        from multiprocessing import shared_memory
+        with open(self.sidecar, "r", encoding="utf-8") as f:
+            schema = json.load(f)
+        if schema.get('layout') != SHM_LAYOUT:
+            raise ValueError(f"unsupported shared memory layout {schema.get('layout')}")
+        if self.segment is None or self.segment.name.lstrip('/') != schema['segment']:
+            if self.segment is not None:
+                self.segment.close()
+            self.segment = shared_memory.SharedMemory(schema['segment'])
+            _untrack(self.segment)
+        self.generation = schema['generation']
+        self.names = [sensor['path'] for sensor in schema['sensors']]
+        self.units = [sensor['unit'] for sensor in schema['sensors']]
+        self.slots = {name: slot for slot, name in enumerate(self.names)}
+
+    def _consistent(self, read):
+        """Run `read(buf, count)` until it saw no concurrent write; returns (timestamp, result)."""
+        for attempt in range(SHM_READ_RETRIES):
+            if attempt:
+                time.sleep(SHM_RETRY_SLEEP)  # let the collector finish its write, even on one core
+            buf = self.segment.buf
+            magic, layout, before, generation, timestamp, count, _ = SHM_HEADER.unpack_from(buf, 0)
+            if magic != SHM_MAGIC or before & 1:
+                continue
+            if generation != self.generation:
+                self._attach()  # new sensors, maybe a new segment
+                continue
+            result = read(buf, min(count, len(self.names)))
+            if SHM_SEQUENCE.unpack_from(buf, SHM_SEQUENCE_OFFSET)[0] == before:
+                return timestamp, result
+        raise TimeoutError("shared memory kept changing while being read")
+
+    def read_array(self):
+        """(timestamp, array of every slot's value), one copy of the value block."""
+        def read(buf, count):
+            values = array('d')
+            values.frombytes(buf[SHM_VALUES_OFFSET:SHM_VALUES_OFFSET + 8 * count])
+            return values
+        return self._consistent(read)
+
+    def read(self):
+        """(timestamp, {path: value}) for every sensor that had a reading."""
+        timestamp, values = self.read_array()
+        return timestamp, {name: value for name, value in zip(self.names, values) if not math.isnan(value)}
+
+    def get(self, path):
+        """One sensor's latest value in place (None if unknown or missing this cycle)."""
+        slot = self.slots.get(path)
+        if slot is None:
+            self._attach()
+            slot = self.slots.get(path)
+            if slot is None:
+                return None
+        _, value = self._consistent(lambda buf, count: struct.unpack_from(
+            "<d", buf, SHM_VALUES_OFFSET + 8 * slot)[0] if slot < count else NAN)
+        return None if math.isnan(value) else value
+
+    def close(self):
+        if self.segment is not None:
+            self.segment.close()
+            self.segment = None
+
+
+# The collector's table with --shm, set up by the CLI
+table = None
+
+
+def start_table(name, library_path):
+    log(f"Publishing latest sensor values to shared memory {name!r} (schema: {schema_path(name, library_path)})")
+    return SharedValuesTable(name, library_path)
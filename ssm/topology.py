@@ -0,0 +1,232 @@
+"""Hardware topology of an OHM tree: hosts, devices, sensor categories and sensors, with indexes.
+
+OHM's data.json is a real hierarchy:
+
+    Sensor (root)
+      DESKTOP                              host          computer.png
+        MSI MAG X570 TOMAHAWK WIFI         mainboard     mainboard.png
+          Nuvoton NCT6797D                 superio       chip.png
+            Voltages / Temperatures / Fans category
+              CPU VCore                    sensor
+        AMD Ryzen 9 5900X                  cpu           cpu.png
+        NVIDIA GeForce RTX 3080            gpu           nvidia.png / ati.png
+
+Devices are classified by the icon OHM gives each hardware type, which
+tells an AMD CPU from an AMD GPU where the name does not. Trees without
+icons fall back to the name, checking GPU words before CPU words, so
+"AMD Radeon" is a GPU and only "AMD Ryzen"-style names are CPUs.
+
+A Topology is built once per hardware layout and cached by a signature of
+each host's devices (TOPOLOGY_CACHE_SIZE layouts, so fleet shards keep one
+per host). Every sensor remembers its position in the tree, so reading a
+value is a direct walk down child indexes. A sensor whose node no longer
+matches marks the topology stale, and the next lookup rebuilds it.
+
+Queries are dictionary lookups on indexes built with the topology:
+
+    topo = topology.current(data)
+    topo.devices('gpu')[1].sensors_in('Temperatures')   # all temperatures under GPU #2
+    topo.sensors('cpu', 'Load')                          # every CPU load sensor
+    topo.by_path["DESKTOP/AMD Ryzen 9 5900X/Temperatures/CPU Package"].read(data)
+"""
+from collections import OrderedDict
+
+TOPOLOGY_CACHE_SIZE = 32  # hardware layouts kept; one per fleet host polled by a process
+
+# OHM's hardware icons -> device kind
+KIND_BY_ICON = {
+    'computer.png': 'host',
+    'mainboard.png': 'mainboard',
+    'chip.png': 'superio',
+    'cpu.png': 'cpu',
+    'ram.png': 'memory',
+    'nvidia.png': 'gpu',
+    'ati.png': 'gpu',
+    'hdd.png': 'storage',
+    'nic.png': 'network',
+    'bigng.png': 'controller',
+}
+# Name fallbacks, checked in this order: GPU words first, as vendors make both
+KIND_KEYWORDS = (
+    ('gpu', ('GeForce', 'Quadro', 'Radeon', 'NVIDIA', 'GPU', 'Graphics', 'Arc A')),
+    ('cpu', ('CPU', 'Processor', 'Ryzen', 'Threadripper', 'EPYC', 'Athlon', 'Core i', 'Xeon',
+             'Pentium', 'Celeron')),
+    ('memory', ('Memory', 'RAM')),
+    ('storage', ('Hard Disk', 'SSD', 'HDD', 'NVMe')),
+    ('superio', ('Nuvoton', 'ITE IT', 'Winbond', 'Fintek', 'NCT', 'Super I/O')),
+)
+
+
+def classify(node, depth):
+    """Device kind of a hardware node from its icon, else its name or what it holds."""
+    icon = node.get('ImageURL', '').rsplit('/', 1)[-1]
+    if icon in KIND_BY_ICON:
+        return KIND_BY_ICON[icon]
+    if depth == 1:
+        return 'host'
+    text = node.get('Text', '')
+    for kind, keywords in KIND_KEYWORDS:
+        if any(keyword in text for keyword in keywords):
+            return kind
+    # Hardware holding other hardware (the Super I/O chip) is the mainboard
+    if any(any(grandchild.get('Children') for grandchild in child.get('Children') or ())
+           for child in node.get('Children') or ()):
+        return 'mainboard'
+    return 'other'
+
+
+def signature(data):
+    """Identity of the hardware layout: each host's devices and their group counts."""
+    return tuple((host.get('Text'), tuple((hw.get('id'), hw.get('Text'), len(hw.get('Children') or ()))
+                                          for hw in host.get('Children') or ()))
+                 for host in data.get('Children') or ())
+
+
+class Device:
+    """A host, or a piece of hardware in it, with the sensors at and below it."""
+    __slots__ = ('name', 'kind', 'path', 'parent', 'children', 'host', 'ordinal', 'sensors_below', 'categories')
+
+    def __init__(self, name, kind, path, parent):
+        self.name = name
+        self.kind = kind
+        self.path = path
+        self.parent = parent
+        self.children = []
+        self.host = parent.host if parent is not None else self
+        self.ordinal = 0  # position among the host's devices of the same kind
+        self.sensors_below = []
+        self.categories = {}  # category -> sensors at and below this device
+
+    def sensors_in(self, category):
+        return self.categories.get(category, [])
+
+    def __repr__(self):
+        return f"Device({self.kind} #{self.ordinal + 1}: {self.path})"
+
+
+class Sensor:
+    """One leaf reading, with where to find it in the tree."""
+    __slots__ = ('name', 'category', 'path', 'device', 'unit', 'locator', 'topology')
+
+    def __init__(self, name, category, path, device, unit, locator, topology):
+        self.name = name
+        self.category = category
+        self.path = path  # as in ohm.build_sensor_index
+        self.device = device
+        self.unit = unit
+        self.locator = locator  # child indexes from the root
+        self.topology = topology
+
+    def read(self, data):
+        """The sensor's number in `data`, or None; a node that moved marks the topology stale."""
+        node = data
+        try:
+            for i in self.locator:
+                node = node['Children'][i]
+        except (KeyError, IndexError, TypeError):
+            self.topology.stale = True
+            return None
+        if node.get('Text') != self.name:
+            self.topology.stale = True
+            return None
+        try:
+            return float(node.get('Value', '').partition(' ')[0])
+        except ValueError:
+            return None
+
+    def __repr__(self):
+        return f"Sensor({self.path})"
+
+
+class Topology:
+    """Devices and sensors of one OHM tree, indexed by path, kind and category."""
+    __slots__ = ('signature', 'hosts', 'devices_by_kind', 'by_path', 'by_kind_category', 'stale')
+
+    def __init__(self, data):
+        self.signature = signature(data)
+        self.hosts = []
+        self.devices_by_kind = {}  # kind -> devices in tree order
+        self.by_path = {}  # path -> Device or Sensor
+        self.by_kind_category = {}  # (kind, category) -> sensors in tree order
+        self.stale = False
+        for i, child in enumerate(data.get('Children') or ()):
+            self._add(child, None, (i,), "", 1)
+
+    def _add(self, node, parent, locator, parent_path, depth):
+        text = node.get('Text', '')
+        path = f"{parent_path}/{text}" if parent_path else text
+        children = node.get('Children') or ()
+        device = Device(text, classify(node, depth), path, parent)
+        if parent is None:
+            self.hosts.append(device)
+        else:
+            parent.children.append(device)
+            same_kind = self.devices_by_kind.setdefault(device.kind, [])
+            device.ordinal = sum(1 for other in same_kind if other.host is device.host)
+            same_kind.append(device)
+        self.by_path[path] = device
+        for i, child in enumerate(children):
+            grandchildren = child.get('Children') or ()
+            if grandchildren and all(not leaf.get('Children') for leaf in grandchildren):
+                self._add_category(child, device, locator + (i,), path)
+            elif grandchildren:
+                self._add(child, device, locator + (i,), path, depth + 1)
+
+    def _add_category(self, node, device, locator, parent_path):
+        category = node.get('Text', '')
+        category_path = f"{parent_path}/{category}"
+        for i, leaf in enumerate(node['Children']):
+            name = leaf.get('Text', '')
+            number, _, unit = leaf.get('Value', '').partition(' ')
+            try:
+                float(number)
+            except ValueError:
+                continue
+            sensor = Sensor(name, category, f"{category_path}/{name}", device, unit, locator + (i,), self)
+            self.by_path[sensor.path] = sensor
+            self.by_kind_category.setdefault((device.kind, category), []).append(sensor)
+            owner = device
+            while owner is not None:
+                owner.sensors_below.append(sensor)
+                owner.categories.setdefault(category, []).append(sensor)
+                owner = owner.parent
+
+    def devices(self, kind):
+        """Devices of one kind in tree order."""
+        return self.devices_by_kind.get(kind, [])
+
+    def sensors(self, kind, category=None):
+        """Sensors of every device of `kind` (and its sub-devices' own kind), optionally one category."""
+        if category is not None:
+            return self.by_kind_category.get((kind, category), [])
+        return [sensor for device in self.devices(kind) for sensor in device.sensors_below if sensor.device is device]
+
+    def snapshot(self):
+        """Hosts and their devices as nested dicts."""
+        def describe(device):
+            return {'name': device.name, 'kind': device.kind,
+                    'sensors': {category: len(sensors) for category, sensors in device.categories.items()},
+                    'children': [describe(child) for child in device.children]}
+        return [describe(host) for host in self.hosts]
+
+
+def ranked(sensors, preferred):
+    """`sensors` with names containing preferred[0] first, then preferred[1], ..., then the rest."""
+    def rank(sensor):
+        return next((i for i, word in enumerate(preferred) if word in sensor.name), len(preferred))
+    return sorted(sensors, key=rank)
+
+
+_cache = OrderedDict()  # signature -> Topology
+
+
+def current(data, rebuild=False):
+    """The topology of `data`, built only when its hardware layout is new (or `rebuild`)."""
+    key = signature(data)
+    topo = _cache.get(key)
+    if topo is None or topo.stale or rebuild:
+        topo = _cache[key] = Topology(data)
+        if len(_cache) > TOPOLOGY_CACHE_SIZE:
+            _cache.popitem(last=False)
+    _cache.move_to_end(key)
+    return topo
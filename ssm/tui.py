@@ -0,0 +1,272 @@
+"""Terminal dashboard (--tui): a fixed live table of every sensor instead of scrolling log lines.
+
+The dashboard runs on its own thread and frame clock (--tui-fps), separate
+from the collection interval. Each frame copies the collector's state under
+the derived statistics' lock (DerivedMetrics.recent), so it never shows a
+half-applied sample: the display metrics and every sensor, with their
+window min/max and a sparkline of recent samples, and the firing and
+pending alerts. Log records go to a short pane at the bottom
+instead of the console.
+
+A frame is a grid of fixed-width cells. Only the cells that differ from
+the previous frame are written, each behind an ANSI cursor move, so a
+steady screen costs a few bytes per frame. When nothing changed since the
+last frame (no new sample, no new log line, same second on the clock and
+same terminal size), no frame is built at all. Resizing the terminal
+clears it and redraws everything.
+"""
+import atexit
+import logging
+import os
+import shutil
+import sys
+import threading
+import time
+from collections import deque
+
+from ssm import alerts, derived, logs, options
+from ssm.stats import record_stage
+
+TUI_LOG_LINES = 6  # lines in the log pane
+TUI_SPARK_WIDTH = 24  # samples per sparkline
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+
+# Fixed columns after the sensor name: (title, width)
+TUI_COLUMNS = (("value", 10), ("unit", 5), ("min", 9), ("max", 9), ("trend", TUI_SPARK_WIDTH + 1), ("alert", 12))
+
+CSI = "\x1b["
+STYLES = {
+    '': "",
+    'title': CSI + "1;7m",
+    'heading': CSI + "1m",
+    'section': CSI + "1;36m",
+    'firing': CSI + "1;31m",
+    'pending': CSI + "33m",
+    'dim': CSI + "2m",
+    'error': CSI + "31m",
+    'warning': CSI + "33m",
+}
+RESET = CSI + "0m"
+LOG_STYLES = {'ERROR': 'error', 'WARNING': 'warning', 'DEBUG': 'dim'}
+
+
+class LogPane(logging.Handler):
+    """Keeps the last few console records for the dashboard to show."""
+
+    def __init__(self, size=TUI_LOG_LINES):
+        super().__init__()
+        self.lines = deque(maxlen=size)
+        self.version = 0
+        self.setFormatter(logs.ConsoleFormatter())
+
+    def emit(self, record):
+        try:
+            text = self.format(record).replace("\n", " ⏎ ")
+        except Exception:
+            self.handleError(record)
+            return
+        clock = time.strftime("%H:%M:%S", time.localtime(record.created))
+        self.lines.append((f"{clock} {text}", LOG_STYLES.get(getattr(record, 'type', ''), '')))
+        self.version += 1
+
+
+def fit(text, width, left=False):
+    """`text` padded or cut to exactly `width` characters; long names keep their end."""
+    if len(text) > width:
+        return "…" + text[len(text) - width + 1:] if left and width > 1 else text[:width]
+    return text.ljust(width)
+
+
+def format_value(value):
+    if value is None or value != value:
+        return "—"
+    return f"{value:.1f}" if abs(value) < 1e5 else f"{value:.3g}"
+
+
+def sparkline(samples, low, high):
+    """Recent samples of one series, scaled to its window min/max (spaces for gaps)."""
+    if low != low or high != high:
+        low = high = 0.0
+    span = high - low
+    chars = []
+    for value in samples:
+        if value != value:
+            chars.append(" ")
+        elif span <= 0:
+            chars.append(SPARK_CHARS[0])
+        else:
+            level = int((value - low) / span * (len(SPARK_CHARS) - 1) + 0.5)
+            chars.append(SPARK_CHARS[max(0, min(len(SPARK_CHARS) - 1, level))])
+    return "".join(chars)
+
+
+def alert_states():
+    """series -> ('firing' | 'pending', rule name) from the alert engine."""
+    engine = alerts.engine
+    return engine.series_states() if engine is not None else {}
+
+
+class Dashboard:
+    """Draws the live table on a background thread until stopped."""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self.pane = LogPane()
+        self.previous = []  # last frame's rows, each a tuple of (text, style) cells
+        self.layout = None  # (columns x offsets, terminal size) of the last frame
+        self.state = None
+        self.stopping = threading.Event()
+        self.thread = None
+        self.frames = 0
+        self.started = time.time()
+
+    def start(self):
+        if os.name == 'nt':
+            os.system("")  # turns on ANSI escape handling in the Windows console
+        logs.redirect_console(self.pane)
+        self.stream.write(CSI + "?1049h" + CSI + "?25l" + CSI + "2J")  # alternate screen, no cursor
+        self.stream.flush()
+        self.thread = threading.Thread(target=self._run, name="ssm-tui", daemon=True)
+        self.thread.start()
+        atexit.register(self.stop)
+        return self
+
+    def stop(self):
+        if self.thread is None:
+            return
+        self.stopping.set()
+        self.thread.join(2.0)
+        self.thread = None
+        self.stream.write(RESET + CSI + "?25h" + CSI + "?1049l")
+        self.stream.flush()
+        logs.redirect_console(None)
+
+    def _run(self):
+        while not self.stopping.wait(1.0 / max(options.args.tui_fps, 0.1)):
+            try:
+                self.draw()
+            except Exception as e:
+                self.pane.lines.append((f"Dashboard error: {type(e).__name__}: {e}", 'error'))
+                self.pane.version += 1
+
+    def _changed(self, size):
+        state = (size, int(time.time()), self.pane.version,
+                 derived.sensor_stats.newest_time(), derived.display_stats.newest_time())
+        if state == self.state:
+            return False
+        self.state = state
+        return True
+
+    def draw(self):
+        size = shutil.get_terminal_size()
+        if not self._changed(size):
+            return
+        started = time.perf_counter()
+        width, height = size.columns, size.lines
+        name_width = max(12, width - sum(w for _, w in TUI_COLUMNS) - 1)
+        widths = [name_width] + [w - 1 for _, w in TUI_COLUMNS]
+        # Each cell also owns the gap after it, so a full-width line and a table row cover the same span
+        spans = [w + 1 for w in widths[:-1]] + [widths[-1]]
+        offsets = [sum(spans[:i]) for i in range(len(spans))]
+
+        frame = self.build(widths, height)
+        out = []
+        if self.layout != (offsets, size):
+            out.append(RESET + CSI + "2J")  # new geometry: start from a blank screen
+            self.previous = []
+            self.layout = (offsets, size)
+        for y, row in enumerate(frame):
+            before = self.previous[y] if y < len(self.previous) else None
+            if row == before:
+                continue
+            for x, span, cell, old in zip(offsets, spans, row, before or [None] * len(row)):
+                if cell != old:
+                    text, style = cell
+                    out.append(f"{CSI}{y + 1};{x + 1}H{STYLES[style]}{text.ljust(span)}{RESET if style else ''}")
+        for y in range(len(frame), len(self.previous)):
+            out.append(f"{CSI}{y + 1};1H{CSI}K")
+        self.previous = frame
+        if out:
+            self.stream.write("".join(out))
+            self.stream.flush()
+        self.frames += 1
+        record_stage("tui_frame", time.perf_counter() - started)
+
+    def build(self, widths, height):
+        """The frame as rows of (text, style) cells, one per column."""
+        columns = len(widths)
+
+        def line(text, style=''):
+            # A full-width line, split over the column cells so it diffs like any other row
+            text = fit(text, sum(widths) + columns - 1)
+            cells, start = [], 0
+            for w in widths:
+                cells.append((text[start:start + w + 1] if len(cells) < columns - 1 else text[start:], style))
+                start += w + 1
+            return tuple(cells)
+
+        def blank():
+            return tuple((" " * w, '') for w in widths)
+
+        firing = alert_states()
+        rows = [self.header_line(line, firing), blank()]
+        rows.append(tuple((fit(title, w), 'heading')
+                          for (title, _), w in zip((("sensor", 0),) + TUI_COLUMNS, widths)))
+
+        body = []
+        for title, stats in (("Display", derived.display_stats), ("Sensors", derived.sensor_stats)):
+            series = stats.recent(widths[5])
+            body.append(line(f"{title} ({len(series)})", 'section'))
+            for row in series:
+                body.append(self.sensor_row(row, widths, firing.get(row[0])))
+
+        room = max(0, height - len(rows) - TUI_LOG_LINES - 2)
+        if len(body) > room:
+            body = body[:max(0, room - 1)] + [line(f"… {len(body) - room + 1} more rows (enlarge the terminal)", 'dim')]
+        rows += body
+        rows += [blank()] * (height - len(rows) - TUI_LOG_LINES - 1)
+        rows.append(line("log", 'heading'))
+        entries = list(self.pane.lines)
+        rows += [line(text, style) for text, style in entries]
+        rows += [blank()] * (TUI_LOG_LINES - len(entries))
+        return rows[:height]
+
+    def header_line(self, line, firing):
+        uptime = int(time.time() - self.started)
+        parts = [f"SSM3  {time.strftime('%H:%M:%S')}", f"up {uptime // 3600}:{uptime // 60 % 60:02d}:{uptime % 60:02d}",
+                 f"{derived.sensor_stats.count} samples in window"]
+        if options.args.fleet:
+            from ssm import fleet
+            hosts = fleet.collector.snapshot()['hosts'].values()
+            parts.append(f"fleet {sum(host['up'] for host in hosts)}/{len(hosts)} up")
+        states = [state for state, _ in firing.values()]
+        parts.append(f"alerts: {states.count('firing')} firing, {states.count('pending')} pending")
+        parts.append("Ctrl+C to exit")
+        return line("  │  ".join(parts), 'title')
+
+    def sensor_row(self, row, widths, alert):
+        name, unit, latest, low, high, samples = row
+        style = alert[0] if alert else ''
+        cells = [
+            (fit(name, widths[0], left=True), style),
+            (format_value(latest).rjust(widths[1]), style),
+            (fit(unit, widths[2]), 'dim'),
+            (format_value(low).rjust(widths[3]), ''),
+            (format_value(high).rjust(widths[4]), ''),
+            (fit(sparkline(samples, low, high), widths[5]), style),
+            (fit(alert[1] if alert else "", widths[6]), style),
+        ]
+        return tuple(cells)
+
+
+# The dashboard with --tui, set up by the CLI
+dashboard = None
+
+
+def start_dashboard():
+    """Start the dashboard if stdout is a terminal; otherwise keep the log output (logged)."""
+    if not sys.stdout.isatty():
+        from ssm.logs import log
+        log("--tui needs a terminal; keeping the log output", "WARNING")
+        return None
+    return Dashboard().start()
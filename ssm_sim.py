@@ -0,0 +1,879 @@
+"""Local stand-ins for OpenHardwareMonitor and the NodeMCU display, plus a load harness.
+
+Nothing here needs Windows, OHM or an ESP8266, so the whole collector can be
+exercised end to end on any machine:
+
+    python ssm_sim.py ohm --port 8085
+        Serves /data.json built from the ohm_data.json fixture. Sensor values
+        drift like real hardware (a mean-reverting random walk per sensor,
+        refreshed once per --tick like OHM's own 1 Hz update).
+
+    python ssm_sim.py nodemcu --port 8080
+        Implements the CLdisplaystat.ino endpoints (/, /update, /update/batch,
+        /thresholds, /metrics, /reset) and its UDP listener, with configurable
+        latency, random failures and scheduled outages. Batches over the
+        firmware's size limits are refused with 413, as on the device.
+
+    python ssm_sim.py loadtest --duration 30 -- --udp --interval 0.1
+        Starts both stubs, runs ssm3.py against them (arguments after "--" are
+        passed to the collector) and reports throughput and latency.
+
+    python ssm_sim.py bootstrap
+        Serves a fake OHM release from a local file server that cuts the first
+        download short, and checks that ssm.bootstrap resumes it, verifies the
+        SHA-256, installs it with a manifest and skips the zip afterwards.
+
+    python ssm_sim.py telegram --port 8081
+        Serves the Telegram Bot API sendMessage call and prints each message;
+        point the collector at it with --telegram-url http://127.0.0.1:8081.
+
+    python ssm_sim.py notify
+        Floods ssm.notify with an alert storm against the Telegram stand-in
+        (which enforces a rate limit with 429 replies) and checks that
+        submitting never blocks, alerts are coalesced into digests and the
+        sender stays inside the limit.
+
+    python ssm_sim.py fleet --hosts 16 --workers 1,2,4
+        Serves many stub OHM machines and polls them with ssm.fleet at each
+        worker count, checking every sensor arrives and reporting how
+        throughput scales with worker processes.
+
+    python ssm_sim.py history
+        Records samples with ssm.history, cuts the day file short like a crash
+        mid-write, reopens the writer and checks that `ssm3.py export` returns
+        every whole record from before and after the crash.
+"""
+import argparse
+import gzip
+import hashlib
+import io
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from bench_ssm3 import FIXTURE_PATH, scale_tree
+from ssm.batch import FIRMWARE_BATCH_BYTES, FIRMWARE_BATCH_SAMPLES, JSON_CONTENT_TYPE, decode_batch
+
+SIM_DIR = os.path.dirname(os.path.abspath(__file__))
+UDP_PORT = 4210
+
+# Unit -> (low, high, step size) for the random walk
+DRIFT_LIMITS = {
+    '°C': (20.0, 100.0, 0.6),
+    '%': (0.0, 100.0, 3.0),
+    'RPM': (0.0, 5000.0, 25.0),
+}
+DRIFT_PULL = 0.05  # fraction of the distance back to the captured value per tick
+
+DEFAULT_THRESHOLDS = {
+    'cpu_temp_threshold': 80.0,
+    'cpu_usage_threshold': 90.0,
+    'ram_usage_threshold': 90.0,
+    'gpu_temp_threshold': 80.0,
+    'gpu_usage_threshold': 90.0,
+    'notifications_enabled': True,
+}
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """Shared plumbing: latency and failure injection, body reading, replies."""
+
+    def _inject_faults(self):
+        """Apply the server's fault settings. Returns False if the request was dropped."""
+        server = self.server
+        if server.latency:
+            time.sleep(server.latency)
+        if server.in_outage():
+            # Behave like an unreachable device: close without answering
+            self.close_connection = True
+            self.connection.shutdown(socket.SHUT_RDWR)
+            return False
+        if server.fail_rate and random.random() < server.fail_rate:
+            self._send(500, 'text/plain', b"Injected failure")
+            return False
+        return True
+
+    def _read_body(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if self.headers.get('Content-Encoding') == 'gzip':
+            body = gzip.decompress(body)
+        return body
+
+    def _send_json(self, obj):
+        self._send(200, JSON_CONTENT_TYPE, json.dumps(obj).encode())
+
+    def _send(self, status, content_type, body):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, handler, latency=0.0, fail_rate=0.0, outage=None):
+        super().__init__(address, handler)
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.outage = outage  # (start, duration) in seconds after startup
+        self.started = time.time()
+        self.lock = threading.Lock()
+
+    def handle_error(self, request, client_address):
+        # Clients hanging up mid-reply (timeouts, a stopped collector) are routine here
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    def in_outage(self):
+        if not self.outage:
+            return False
+        elapsed = time.time() - self.started
+        return self.outage[0] <= elapsed < self.outage[0] + self.outage[1]
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+# --------- STUB OHM --------- #
+
+class StubOhmServer(_StubServer):
+    """Serves a drifting copy of the OHM fixture at /data.json."""
+
+    def __init__(self, address, fixture=FIXTURE_PATH, scale=1, tick=1.0, machine=None, **faults):
+        super().__init__(address, _OhmHandler, **faults)
+        with open(fixture, "r", encoding="utf-8") as f:
+            self.tree = scale_tree(json.load(f), scale)
+        if machine:
+            self.tree['Children'][0]['Text'] = machine
+        self.sensors = []  # [node, captured value, current value, unit, decimals]
+        self._collect(self.tree)
+        self.tick = tick
+        self.last_tick = 0
+        self.snapshot = b""
+        self.serve_times = []  # when each /data.json response went out
+        self._refresh()
+
+    def _collect(self, node):
+        for child in node.get('Children', []):
+            self._collect(child)
+        if node.get('Children'):
+            return
+        number, _, unit = node.get('Value', '').partition(' ')
+        try:
+            value = float(number)
+        except ValueError:
+            return
+        decimals = len(number.partition('.')[2])
+        self.sensors.append([node, value, value, unit, decimals])
+
+    def _refresh(self):
+        for sensor in self.sensors:
+            node, captured, value, unit, decimals = sensor
+            low, high, step = DRIFT_LIMITS.get(unit, (captured * 0.9, captured * 1.1, abs(captured) * 0.01))
+            value += random.gauss(0, step) + (captured - value) * DRIFT_PULL
+            value = min(max(value, low), high)
+            sensor[2] = value
+            node['Value'] = f"{value:.{decimals}f} {unit}"
+            for key, better in (('Min', min), ('Max', max)):
+                previous, _, _ = node.get(key, '').partition(' ')
+                try:
+                    node[key] = f"{better(float(previous), value):.{decimals}f} {unit}"
+                except ValueError:
+                    node[key] = node['Value']
+        self.snapshot = json.dumps(self.tree).encode()
+        self.last_tick = time.time()
+
+
+class _OhmHandler(_StubHandler):
+    def do_GET(self):
+        if self.path != '/data.json':
+            self._send(404, 'text/plain', b"Not found")
+            return
+        if not self._inject_faults():
+            return
+        server = self.server
+        with server.lock:
+            if time.time() - server.last_tick >= server.tick:
+                server._refresh()
+            body = server.snapshot
+            server.serve_times.append(time.time())
+        self._send(200, JSON_CONTENT_TYPE, body)
+
+
+# --------- STUB NODEMCU --------- #
+
+class StubNodeMcu(_StubServer):
+    """Mirrors the HTTP and UDP behaviour of CLdisplaystat.ino."""
+
+    def __init__(self, address, udp_port=UDP_PORT, history=False, **faults):
+        super().__init__(address, _NodeMcuHandler, **faults)
+        self.history = history
+        self.metrics = {'cpu_temp': "N/A", 'cpu_usage': 0.0, 'ram_usage': 0.0,
+                        'gpu_temp': "N/A", 'gpu_usage': 0.0}
+        self.thresholds = dict(DEFAULT_THRESHOLDS)
+        self.session_id = None
+        self.last_seq = None
+        self.counters = {'http_updates': 0, 'batches': 0, 'batch_samples': 0, 'udp_frames': 0,
+                         'udp_dropped': 0, 'history_records': 0, 'bad_requests': 0, 'oversized_batches': 0}
+        self.update_times = []  # when each applied update arrived
+        self.udp = None
+        if udp_port is not None:
+            self.udp = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.udp.bind((address[0], udp_port))
+
+    def start(self):
+        if self.udp is not None:
+            threading.Thread(target=self._udp_loop, daemon=True).start()
+        return super().start()
+
+    def apply(self, sample):
+        with self.lock:
+            for key in self.metrics:
+                if key in sample:
+                    value = sample[key]
+                    if key.endswith('_temp'):
+                        # The firmware keeps temperatures as strings with one decimal
+                        value = "N/A" if value == "N/A" else f"{float(value):.1f}"
+                    self.metrics[key] = value
+            self.update_times.append(time.time())
+
+    def _udp_loop(self):
+        while True:
+            try:
+                packet, _ = self.udp.recvfrom(256)
+                frame = json.loads(packet)
+            except (OSError, ValueError):
+                continue
+            if self.in_outage():
+                continue
+            sid, seq = frame.get('sid', 0), frame.get('seq', 0)
+            with self.lock:
+                self.counters['udp_frames'] += 1
+                # Signed 32-bit difference, as in the firmware
+                delta = (seq - self.last_seq) & 0xFFFFFFFF if self.last_seq is not None else 1
+                if sid == self.session_id and (delta == 0 or delta >= 0x80000000):
+                    self.counters['udp_dropped'] += 1
+                    continue
+                self.session_id, self.last_seq = sid, seq
+            self.apply(frame)
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counters, updates=len(self.update_times))
+
+
+class _NodeMcuHandler(_StubHandler):
+    def do_GET(self):
+        if not self._inject_faults():
+            return
+        server = self.server
+        if self.path == '/':
+            self._send(200, 'text/html', b"<html><body><h1>IT Infrastructure Monitoring</h1>"
+                                         b"<p>Simulated display</p></body></html>")
+        elif self.path == '/thresholds':
+            self._send_json(server.thresholds)
+        elif self.path == '/metrics':
+            with server.lock:
+                self._send_json(dict(server.metrics))
+        elif self.path == '/stats':
+            self._send_json(server.stats())
+        else:
+            self._send(404, 'text/plain', b"Not found")
+
+    def do_POST(self):
+        if not self._inject_faults():
+            return
+        server = self.server
+        try:
+            body = self._read_body()
+        except OSError:
+            body = b""
+
+        if self.path == '/reset':
+            server.thresholds = dict(DEFAULT_THRESHOLDS)
+            self._send(200, 'text/plain', b"Settings reset to defaults")
+            return
+        if not body:
+            self._send(400, 'text/plain', b"Bad Request: No data")
+            return
+
+        try:
+            if self.path == '/update':
+                sample = json.loads(body)
+                with server.lock:
+                    server.counters['http_updates'] += 1
+                    # HTTP pushes are authoritative and resync the UDP sequence
+                    if 'seq' in sample:
+                        server.session_id, server.last_seq = sample.get('sid', 0), sample['seq']
+                server.apply(sample)
+                self._send(200, 'text/plain', b"OK")
+            elif self.path == '/update/batch':
+                # The firmware's document holds at most this much (BATCH_MAX_BYTES, BATCH_MAX_SAMPLES)
+                if len(body) > FIRMWARE_BATCH_BYTES or body.count(b"{") > FIRMWARE_BATCH_SAMPLES:
+                    with server.lock:
+                        server.counters['oversized_batches'] += 1
+                    self._send(413, 'text/plain', b"Payload Too Large")
+                    return
+                samples = decode_batch(body, self.headers.get('Content-Type', JSON_CONTENT_TYPE))
+                if not samples:
+                    raise ValueError("empty batch")
+                with server.lock:
+                    server.counters['batches'] += 1
+                    server.counters['batch_samples'] += len(samples)
+                server.apply(samples[-1])
+                self._send(200, 'text/plain', b"OK")
+            elif self.path == '/thresholds':
+                server.thresholds.update(json.loads(body))
+                self._send(200, 'text/plain', b"Thresholds updated successfully")
+            elif self.path == '/history' and server.history:
+                records = json.loads(body)
+                with server.lock:
+                    server.counters['history_records'] += len(records)
+                self._send(200, 'text/plain', b"OK")
+            else:
+                self._send(404, 'text/plain', b"Not found")
+        except ValueError as e:
+            with server.lock:
+                server.counters['bad_requests'] += 1
+            self._send(400, 'text/plain', f"Bad Request: {e}".encode())
+
+
+# --------- FILE SERVER --------- #
+
+class StubFileServer(_StubServer):
+    """Serves in-memory files with HTTP Range support.
+
+    `cut_after` truncates the next `cuts` responses after that many body
+    bytes, like a dropped connection; `ranges=False` ignores Range headers.
+    """
+
+    def __init__(self, address, files, cut_after=None, cuts=1, ranges=True, **faults):
+        super().__init__(address, _FileHandler, **faults)
+        self.files = files  # path -> bytes
+        self.cut_after = cut_after
+        self.cuts = cuts
+        self.ranges = ranges
+        self.requests = []  # (path, Range header) per request
+        self.bytes_sent = 0
+
+
+class _FileHandler(_StubHandler):
+    def do_GET(self):
+        server = self.server
+        server.requests.append((self.path, self.headers.get('Range')))
+        if not self._inject_faults():
+            return
+        body = server.files.get(self.path)
+        if body is None:
+            self._send(404, 'text/plain', b"Not found")
+            return
+
+        start = 0
+        requested = self.headers.get('Range', '')
+        if server.ranges and requested.startswith('bytes='):
+            start = int(requested[6:].split('-')[0] or 0)
+            if start >= len(body):
+                self.send_response(416)
+                self.send_header('Content-Range', f"bytes */{len(body)}")
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header('Content-Range', f"bytes {start}-{len(body) - 1}/{len(body)}")
+        else:
+            self.send_response(200)
+        self.send_header('Content-Type', 'application/zip')
+        self.send_header('Content-Length', str(len(body) - start))
+        self.send_header('Accept-Ranges', 'bytes')
+        self.end_headers()
+
+        payload = body[start:]
+        with server.lock:
+            cut = server.cut_after is not None and server.cuts > 0
+            if cut:
+                server.cuts -= 1
+        if cut:
+            payload = payload[:server.cut_after]
+        self.wfile.write(payload)
+        server.bytes_sent += len(payload)
+        if cut:
+            self.close_connection = True
+            self.connection.shutdown(socket.SHUT_RDWR)
+
+
+# --------- TELEGRAM --------- #
+
+class StubTelegram(_StubServer):
+    """Stands in for the Telegram Bot API's sendMessage.
+
+    More than `rate_limit` messages in one second are answered with 429 and
+    a retry_after, like the real API.
+    """
+
+    def __init__(self, address, token="123:TEST", rate_limit=None, retry_after=1, echo=False, **faults):
+        super().__init__(address, _TelegramHandler, **faults)
+        self.token = token
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self.echo = echo
+        self.messages = []  # (arrival time, chat_id, text)
+        self.accepted_times = []
+        self.rejected = 0
+
+
+class _TelegramHandler(_StubHandler):
+    def do_POST(self):
+        server = self.server
+        if not self._inject_faults():
+            return
+        if self.path != f"/bot{server.token}/sendMessage":
+            self._send(401 if self.path.startswith("/bot") else 404, JSON_CONTENT_TYPE,
+                       json.dumps({'ok': False, 'error_code': 401, 'description': 'Unauthorized'}).encode())
+            return
+        try:
+            message = json.loads(self._read_body())
+            chat_id, text = message['chat_id'], message['text']
+        except (ValueError, KeyError):
+            self._send(400, JSON_CONTENT_TYPE, json.dumps({'ok': False, 'error_code': 400}).encode())
+            return
+
+        now = time.time()
+        with server.lock:
+            recent = [t for t in server.accepted_times[-(server.rate_limit or 0):] if now - t < 1.0]
+            limited = server.rate_limit is not None and len(recent) >= server.rate_limit
+            if limited:
+                server.rejected += 1
+            else:
+                server.accepted_times.append(now)
+                server.messages.append((now, chat_id, text))
+        if limited:
+            self._send(429, JSON_CONTENT_TYPE, json.dumps({
+                'ok': False, 'error_code': 429,
+                'description': f"Too Many Requests: retry after {server.retry_after}",
+                'parameters': {'retry_after': server.retry_after}}).encode())
+            return
+        if server.echo:
+            print(f"💬 [{chat_id}] {text}")
+        self._send_json({'ok': True, 'result': {'message_id': len(server.messages), 'text': text}})
+
+
+def fake_alert(n, state='firing'):
+    return {'state': state, 'rule': 'sensor-hot', 'series': f"HOST/Sensor {n}/Temperatures/Core",
+            'stat': 'value', 'value': 90.0 + n % 10, 'threshold': 85.0, 'direction': 'above',
+            'severity': 'warning', 'time': time.time()}
+
+
+def run_notify_check(args):
+    """Exercise ssm.notify against the Telegram stand-in; returns the number of failures."""
+    from ssm import logs, notify
+    logs.setup_logging(verbosity=args.verbosity)
+    failures = 0
+
+    def check(ok, description):
+        nonlocal failures
+        failures += not ok
+        print(f"{'✅' if ok else '❌'} {description}")
+
+    server = StubTelegram(('127.0.0.1', 0), rate_limit=2).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    # A storm of 2500 alerts in bursts against a queue of 200. The bucket is
+    # deliberately faster than the server allows, so 429 handling is exercised
+    sender = notify.TelegramNotifier(server.token, "42", base_url, window=0.5, queue_size=200,
+                                     bucket=notify.TokenBucket(rate=5, burst=5)).start()
+    slowest = 0.0
+    for burst in range(5):
+        for n in range(500):
+            start = time.perf_counter()
+            sender.submit(fake_alert(burst * 500 + n))
+            slowest = max(slowest, time.perf_counter() - start)
+        time.sleep(0.2)
+    # Allow for the sender thread holding the GIL (one 5 ms switch interval)
+    check(slowest < 0.02, f"submit never blocked (slowest call {slowest * 1e6:.0f} µs)")
+    sender.stop(timeout=60)
+    counters = sender.counters
+    check(counters['queued'] + counters['dropped'] == 2500 and counters['queued'] >= 200,
+          f"Storm bounded by the queue: {counters['queued']} queued, {counters['dropped']} dropped")
+    check(counters['digests'] <= 5, f"{counters['queued']} alerts coalesced into {counters['digests']} digests")
+    check(all(len(text) <= notify.TELEGRAM_MAX_MESSAGE for _, _, text in server.messages),
+          f"{len(server.messages)} messages, none over {notify.TELEGRAM_MAX_MESSAGE} characters")
+    delivered = sum(text.count("\n⚠️") + text.startswith("⚠️") for _, _, text in server.messages)
+    check(delivered == counters['queued'] and counters['failed'] == 0,
+          f"Every queued alert delivered ({delivered}), {server.rejected} sends throttled and retried")
+
+    sender = notify.TelegramNotifier("wrong", "42", base_url, window=0).start()
+    sender.submit(fake_alert(0))
+    sender.stop(timeout=30)
+    check(sender.counters['failed'] == 1 and sender.counters['sent'] == 0,
+          "A rejected token fails once without retrying")
+    server.shutdown()
+
+    # With the default pacing the sender stays clear of 429s on its own
+    server = StubTelegram(('127.0.0.1', 0), rate_limit=2).start()
+    sender = notify.TelegramNotifier(server.token, "42", f"http://127.0.0.1:{server.server_port}",
+                                     window=0).start()
+    for n in range(5):
+        sender.submit(fake_alert(n))
+        time.sleep(0.01)
+    sender.stop(timeout=30)
+    check(server.rejected == 0 and len(server.messages) == sender.counters['digests'],
+          f"Token bucket paced {len(server.messages)} messages with no 429s")
+    server.shutdown()
+
+    logs.stop_logging()
+    return failures
+
+
+def fake_ohm_release(size=3 * 1024 * 1024):
+    """A zip shaped like the OHM release, padded with incompressible bytes."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as release:
+        release.writestr("OpenHardwareMonitor/OpenHardwareMonitor.exe", b"MZ" + os.urandom(1024))
+        release.writestr("OpenHardwareMonitor/OpenHardwareMonitorLib.dll", os.urandom(size))
+    return buffer.getvalue()
+
+
+def run_bootstrap_check(args):
+    """Exercise ssm.bootstrap against the local file server; returns the number of failures."""
+    from ssm import bootstrap, logs
+    logs.setup_logging(verbosity=args.verbosity)
+
+    release = fake_ohm_release()
+    pin = hashlib.sha256(release).hexdigest()
+    path = "/files/openhardwaremonitor-v0.9.6.zip"
+    failures = 0
+
+    def check(ok, description):
+        nonlocal failures
+        failures += not ok
+        print(f"{'✅' if ok else '❌'} {description}")
+
+    with tempfile.TemporaryDirectory() as library:
+        server = StubFileServer(('127.0.0.1', 0), {path: release}, cut_after=len(release) // 3).start()
+        url = f"http://127.0.0.1:{server.server_port}{path}"
+
+        exe = bootstrap.ensure_ohm(url, pin, library)
+        check(exe is not None and os.path.isfile(exe), "Interrupted download resumed and installed")
+        check(any(r for _, r in server.requests), "Retry used an HTTP Range request")
+        # At most the chunk that was being read when the connection dropped is fetched twice
+        check(server.bytes_sent < len(release) + bootstrap.DOWNLOAD_CHUNK_SIZE,
+              f"Transferred {server.bytes_sent} bytes for a {len(release)} byte zip")
+        manifest = bootstrap.read_manifest(library)
+        check(manifest is not None and manifest['sha256'] == pin and manifest['version'] == "0.9.6",
+              "Manifest records the version and SHA-256")
+
+        served = len(server.requests)
+        start = time.perf_counter()
+        again = bootstrap.ensure_ohm(url, pin, library)
+        elapsed = time.perf_counter() - start
+        check(again == exe and len(server.requests) == served,
+              f"Second start used the manifest without touching the network ({elapsed * 1e3:.2f} ms)")
+        server.shutdown()
+
+    with tempfile.TemporaryDirectory() as library:
+        server = StubFileServer(('127.0.0.1', 0), {path: release}).start()
+        url = f"http://127.0.0.1:{server.server_port}{path}"
+        exe = bootstrap.ensure_ohm(url, "0" * 64, library)
+        check(exe is None and bootstrap.read_manifest(library) is None
+              and not os.path.exists(os.path.join(bootstrap.ohm_dir(library), "0.9.6")),
+              "Download with the wrong SHA-256 is rejected and nothing is installed")
+        server.shutdown()
+
+    with tempfile.TemporaryDirectory() as library:
+        server = StubFileServer(('127.0.0.1', 0), {path: release}, cut_after=len(release) // 2,
+                                ranges=False).start()
+        url = f"http://127.0.0.1:{server.server_port}{path}"
+        exe = bootstrap.ensure_ohm(url, pin, library)
+        check(exe is not None, "Server without Range support: download restarts and still verifies")
+        server.shutdown()
+
+    logs.stop_logging()
+    return failures
+
+
+def run_history_check(args):
+    """Exercise the --record crash path end to end; returns the number of failures."""
+    import csv
+    from ssm import export, history, logs
+    logs.setup_logging(verbosity=args.verbosity)
+    failures = 0
+
+    def check(ok, description):
+        nonlocal failures
+        failures += not ok
+        print(f"{'✅' if ok else '❌'} {description}")
+
+    now = time.time() // 86400 * 86400 + 43200  # midday UTC, so every record shares a day file
+    readings = {f"HOST/Sensor {n}/Temperatures/Core": (40.0 + n, '°C') for n in range(8)}
+    with tempfile.TemporaryDirectory() as library:
+        directory = history.history_dir(library)
+        writer = history.HistoryWriter(directory)
+        for i in range(10):
+            writer.update(now + i, readings)
+        writer.close()
+        day = os.path.join(directory, history.day_name(now))
+        whole = os.path.getsize(day)
+        # A crash partway through the next record: its header and half its values
+        partial = history.HISTORY_RECORD.pack(now + 10, len(readings)) + b"\x00" * (4 * len(readings))
+        with open(day, "ab") as f:
+            f.write(partial)
+
+        writer = history.HistoryWriter(directory)
+        for i in range(11, 21):
+            writer.update(now + i, readings)
+        writer.close()
+        record = history.HISTORY_RECORD.size + 8 * len(readings)
+        check(os.path.getsize(day) == whole + 10 * record,
+              f"Reopened writer dropped the {len(partial)} byte partial record before appending")
+
+        output = os.path.join(library, "export.csv")
+        status = export.main(['--library-path', library, '-o', output])
+        with open(output, "r", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+        times = sorted({row['time'] for row in rows})
+        check(status == 0 and len(rows) == 20 * len(readings) and len(times) == 20,
+              f"Export returned all {len(times)} cycles from before and after the crash ({len(rows)} rows)")
+
+        # A file damaged mid-way (written before truncation on reopen) is cut at the damage, not misread
+        with open(day, "r+b") as f:
+            f.seek(3 * record)
+            f.write(history.HISTORY_RECORD.pack(now, 0xFFFFFFFF))
+        records = list(history.read_records(directory, range(len(readings))))
+        check(len(records) == 3, f"Reader stopped at a damaged header after {len(records)} whole records")
+
+    logs.stop_logging()
+    return failures
+
+
+# --------- LOAD HARNESS --------- #
+
+def run_fleet_check(args):
+    """Poll --hosts stub machines with each worker count; False if any sensor went missing."""
+    from ssm import fleet, logs, ohm
+    logs.logger.setLevel(logs.VERBOSITY_LEVELS[args.verbosity])
+    servers = [StubOhmServer(('127.0.0.1', 0), scale=args.scale, tick=3600, machine=f"FLEET-{i:03d}").start()
+               for i in range(args.hosts)]
+    urls = [f"http://127.0.0.1:{server.server_port}/data.json" for server in servers]
+    with open(FIXTURE_PATH, "r", encoding="utf-8") as f:
+        expected = len(ohm.build_sensor_index(scale_tree(json.load(f), args.scale))) * args.hosts
+    print(f"🖥️ {args.hosts} hosts x {expected // args.hosts} sensors, {os.cpu_count()} CPUs")
+
+    ok = True
+    baseline = None
+    for workers in args.workers:
+        collector = fleet.FleetCollector(urls, workers).start()
+        try:
+            collector.collect()  # first round: process start-up and schemas
+            started = time.perf_counter()
+            for _ in range(args.rounds):
+                sensors = collector.collect()
+            elapsed = time.perf_counter() - started
+        finally:
+            collector.stop()
+        rate = args.rounds * args.hosts / elapsed
+        baseline = baseline or rate / len(collector.shards)
+        complete = len(sensors) == expected
+        ok = ok and complete
+        print(f"{'✅' if complete else '❌'} {len(collector.shards)} workers: {rate:.1f} hosts/s, "
+              f"{elapsed / args.rounds * 1e3:.1f} ms per round, {len(sensors)}/{expected} sensors, "
+              f"{rate / baseline:.2f}x")
+    for server in servers:
+        server.shutdown()
+    return ok
+
+
+def free_port(kind=socket.SOCK_STREAM):
+    with socket.socket(socket.AF_INET, kind) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def run_loadtest(args, collector_args):
+    ohm = StubOhmServer(('127.0.0.1', 0), scale=args.scale, tick=args.tick,
+                        latency=args.ohm_latency / 1000).start()
+    udp_port = free_port(socket.SOCK_DGRAM)
+    outage = (args.outage_at, args.outage_for) if args.outage_for else None
+    nodemcu = StubNodeMcu(('127.0.0.1', 0), udp_port=udp_port, history=True,
+                          latency=args.latency / 1000, fail_rate=args.fail_rate, outage=outage).start()
+    stats_port = free_port()
+
+    command = [sys.executable, os.path.join(SIM_DIR, "ssm3.py"),
+               '--ip', f"127.0.0.1:{nodemcu.server_port}",
+               '--ohm-url', f"http://127.0.0.1:{ohm.server_port}/data.json",
+               '--udp-port', str(udp_port),
+               '--stats-port', str(stats_port),
+               '--replay-url', f"http://127.0.0.1:{nodemcu.server_port}/history",
+               '--verbosity', '0'] + collector_args
+    print(f"🚀 {' '.join(command)}")
+
+    # Run from a scratch directory: the collector writes ohm_data.json to its cwd
+    with tempfile.TemporaryDirectory() as workdir:
+        collector = subprocess.Popen(command, cwd=workdir,
+                                     stdout=None if args.show_output else subprocess.DEVNULL)
+        try:
+            time.sleep(args.duration)
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{stats_port}/stats", timeout=2) as r:
+                    stages = json.load(r)
+            except OSError as e:
+                print(f"⚠️ Could not read collector stats: {e}")
+                stages = {}
+        finally:
+            collector.terminate()
+            collector.wait(timeout=10)
+
+    # How old the freshest OHM snapshot was when each update reached the display
+    ages = []
+    serve_times = list(ohm.serve_times)
+    position = 0
+    for arrived in nodemcu.update_times:
+        while position + 1 < len(serve_times) and serve_times[position + 1] <= arrived:
+            position += 1
+        if serve_times and serve_times[position] <= arrived:
+            ages.append(arrived - serve_times[position])
+
+    counters = nodemcu.stats()
+    updates = counters.pop('updates')
+    print(f"📊 {updates} updates in {args.duration:.0f}s ({updates / args.duration:.1f}/s), "
+          f"{len(serve_times)} OHM fetches")
+    print(f"📊 Display counters: {counters}")
+    if ages:
+        print(f"📊 Sample age at display: p50 {percentile(ages, 0.5) * 1e3:.1f} ms, "
+              f"p99 {percentile(ages, 0.99) * 1e3:.1f} ms")
+    cycle = stages.get('cycle')
+    if cycle:
+        q = cycle['quantiles']
+        print(f"📊 Collector cycle: mean {cycle['sum'] / cycle['count'] * 1e3:.1f} ms, "
+              f"p50 {q['0.5'] * 1e3:.1f} ms, p99 {q['0.99'] * 1e3:.1f} ms over {cycle['count']} cycles")
+    gaps = [b - a for a, b in zip(nodemcu.update_times, nodemcu.update_times[1:])]
+    if gaps:
+        print(f"📊 Update spacing: median {statistics.median(gaps) * 1e3:.1f} ms, "
+              f"max {max(gaps) * 1e3:.1f} ms")
+    return 0
+
+
+def serve_forever(server, description):
+    server.start()
+    print(f"✅ {description}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Simulators and load harness for the IT Infrastructure Monitor')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    def add_faults(p):
+        p.add_argument('--latency', type=float, default=0.0, help='Added response latency in ms')
+        p.add_argument('--fail-rate', type=float, default=0.0, help='Fraction of requests answered with HTTP 500')
+        p.add_argument('--outage-at', type=float, default=0.0, help='Seconds after start when the outage begins')
+        p.add_argument('--outage-for', type=float, default=0.0, help='Outage length in seconds (0 = no outage)')
+
+    ohm = sub.add_parser('ohm', help='Serve a drifting OHM data.json')
+    ohm.add_argument('--host', default='127.0.0.1')
+    ohm.add_argument('--port', type=int, default=8085)
+    ohm.add_argument('--scale', type=int, default=1, help='Repeat the hardware nodes this many times')
+    ohm.add_argument('--tick', type=float, default=1.0, help='Seconds between value updates')
+    add_faults(ohm)
+
+    mcu = sub.add_parser('nodemcu', help='Serve a stand-in NodeMCU display')
+    mcu.add_argument('--host', default='127.0.0.1')
+    mcu.add_argument('--port', type=int, default=8080)
+    mcu.add_argument('--udp-port', type=int, default=UDP_PORT)
+    mcu.add_argument('--history', action='store_true',
+                     help='Also act as a history sink for outbox replays on /history (the firmware has none)')
+    add_faults(mcu)
+
+    load = sub.add_parser('loadtest', help='Drive ssm3.py against both stubs and report')
+    load.add_argument('--duration', type=float, default=20.0, help='Seconds to run the collector')
+    load.add_argument('--scale', type=int, default=1, help='Repeat the OHM hardware nodes this many times')
+    load.add_argument('--tick', type=float, default=1.0, help='Seconds between OHM value updates')
+    load.add_argument('--ohm-latency', type=float, default=0.0, help='Added OHM response latency in ms')
+    load.add_argument('--show-output', action='store_true', help='Show the collector console output')
+    add_faults(load)
+
+    boot = sub.add_parser('bootstrap', help='Check the OHM download/install path against a local file server')
+    boot.add_argument('--verbosity', type=int, choices=[0, 1, 2], default=0)
+
+    tg = sub.add_parser('telegram', help='Serve a stand-in Telegram Bot API (sendMessage)')
+    tg.add_argument('--host', default='127.0.0.1')
+    tg.add_argument('--port', type=int, default=8081)
+    tg.add_argument('--token', default="123:TEST", help='Bot token the stand-in accepts')
+    tg.add_argument('--rate-limit', type=int, help='Messages per second before answering 429')
+    add_faults(tg)
+
+    check = sub.add_parser('notify', help='Check the Telegram notifier under an alert storm')
+    check.add_argument('--verbosity', type=int, choices=[0, 1, 2], default=0)
+
+    flt = sub.add_parser('fleet', help='Measure fleet polling throughput across worker processes')
+    flt.add_argument('--hosts', type=int, default=16, help='Stub OHM machines to serve')
+    flt.add_argument('--scale', type=int, default=1, help='Repeat the OHM hardware nodes this many times')
+    flt.add_argument('--workers', type=lambda s: [int(n) for n in s.split(',')], default=[1, 2, 4],
+                     help='Comma separated worker counts to compare (default: 1,2,4)')
+    flt.add_argument('--rounds', type=int, default=20, help='Polls of every host per worker count')
+    flt.add_argument('--verbosity', type=int, choices=[0, 1, 2], default=0)
+
+    hst = sub.add_parser('history', help='Check that --record recovers from a record cut short by a crash')
+    hst.add_argument('--verbosity', type=int, choices=[0, 1, 2], default=0)
+
+    argv = sys.argv[1:]
+    collector_args = []
+    if '--' in argv:
+        split = argv.index('--')
+        argv, collector_args = argv[:split], argv[split + 1:]
+    args = parser.parse_args(argv)
+
+    if args.command == 'loadtest':
+        return run_loadtest(args, collector_args)
+    if args.command == 'bootstrap':
+        return 1 if run_bootstrap_check(args) else 0
+    if args.command == 'notify':
+        return 1 if run_notify_check(args) else 0
+    if args.command == 'fleet':
+        return 0 if run_fleet_check(args) else 1
+    if args.command == 'history':
+        return 1 if run_history_check(args) else 0
+
+    faults = {'latency': args.latency / 1000, 'fail_rate': args.fail_rate,
+              'outage': (args.outage_at, args.outage_for) if args.outage_for else None}
+    if args.command == 'ohm':
+        server = StubOhmServer((args.host, args.port), scale=args.scale, tick=args.tick, **faults)
+        return serve_forever(server, f"Stub OHM serving http://{args.host}:{args.port}/data.json "
+                                     f"({len(server.sensors)} sensors)")
+    if args.command == 'telegram':
+        server = StubTelegram((args.host, args.port), token=args.token, rate_limit=args.rate_limit,
+                              echo=True, **faults)
+        return serve_forever(server, f"Stub Telegram on http://{args.host}:{args.port} (token {args.token})")
+    server = StubNodeMcu((args.host, args.port), udp_port=args.udp_port, history=args.history, **faults)
+    return serve_forever(server, f"Stub NodeMCU on http://{args.host}:{args.port} (UDP {args.udp_port})")
+
+
+if __name__ == "__main__":
+    sys.exit(main())